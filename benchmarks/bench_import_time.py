@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold import time of app modules with python -X importtime.
+
+Each module is imported in a fresh interpreter --runs times and the median
+cumulative import time is reported, together with the slowest dependencies
+and whether boto3 was pulled in. With --max-ms the script exits non-zero
+when a module exceeds the budget, so it can guard startup time in CI.
+
+Usage:
+    python benchmarks/bench_import_time.py --modules src.config.settings --max-ms 50
+    python benchmarks/bench_import_time.py --aws-region us-east-1   # import as if running in EKS
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).parent.parent
+
+
+def import_profile(module: Optional[str], env: dict) -> dict:
+    """{package: cumulative_us} from one -X importtime run of module (None: bare interpreter)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative_us.isdigit():
+            cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--modules", nargs="+", default=["src.config.settings", "src.api.main"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="slowest top-level dependencies to list")
+    parser.add_argument("--aws-region", help="set AWS_REGION for the imports, as in EKS")
+    parser.add_argument("--max-ms", type=float,
+                        help="fail when a module's median import time exceeds this")
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix="weather-importtime-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{scratch_dir}/import.db")
+    if args.aws_region:
+        env["AWS_REGION"] = args.aws_region
+
+    # Modules the interpreter imports at startup are not dependencies of ours
+    startup = set(import_profile(None, env))
+    results = []
+    for module in args.modules:
+        runs = [import_profile(module, env) for _ in range(args.runs)]
+        totals = [profile.get(module, 0) for profile in runs]
+        last = runs[-1]
+        # Top-level packages only, so nested imports are not counted twice
+        dependencies = sorted(
+            ((name, us) for name, us in last.items()
+             if "." not in name and name not in startup and name != module.split(".")[0]),
+            key=lambda item: item[1], reverse=True
+        )[:args.top]
+        results.append({
+            "module": module,
+            "median_ms": round(statistics.median(totals) / 1000, 1),
+            "min_ms": round(min(totals) / 1000, 1),
+            "imports_boto3": "boto3" in last,
+            "slowest_dependencies_ms": {name: round(us / 1000, 1) for name, us in dependencies},
+        })
+
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    report = {
+        "benchmark": "import_time", "runs": args.runs, "aws_region": args.aws_region,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.max_ms is not None:
+        over = [r["module"] for r in results if r["median_ms"] > args.max_ms]
+        if over:
+            print(f"Import time budget of {args.max_ms}ms exceeded by: {', '.join(over)}",
+                  file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark logging overhead per /webhook request.
+
+Each simulated request makes the log calls a real webhook makes (receive,
+cache lookup, fetch, reply). "before" is the previous setup: a synchronous
+StreamHandler with f-string messages. "inline-text" and "inline-json" are
+the default setup: the structured logger with lazy %-style messages,
+written by the calling thread. "queue-text" and "queue-json" add the
+LOG_QUEUE_ENABLED background writer, so the request only pays for building
+and enqueueing the record. Output goes to a sink that sleeps
+--sink-latency-ms per write, standing in for a slow or backpressured stdout
+(container log driver, pipe to a collector).
+
+With a fast sink the queue variants cost more per request than writing
+inline, because the writer thread competes for the GIL, which is why the
+queue is opt-in; they pay off once the stream blocks, which is when
+synchronous logging stalls the event loop.
+
+Usage:
+    python benchmarks/bench_logging.py --requests 5000 --sink-latency-ms 0.05
+"""
+
+import argparse
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config.logging import (  # noqa: E402
+    TEXT_FORMAT,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    TextFormatter,
+    get_logger,
+)
+
+
+class SlowSink(io.TextIOBase):
+    """Write target that blocks for a fixed time per write."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def write(self, text: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        return len(text)
+
+
+def request_eager(logger, sender: str, body: str, city: str):
+    logger.info(f"Webhook received from {sender}, body length: {len(body)}")
+    logger.info(f"Weather cache miss for {city}, None")
+    logger.info(f"Fetching weather data for {city}, None")
+    logger.info(f"Weather data fetched successfully for {city}, temperature: 15.2°C")
+    logger.info(f"Weather data retrieved for {city}")
+    logger.info(f"Webhook processed and replying with TwiML, reply_length={120}")
+
+
+def request_lazy(logger, sender: str, body: str, city: str):
+    logger.info("Webhook received from %s, body length: %d", sender, len(body))
+    logger.info("Weather cache %s for %s, %s", "miss", city, None)
+    logger.info("Fetching weather data for %s, %s", city, None)
+    logger.info("Weather data fetched successfully for %s, temperature: %s°C", city, 15.2)
+    logger.info("Weather data retrieved for %s", city)
+    logger.info("Webhook processed and replying with TwiML, reply_length=%d", 120, to_number=sender)
+
+
+def measure(name: str, handler: logging.Handler, simulate, logger, requests: int,
+            listener=None) -> dict:
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+    if listener:
+        listener.start()
+
+    start = time.perf_counter()
+    for i in range(requests):
+        simulate(logger, f"whatsapp:+1555000{i % 10000:04d}", "London", "London")
+    request_elapsed = time.perf_counter() - start
+    if listener:
+        listener.stop()
+    drained_elapsed = time.perf_counter() - start
+    root.handlers[:] = []
+
+    return {
+        "variant": name,
+        "us_per_request": round(request_elapsed / requests * 1e6, 2),
+        "total_seconds_including_drain": round(drained_elapsed, 3),
+    }
+
+
+def queued(formatter: logging.Formatter, sink: SlowSink, queue_size: int):
+    stream = logging.StreamHandler(sink)
+    stream.setFormatter(formatter)
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    return handler, logging.handlers.QueueListener(handler.queue, stream)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--sink-latency-ms", type=float, default=0.0,
+                        help="Time each write to the output stream blocks")
+    parser.add_argument("--queue-size", type=int, default=100000)
+    args = parser.parse_args()
+    latency = args.sink_latency_ms / 1000
+
+    before = logging.StreamHandler(SlowSink(latency))
+    before.setFormatter(logging.Formatter(TEXT_FORMAT))
+    stdlib_logger = logging.getLogger("bench.webhook")
+    structured_logger = get_logger("bench.webhook")
+
+    results = [measure("before", before, request_eager, stdlib_logger, args.requests)]
+    formatters = (("text", TextFormatter(TEXT_FORMAT)), ("json", JsonFormatter()))
+    for name, formatter in formatters:
+        handler = logging.StreamHandler(SlowSink(latency))
+        handler.setFormatter(formatter)
+        results.append(
+            measure(f"inline-{name}", handler, request_lazy, structured_logger, args.requests)
+        )
+    for name, formatter in formatters:
+        handler, listener = queued(formatter, SlowSink(latency), args.queue_size)
+        results.append(measure(
+            f"queue-{name}", handler, request_lazy, structured_logger, args.requests, listener
+        ))
+
+    report = {
+        "benchmark": "logging",
+        "requests": args.requests,
+        "log_calls_per_request": 6,
+        "sink_latency_ms": args.sink_latency_ms,
+        "results": results,
+        "speedup": {
+            result["variant"]: round(results[0]["us_per_request"] / result["us_per_request"], 2)
+            for result in results[1:]
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
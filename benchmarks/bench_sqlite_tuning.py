@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark SQLite insert/select throughput under the default and tuned engine profiles.
+
+Each profile gets a fresh database file. Writer threads insert weather_data
+rows one transaction at a time (as request handlers do) while reader threads
+run per-city latest-reading lookups, and the run reports throughput and lock
+errors for both.
+
+Usage:
+    python benchmarks/bench_sqlite_tuning.py --writers 4 --readers 4 --seconds 10
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Keep the app's default engine away from the real database file
+_scratch_dir = tempfile.mkdtemp(prefix="weather-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch_dir}/unused.db")
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import repository  # noqa: E402
+from src.database.config import Base, WeatherData, create_database_engine  # noqa: E402
+
+CITIES = [f"City {i}" for i in range(50)]
+
+
+def run_profile(name: str, tuned: bool, writers: int, readers: int, seconds: float) -> dict:
+    db_path = os.path.join(_scratch_dir, f"{name}.db")
+    engine = create_database_engine(f"sqlite:///{db_path}", sqlite_tuning=tuned)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    counts = {"inserts": 0, "selects": 0, "errors": 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def count(key: str):
+        with lock:
+            counts[key] += 1
+
+    def writer():
+        while time.monotonic() < stop_at:
+            db = Session()
+            try:
+                db.add(WeatherData(
+                    city=random.choice(CITIES),
+                    temperature=random.uniform(-20, 40),
+                    description="benchmark",
+                    humidity=random.randint(0, 100),
+                    created_at=datetime.now(timezone.utc)
+                ))
+                db.commit()
+                count("inserts")
+            except Exception:
+                db.rollback()
+                count("errors")
+            finally:
+                db.close()
+
+    def reader():
+        while time.monotonic() < stop_at:
+            db = Session()
+            try:
+                repository.get_latest_reading(db, random.choice(CITIES))
+                count("selects")
+            except Exception:
+                count("errors")
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "profile": name,
+        "inserts_per_second": round(counts["inserts"] / seconds, 1),
+        "selects_per_second": round(counts["selects"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    random.seed(42)
+    report = {
+        "benchmark": "sqlite_tuning",
+        "writers": args.writers,
+        "readers": args.readers,
+        "seconds": args.seconds,
+        "results": [
+            run_profile("default", False, args.writers, args.readers, args.seconds),
+            run_profile("tuned", True, args.writers, args.readers, args.seconds),
+        ],
+    }
+    shutil.rmtree(_scratch_dir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark weather_data history queries as the table grows.
+
+Builds a throwaway SQLite database per table size, fills it with synthetic
+readings and times the repository queries behind the history endpoints.
+Lookups should stay roughly flat as rows grow; run with --without-indexes
+to see the full-scan baseline.
+
+Usage:
+    python benchmarks/bench_weather_history.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Keep the app's default engine away from the real database file
+_scratch_dir = tempfile.mkdtemp(prefix="weather-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch_dir}/unused.db")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import repository  # noqa: E402
+from src.database.config import Base, WeatherData  # noqa: E402
+
+
+def populate(engine, rows: int, cities: int, batch_size: int = 50000):
+    start_time = datetime(2024, 1, 1)
+    city_names = [f"City {i}" for i in range(cities)]
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            batch = [
+                {
+                    "city": random.choice(city_names),
+                    "temperature": random.uniform(-20, 40),
+                    "description": "benchmark",
+                    "humidity": random.randint(0, 100),
+                    "feels_like": random.uniform(-20, 40),
+                    "created_at": start_time + timedelta(seconds=offset + i),
+                }
+                for i in range(min(batch_size, rows - offset))
+            ]
+            conn.execute(insert(WeatherData), batch)
+    return city_names, start_time
+
+
+def time_query(fn, repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def run_size(rows: int, cities: int, repeats: int, with_indexes: bool) -> dict:
+    db_path = os.path.join(_scratch_dir, f"history-{rows}.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    if not with_indexes:
+        for index in WeatherData.__table__.indexes:
+            index.drop(bind=engine)
+
+    load_start = time.perf_counter()
+    city_names, start_time = populate(engine, rows, cities)
+    load_seconds = time.perf_counter() - load_start
+
+    db = sessionmaker(bind=engine)()
+    span = timedelta(seconds=rows)
+    window_start = start_time + span / 2
+    window_end = window_start + timedelta(hours=1)
+
+    def pick_city():
+        return random.choice(city_names)
+
+    results = {
+        "rows": rows,
+        "load_seconds": round(load_seconds, 2),
+        "latest_reading": time_query(
+            lambda: repository.get_latest_reading(db, pick_city()), repeats
+        ),
+        "history_page": time_query(
+            lambda: repository.get_readings(db, city=pick_city(), limit=50), repeats
+        ),
+        "history_window": time_query(
+            lambda: repository.get_readings(db, start=window_start, end=window_end, limit=50),
+            repeats
+        ),
+        "city_stats_window": time_query(
+            lambda: repository.get_city_stats(db, pick_city(), start=window_start, end=window_end),
+            repeats
+        ),
+    }
+    db.close()
+    engine.dispose()
+    os.remove(db_path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--without-indexes", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(42)
+    report = {
+        "benchmark": "weather_history",
+        "indexes": not args.without_indexes,
+        "cities": args.cities,
+        "results": [
+            run_size(rows, args.cities, args.repeats, not args.without_indexes)
+            for rows in args.sizes
+        ],
+    }
+    shutil.rmtree(_scratch_dir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request /webhook ingress cost: form parsing plus Twilio signature validation.
+
+"before" is what the handler used to do for every message: Starlette form
+parsing, a dict copy of the form and a fresh twilio RequestValidator.
+"after" parses the raw body once with parse_qsl and validates with the
+shared TwilioSignatureValidator. Both are checked to accept the same
+signed request before timing.
+
+Usage:
+    python benchmarks/bench_webhook_signature.py --iterations 20000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from starlette.requests import Request  # noqa: E402
+from twilio.request_validator import RequestValidator  # noqa: E402
+
+from src.services.signature import TwilioSignatureValidator  # noqa: E402
+
+AUTH_TOKEN = "bench-auth-token"
+URL = "https://weather-bot.example.com/webhook"
+
+# Field set of a real inbound WhatsApp message
+FORM = {
+    "SmsMessageSid": "SM0123456789abcdef0123456789abcdef",
+    "NumMedia": "0",
+    "ProfileName": "Bench User",
+    "MessageType": "text",
+    "SmsSid": "SM0123456789abcdef0123456789abcdef",
+    "WaId": "15550001234",
+    "SmsStatus": "received",
+    "Body": "London",
+    "To": "whatsapp:+14155238886",
+    "NumSegments": "1",
+    "ReferralNumMedia": "0",
+    "MessageSid": "SM0123456789abcdef0123456789abcdef",
+    "AccountSid": "AC0123456789abcdef0123456789abcdef",
+    "From": "whatsapp:+15550001234",
+    "ApiVersion": "2010-04-01",
+}
+
+
+def make_request(body: bytes) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/webhook",
+        "headers": [(b"content-type", b"application/x-www-form-urlencoded")],
+    }
+    return Request(scope, receive)
+
+
+async def before(body: bytes, signature: str) -> bool:
+    form_data = dict((await make_request(body).form()).items())
+    return RequestValidator(AUTH_TOKEN).validate(URL, form_data, signature)
+
+
+def after_factory():
+    validator = TwilioSignatureValidator(AUTH_TOKEN)
+
+    async def after(body: bytes, signature: str) -> bool:
+        raw = await make_request(body).body()
+        fields = parse_qsl(raw.decode("utf-8"), keep_blank_values=True)
+        return validator.validate(URL, fields, signature)
+
+    return after
+
+
+async def measure(name: str, handler, body: bytes, signature: str, iterations: int) -> dict:
+    for _ in range(min(1000, iterations)):
+        await handler(body, signature)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await handler(body, signature)
+    elapsed = time.perf_counter() - start
+    return {"variant": name, "us_per_request": round(elapsed / iterations * 1e6, 2)}
+
+
+async def run(iterations: int) -> list:
+    body = urlencode(FORM).encode()
+    signature = RequestValidator(AUTH_TOKEN).compute_signature(URL, FORM)
+    after = after_factory()
+    assert await before(body, signature) and await after(body, signature)
+    assert not await after(body, signature[::-1])
+    return [
+        await measure("before", before, body, signature, iterations),
+        await measure("after", after, body, signature, iterations),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.iterations))
+    report = {
+        "benchmark": "webhook_signature",
+        "iterations": args.iterations,
+        "results": results,
+        "speedup": round(results[0]["us_per_request"] / results[1]["us_per_request"], 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Local stand-ins for OpenWeatherMap, the Twilio REST API and a Redis server.
+
+All run on a background thread so load tests can run on a laptop with no
+network access; the HTTP fakes add configurable latency and error rates.
+"""
+
+import json
+import random
+import socketserver
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeServer:
+    """ThreadingHTTPServer wrapper that injects latency and 5xx errors into every response."""
+
+    def __init__(self, handler_cls, latency_ms: float = 0, error_rate: float = 0, port: int = 0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        # Fake city IDs handed out so far, so /group can resolve them back to names
+        self.cities = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), handler_cls)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _simulate(self) -> bool:
+        """Apply latency; return False (after sending a 503) when this request should fail."""
+        fake = self.server.fake
+        fake.count_request()
+        if fake.latency_ms:
+            time.sleep(random.expovariate(1 / fake.latency_ms) / 1000)
+        if fake.error_rate and random.random() < fake.error_rate:
+            self._send_json(503, {"message": "injected failure"})
+            return False
+        return True
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _weather_payload(city: str, city_id: int) -> dict:
+    return {
+        "id": city_id,
+        "name": city,
+        "main": {"temp": round(random.uniform(-5, 35), 1), "humidity": random.randint(20, 95),
+                 "feels_like": round(random.uniform(-8, 38), 1)},
+        "weather": [{"description": random.choice(["clear sky", "light rain", "few clouds"])}],
+        "dt": int(time.time()),
+    }
+
+
+def city_id(city: str) -> int:
+    """Stable fake OpenWeatherMap city ID."""
+    return zlib.crc32(city.lower().encode()) % 10_000_000
+
+
+class OpenWeatherMapHandler(_FakeHandler):
+    """Serves GET /data/2.5/weather?q=City[,CC] and /data/2.5/group?id=1,2,3."""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        if not self._simulate():
+            return
+
+        cities = self.server.fake.cities
+        if parsed.path.endswith("/weather") and "q" in params:
+            city = params["q"][0].split(",")[0].strip().title()
+            cities[city_id(city)] = city
+            self._send_json(200, _weather_payload(city, city_id(city)))
+        elif parsed.path.endswith("/group") and "id" in params:
+            ids = [int(value) for value in params["id"][0].split(",") if value]
+            if len(ids) > 20:
+                self._send_json(400, {"cod": "400", "message": "too many ids"})
+                return
+            found = [_weather_payload(cities[i], i) for i in ids if i in cities]
+            self._send_json(200, {"cnt": len(found), "list": found})
+        else:
+            self._send_json(404, {"cod": "404", "message": "not found"})
+
+
+class TwilioHandler(_FakeHandler):
+    """Serves POST /2010-04-01/Accounts/{sid}/Messages.json."""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if not self._simulate():
+            return
+
+        if self.path.endswith("/Messages.json"):
+            self._send_json(201, {"sid": f"SM{random.getrandbits(64):016x}", "status": "queued"})
+        else:
+            self._send_json(404, {"message": "not found"})
+
+
+def fake_openweathermap(latency_ms: float = 0, error_rate: float = 0, port: int = 0) -> FakeServer:
+    return FakeServer(OpenWeatherMapHandler, latency_ms, error_rate, port)
+
+
+def fake_twilio(latency_ms: float = 0, error_rate: float = 0, port: int = 0) -> FakeServer:
+    return FakeServer(TwilioHandler, latency_ms, error_rate, port)
+
+
+class _RedisHandler(socketserver.StreamRequestHandler):
+    """Enough RESP2 for the shared cache: GET, MGET, SET [PX|EX] [NX], DEL, PUBLISH, SUBSCRIBE."""
+
+    def handle(self):
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            name, args = command[0].upper(), command[1:]
+            handler = getattr(self, f"_cmd_{name.decode().lower()}", None)
+            if handler is None:
+                self._write(b"-ERR unknown command\r\n")
+            else:
+                handler(args)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()
+        parts = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            parts.append(self.rfile.read(length + 2)[:-2])
+        return parts
+
+    def _write(self, data: bytes):
+        with self.server.fake.write_lock:
+            self.wfile.write(data)
+
+    @staticmethod
+    def _bulk(value):
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _get(self, key):
+        entry = self.server.fake.data.get(key)
+        if entry is None or (entry[0] is not None and entry[0] <= time.monotonic()):
+            return None
+        return entry[1]
+
+    def _cmd_ping(self, args):
+        self._write(b"+PONG\r\n")
+
+    def _cmd_client(self, args):
+        self._write(b"+OK\r\n")
+
+    def _cmd_select(self, args):
+        self._write(b"+OK\r\n")
+
+    def _cmd_get(self, args):
+        self._write(self._bulk(self._get(args[0])))
+
+    def _cmd_mget(self, args):
+        self._write(b"*%d\r\n" % len(args) + b"".join(self._bulk(self._get(key)) for key in args))
+
+    def _cmd_set(self, args):
+        key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+        expires_at = None
+        for i, option in enumerate(options):
+            if option == b"PX":
+                expires_at = time.monotonic() + int(options[i + 1]) / 1000
+            elif option == b"EX":
+                expires_at = time.monotonic() + int(options[i + 1])
+        with self.server.fake.lock:
+            if b"NX" in options and self._get(key) is not None:
+                self._write(b"$-1\r\n")
+                return
+            self.server.fake.data[key] = (expires_at, value)
+        self._write(b"+OK\r\n")
+
+    def _cmd_del(self, args):
+        removed = sum(self.server.fake.data.pop(key, None) is not None for key in args)
+        self._write(b":%d\r\n" % removed)
+
+    def _cmd_publish(self, args):
+        channel, message = args
+        subscribers = list(self.server.fake.subscribers.get(channel, ()))
+        payload = b"*3\r\n" + self._bulk(b"message") + self._bulk(channel) + self._bulk(message)
+        for subscriber in subscribers:
+            subscriber._write(payload)
+        self._write(b":%d\r\n" % len(subscribers))
+
+    def _cmd_subscribe(self, args):
+        fake = self.server.fake
+        for channel in args:
+            fake.subscribers.setdefault(channel, []).append(self)
+            count = sum(self in handlers for handlers in fake.subscribers.values())
+            reply = self._bulk(b"subscribe") + self._bulk(channel) + b":%d\r\n" % count
+            self._write(b"*3\r\n" + reply)
+
+
+class FakeRedisServer:
+    """In-memory Redis-protocol server, enough for several app processes to share a cache."""
+
+    def __init__(self, port: int = 0):
+        self.data = {}
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", port), _RedisHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "FakeRedisServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def fake_redis(port: int = 0) -> FakeRedisServer:
+    return FakeRedisServer(port)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Load test for the WhatsApp Weather Bot against local fakes.
+
+Starts fake OpenWeatherMap and Twilio servers, runs src.api.main:app under
+uvicorn pointed at them, then drives /webhook (with valid Twilio signatures)
+and /weather at a fixed request rate. Prints p50/p95/p99 latency, throughput
+and error rate as JSON so runs can be compared across versions. Webhooks
+answered with the app's "busy" or "sending too quickly" TwiML are counted as
+shed or rate_limited rather than served, and latency percentiles cover
+served responses only.
+
+Usage:
+    python benchmarks/loadtest.py --rps 200 --duration 30 --upstream-latency-ms 150
+    python benchmarks/loadtest.py --env WEBHOOK_ASYNC_REPLY=true --output after.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from twilio.request_validator import RequestValidator
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fakes import fake_openweathermap, fake_redis, fake_twilio  # noqa: E402
+
+ROOT = Path(__file__).parent.parent
+AUTH_TOKEN = "loadtest-auth-token"
+ACCOUNT_SID = "ACloadtest"
+CITIES = [
+    "London", "Paris", "Berlin", "Madrid", "Rome", "Vienna", "Prague", "Warsaw",
+    "Lisbon", "Dublin", "Oslo", "Stockholm", "Helsinki", "Athens", "Tel Aviv",
+    "New York", "Chicago", "Toronto", "Mexico City", "Tokyo", "Seoul", "Sydney",
+]
+# Text of the prebuilt TwiML replies for requests turned away by admission control
+REJECTION_MARKERS = {
+    "rate_limited": "sending messages too quickly",
+    "shed": "busy right now",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_app(port: int, weather_url: str, twilio_url: str, db_dir: str, extra_env: dict,
+              workers: int):
+    env = dict(os.environ)
+    env.update({
+        "WEATHER_API_URL": f"{weather_url}/data/2.5",
+        "WEATHER_API_KEY": "loadtest",
+        "TWILIO_ACCOUNT_SID": ACCOUNT_SID,
+        "TWILIO_AUTH_TOKEN": AUTH_TOKEN,
+        "TWILIO_WHATSAPP_FROM": "whatsapp:+14155238886",
+        "TWILIO_API_URL": twilio_url,
+        "DATABASE_URL": f"sqlite:///{db_dir}/loadtest.db",
+        "LOG_LEVEL": "WARNING",
+    })
+    for key in ("AWS_REGION", "AWS_DEFAULT_REGION"):
+        env.pop(key, None)
+    env.update(extra_env)
+
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env,
+        # Keep app logs out of the JSON report on stdout
+        stdout=sys.stderr
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0):
+    """Wait for /health/ready, so warmup is not part of the measured run."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"App was not ready within {timeout}s")
+
+
+def webhook_request(base_url: str, validator: RequestValidator, sender: int, city: str):
+    url = f"{base_url}/webhook"
+    form = {"From": f"whatsapp:+1555{sender:07d}", "Body": city,
+            "MessageSid": f"SM{random.getrandbits(64):016x}"}
+    headers = {"X-Twilio-Signature": validator.compute_signature(url, form)}
+    return "webhook", dict(method="POST", url=url, data=form, headers=headers)
+
+
+def weather_request(base_url: str, city: str):
+    return "weather", dict(method="POST", url=f"{base_url}/weather", json={"city": city})
+
+
+def outcome_of(response: httpx.Response) -> str:
+    if response.status_code >= 400:
+        return "error"
+    for outcome, marker in REJECTION_MARKERS.items():
+        if marker in response.text:
+            return outcome
+    return "served"
+
+
+async def drive(base_url: str, rps: float, duration: float, webhook_share: float,
+                cities: list, senders: int, timeout: float) -> dict:
+    validator = RequestValidator(AUTH_TOKEN)
+    results = {"webhook": [], "weather": []}
+
+    async def fire(client, kind, request):
+        start = time.perf_counter()
+        try:
+            response = await client.request(**request)
+            outcome = outcome_of(response)
+        except httpx.HTTPError:
+            outcome = "error"
+        results[kind].append(((time.perf_counter() - start) * 1000, outcome))
+
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        total = int(rps * duration)
+        tasks = []
+        started = time.perf_counter()
+        # Open-loop schedule: requests go out on time regardless of how slow responses are
+        for i in range(total):
+            delay = started + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            city = random.choice(cities)
+            if random.random() < webhook_share:
+                sender = random.randrange(senders)
+                kind, request = webhook_request(base_url, validator, sender, city)
+            else:
+                kind, request = weather_request(base_url, city)
+            tasks.append(asyncio.create_task(fire(client, kind, request)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    def summarize(samples):
+        served = [latency for latency, outcome in samples if outcome == "served"]
+        counts = {outcome: 0 for outcome in ("served", "rate_limited", "shed", "error")}
+        for _, outcome in samples:
+            counts[outcome] += 1
+        total = len(samples) or 1
+        return {
+            "requests": len(samples),
+            **counts,
+            "error_rate": round(counts["error"] / total, 4),
+            "rejected_rate": round((counts["rate_limited"] + counts["shed"]) / total, 4),
+            "p50_ms": round(percentile(served, 50), 2),
+            "p95_ms": round(percentile(served, 95), 2),
+            "p99_ms": round(percentile(served, 99), 2),
+            "mean_ms": round(statistics.fmean(served), 2) if served else 0.0,
+        }
+
+    all_samples = results["webhook"] + results["weather"]
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(all_samples) / elapsed, 1),
+        "overall": summarize(all_samples),
+        "webhook": summarize(results["webhook"]),
+        "weather": summarize(results["weather"]),
+    }
+
+
+def parse_env(pairs):
+    env = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        env[key] = value
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rps", type=float, default=100, help="target request rate")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--webhook-share", type=float, default=0.8,
+                        help="fraction of requests sent to /webhook")
+    parser.add_argument("--cities", type=int, default=len(CITIES), help="distinct cities requested")
+    parser.add_argument("--senders", type=int, default=1000,
+                        help="distinct WhatsApp sender numbers")
+    parser.add_argument("--upstream-latency-ms", type=float, default=100)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--twilio-latency-ms", type=float, default=150)
+    parser.add_argument("--twilio-error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--timeout", type=float, default=15.0, help="client request timeout")
+    parser.add_argument("--shared-cache", action="store_true",
+                        help="run a local Redis-protocol fake and point CACHE_BACKEND=redis at it")
+    parser.add_argument("--env", action="append", metavar="KEY=VALUE", help="extra app environment")
+    parser.add_argument("--label", default="", help="free-form label stored in the report")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    random.seed(42)
+    # City names may not contain digits, so synthetic ones get letter suffixes
+    extra_cities = max(0, args.cities - len(CITIES))
+    cities = CITIES[:args.cities] + [
+        f"Town {chr(65 + i // 26 % 26)}{chr(97 + i % 26)}" for i in range(extra_cities)
+    ]
+
+    db_dir = tempfile.mkdtemp(prefix="weather-loadtest-")
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    extra_env = parse_env(args.env)
+    redis_server = fake_redis().start() if args.shared_cache else None
+    if redis_server:
+        extra_env.setdefault("CACHE_BACKEND", "redis")
+        extra_env.setdefault("CACHE_REDIS_URL", redis_server.url)
+
+    with fake_openweathermap(args.upstream_latency_ms, args.upstream_error_rate) as weather_api, \
+            fake_twilio(args.twilio_latency_ms, args.twilio_error_rate) as twilio_api:
+        app = start_app(port, weather_api.url, twilio_api.url, db_dir, extra_env, args.workers)
+        try:
+            asyncio.run(wait_until_ready(base_url))
+            stats = asyncio.run(drive(base_url, args.rps, args.duration, args.webhook_share,
+                                      cities, args.senders, args.timeout))
+        finally:
+            app.terminate()
+            app.wait(timeout=30)
+            shutil.rmtree(db_dir, ignore_errors=True)
+            if redis_server:
+                redis_server.stop()
+
+        report = {
+            "benchmark": "loadtest",
+            "label": args.label,
+            "config": {
+                "rps": args.rps, "duration": args.duration, "webhook_share": args.webhook_share,
+                "cities": args.cities, "senders": args.senders, "workers": args.workers,
+                "shared_cache": args.shared_cache,
+                "upstream_latency_ms": args.upstream_latency_ms,
+                "upstream_error_rate": args.upstream_error_rate,
+                "twilio_latency_ms": args.twilio_latency_ms,
+                "twilio_error_rate": args.twilio_error_rate,
+                "env": extra_env,
+            },
+            "upstream_requests": {
+                "openweathermap": weather_api.requests, "twilio": twilio_api.requests
+            },
+            **stats,
+        }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
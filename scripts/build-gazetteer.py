@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Build the bundled city gazetteer (src/data/cities.tsv) from a GeoNames cities dump.
+
+Download cities15000.zip from https://download.geonames.org/export/dump/, unzip it
+and pass cities15000.txt. GeoNames data is licensed under CC BY 4.0.
+"""
+
+import argparse
+import csv
+import re
+import sys
+from pathlib import Path
+
+OUTPUT = Path(__file__).parent.parent / "src" / "data" / "cities.tsv"
+
+# GeoNames "geoname" table columns used here
+NAME, ALTERNATE_NAMES, COUNTRY_CODE, POPULATION = 1, 3, 8, 14
+
+# Latin-script aliases such as "Munich" or "Cologne"; skips codes like "MUC"
+ALIAS_PATTERN = re.compile(r"^[A-Z][a-z][A-Za-z .'-]{2,}$")
+
+def build_rows(records, min_population, alias_min_population):
+    """Yield (name, country, population, aliases) rows, most populous first."""
+    for name, country, population, alternates in sorted(records, key=lambda r: -r[2]):
+        if population < min_population:
+            continue
+        aliases = []
+        if population >= alias_min_population:
+            seen = {name.lower()}
+            for alias in alternates:
+                if ALIAS_PATTERN.match(alias) and alias.lower() not in seen:
+                    seen.add(alias.lower())
+                    aliases.append(alias)
+        yield name, country, population, ",".join(sorted(aliases))
+
+def read_geonames(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            aliases = row[ALTERNATE_NAMES].split(",")
+            yield row[NAME], row[COUNTRY_CODE], int(row[POPULATION] or 0), aliases
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("dump", help="GeoNames citiesNNNN.txt file")
+    parser.add_argument("--min-population", type=int, default=50000)
+    parser.add_argument("--alias-min-population", type=int, default=1000000,
+                        help="only keep alternate names for cities at least this large")
+    parser.add_argument("--output", type=Path, default=OUTPUT)
+    args = parser.parse_args()
+
+    rows = list(
+        build_rows(read_geonames(args.dump), args.min_population, args.alias_min_population)
+    )
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        f.write("# name\tcountry\tpopulation\taliases -- derived from GeoNames (CC BY 4.0)\n")
+        for row in rows:
+            f.write("\t".join(str(value) for value in row) + "\n")
+
+    print(f"Wrote {len(rows)} cities to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Retention script for Weather Bot.
+Downsamples and deletes old weather_data rows in bounded batches, then compacts the database.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add the project root to path so we can import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config.logging import setup_logging
+from src.config.settings import settings
+from src.database import init_database
+from src.database.retention import GRANULARITIES, run_retention
+
+
+def main():
+    """Apply the retention policy to weather_data."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=settings.retention_days,
+                        help="keep raw readings newer than this many days")
+    parser.add_argument("--granularity", choices=GRANULARITIES,
+                        default=settings.retention_granularity,
+                        help="aggregate bucket for removed rows, or 'none' to only delete")
+    parser.add_argument("--batch-size", type=int, default=settings.retention_batch_size)
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument("--vacuum-pages", type=int, default=settings.retention_vacuum_pages,
+                        help="free pages to reclaim with incremental VACUUM (0 to skip)")
+    parser.add_argument("--full-vacuum", action="store_true",
+                        help="run a one-off full VACUUM to enable incremental auto_vacuum")
+    args = parser.parse_args()
+
+    logger = setup_logging()
+    
+    try:
+        init_database()
+        result = run_retention(
+            retention_days=args.days,
+            granularity=args.granularity,
+            batch_size=args.batch_size,
+            vacuum_pages=args.vacuum_pages,
+            allow_full_vacuum=args.full_vacuum,
+            max_batches=args.max_batches
+        )
+        logger.info(f"Retention completed successfully: {result}")
+        
+    except Exception as e:
+        logger.error(f"Retention failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,170 @@
-from fastapi import FastAPI, Form, Response, Depends, HTTPException, Request
+import asyncio
+import html
+import threading
+import time
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, Histogram
+from prometheus_fastapi_instrumentator import Instrumentator
+from sqlalchemy.orm import Session
+from twilio.twiml.messaging_response import MessagingResponse
+
 from src.config.logging import setup_logging
 from src.config.settings import settings
-from src.database import get_db, init_database, test_database_connection
-from src.models.schemas import WeatherRequest, WeatherResponse
+from src.database import (
+    db_executor,
+    get_db,
+    init_database,
+    repository,
+    run_db,
+    test_database_connection,
+    warm_connection_pool,
+    weather_writer,
+)
+from src.database.retention import retention_loop
+from src.models.schemas import (
+    CityWeatherStats,
+    WeatherHistoryPage,
+    WeatherReading,
+    WeatherRequest,
+    WeatherResponse,
+)
+from src.services.cities import UnknownCityError, get_city_index, load_city_index, parse_city_query
+from src.services.dedup import WebhookDeduplicator
+from src.services.health import HealthProber
+from src.services.metrics import CappedMetric, CityLabeler
+from src.services.rate_limit import AdmissionRejected, ConcurrencyLimiter, SenderRateLimiter
+from src.services.shared_cache import SharedCache, close_cache_backend, get_cache_backend
+from src.services.signature import TwilioSignatureValidator
 from src.services.weather import WeatherService
-from sqlalchemy.orm import Session
-import logging
-from twilio.twiml.messaging_response import MessagingResponse
-from twilio.request_validator import RequestValidator
-import html
-from prometheus_fastapi_instrumentator import Instrumentator
-from prometheus_client import Counter, Histogram
+from src.workers import ReplyJob, ReplyWorkerPool, outbound_dispatcher
 
 # Setup logging
-logger = setup_logging()
+logger = setup_logging(__name__)
+
+# Created during startup (see lifespan) so importing this module does no I/O
+weather_service: Optional[WeatherService] = None
+twilio_client = None
+signature_validator: Optional[TwilioSignatureValidator] = None
+_twilio_credentials: Optional[Tuple[str, str]] = None
+_twilio_lock = threading.Lock()
+
+def _refresh_twilio():
+    """Build the Twilio REST client and webhook signature validator for the current credentials.
+    
+    Called at startup and before each use; both are rebuilt only when the credentials
+    changed, so a token rotated in Parameter Store takes effect without a restart.
+    """
+    global twilio_client, signature_validator, _twilio_credentials
+    credentials = (settings.twilio_account_sid, settings.twilio_auth_token)
+    if credentials == _twilio_credentials:
+        return
+    
+    with _twilio_lock:
+        if credentials == _twilio_credentials:
+            return
+        account_sid, auth_token = credentials
+        if not (account_sid and auth_token):
+            logger.warning("Twilio credentials not found, running in test mode")
+            twilio_client, signature_validator = None, None
+            _twilio_credentials = credentials
+            return
+        
+        # Kept until the next rotation; holds the HMAC key schedule across requests
+        signature_validator = TwilioSignatureValidator(auth_token)
+        from twilio.rest import Client
+        try:
+            twilio_client = Client(account_sid, auth_token)
+            logger.info("Twilio client initialized successfully")
+        except Exception as e:
+            twilio_client = None
+            logger.error(f"Failed to initialize Twilio client: {str(e)}")
+        _twilio_credentials = credentials
+
+def _init_weather_service():
+    global weather_service
+    weather_service = WeatherService()
 
-# Initialize database
-init_database()
+def _warmup_queries() -> List[Tuple[str, Optional[str]]]:
+    """WARMUP_CITIES resolved the way user lookups are, so they fill the same cache entries."""
+    queries = []
+    for city in settings.warmup_cities:
+        try:
+            queries.append(_resolve_city(city))
+        except ValueError as e:
+            logger.warning(f"Skipping warmup city {city}: {e}")
+    return queries
+
+async def _warmup(app: FastAPI):
+    """Pre-open the database and upstream pools and pre-fill the cache, then report ready.
 
-app = FastAPI(title="WhatsApp Weather Bot", version="1.0.0")
+    Warmup failures and timeouts are logged but still end in ready, so a slow
+    dependency delays traffic by at most WARMUP_TIMEOUT.
+    """
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    
+    async def run():
+        await asyncio.gather(
+            run_db(warm_connection_pool, settings.warmup_db_connections),
+            loop.run_in_executor(None, load_city_index)
+        )
+        loaded = await weather_service.warmup(_warmup_queries())
+        if settings.warmup_cities:
+            logger.info(f"Warmup cached {loaded}/{len(settings.warmup_cities)} cities")
+    
+    try:
+        await asyncio.wait_for(run(), timeout=settings.warmup_timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Warmup did not finish within {settings.warmup_timeout}s")
+    except Exception as e:
+        logger.error(f"Warmup failed: {e}")
+    app.state.ready = True
+    logger.info(f"Ready to serve traffic after {time.perf_counter() - start:.2f}s of warmup")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    # Independent, mostly blocking setup steps run side by side instead of one after another
+    # at import
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        loop.run_in_executor(None, init_database),
+        loop.run_in_executor(None, _refresh_twilio),
+        loop.run_in_executor(None, _init_weather_service)
+    )
+    
+    background_tasks = [asyncio.create_task(health_prober.run()), asyncio.create_task(_warmup(app))]
+    if settings.retention_enabled:
+        background_tasks.append(asyncio.create_task(retention_loop()))
+    if settings.weather_refresh_enabled and weather_service.cache.enabled:
+        background_tasks.append(asyncio.create_task(weather_service.refresh_loop()))
+    await outbound_dispatcher.start()
+    if settings.webhook_async_reply:
+        await reply_workers.start()
+    
+    yield
+    
+    # Finish deferred replies before the dispatcher that delivers them stops
+    await reply_workers.stop()
+    
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await outbound_dispatcher.stop()
+    # Release pooled upstream connections, flush buffered readings and stop database threads
+    await weather_service.aclose()
+    close_cache_backend()
+    await run_db(weather_writer.stop)
+    db_executor.shutdown()
+
+app = FastAPI(title="WhatsApp Weather Bot", version="1.0.0", lifespan=lifespan)
 
 # Prometheus instrumentation
 instrumentator = Instrumentator(
@@ -33,10 +178,22 @@ instrumentator = Instrumentator(
 instrumentator.instrument(app).expose(app)
 
 # Custom business metrics
-weather_requests_total = Counter(
-    'weather_requests_total', 
-    'Total weather requests', 
-    ['city', 'status']
+# City labels come from user input, so they go through CityLabeler and a per-metric series cap
+city_labeler = CityLabeler(
+    allowlist=settings.metrics_city_allowlist,
+    top_k=settings.metrics_city_top_k,
+    min_count=settings.metrics_city_min_count
+)
+
+weather_requests_total = CappedMetric(
+    Counter(
+        'weather_requests_total', 
+        'Total weather requests', 
+        ['city', 'status']
+    ),
+    name='weather_requests_total',
+    max_series=settings.metrics_max_series_per_metric,
+    overflow_labels=('city',)
 )
 
 whatsapp_messages_total = Counter(
@@ -51,28 +208,36 @@ database_operations_duration = Histogram(
     ['operation']
 )
 
-account_sid = settings.twilio_account_sid
-auth_token = settings.twilio_auth_token
-from_number = settings.twilio_whatsapp_from
+whatsapp_message_duration = Histogram(
+    'whatsapp_message_duration_seconds',
+    'Time to build the reply for a WhatsApp message',
+    ['message_type']
+)
 
-twilio_client = None
-weather_service = WeatherService()
+webhook_admissions_total = Counter(
+    'webhook_admissions_total',
+    'Webhook requests by admission outcome (admitted, rate_limited, shed)',
+    ['outcome']
+)
 
-if account_sid and auth_token:
-    from twilio.rest import Client
+def _metric_city(query: str) -> str:
+    """City a query is looked up as, so /weather and the webhook label a city the same way."""
     try:
-        twilio_client = Client(account_sid, auth_token)
-        logger.info("Twilio client initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize Twilio client: {str(e)}")
-else:
-    logger.warning("Twilio credentials not found, running in test mode")
+        return _resolve_city(query.strip())[0]
+    except UnknownCityError as e:
+        return e.city
+
+def _record_weather_request(query: str, status: str):
+    # Only successful lookups may teach the labeler new cities; typos stay in "other"
+    label = city_labeler.label(_metric_city(query), learn=(status == 'success'))
+    weather_requests_total.labels(city=label, status=status).inc()
 
 def send_message(to_number: str, message: str):
-    logger.info(f"Sending message to {to_number}, length: {len(message)}")
+    logger.info("Sending message to %s, length: %d", to_number, len(message))
     
+    _refresh_twilio()
     if not twilio_client:
-        logger.info(f"Test mode: message not sent to {to_number}")
+        logger.info("Test mode: message not sent to %s", to_number)
         return "test_mode"
     
     if not to_number.startswith("whatsapp:"):
@@ -80,7 +245,7 @@ def send_message(to_number: str, message: str):
     
     try:
         msg = twilio_client.messages.create(
-            from_=from_number,
+            from_=settings.twilio_whatsapp_from,
             body=message,
             to=to_number
         )
@@ -94,11 +259,18 @@ def send_message(to_number: str, message: str):
                     error=str(e))
         return None
 
-def get_message_response(message_text: str, db: Session = None) -> tuple[str, str]:
-    """
-    Process a message and return the response text and message type.
-    Returns: (response_text, message_type)
+def queue_message(to_number: str, message: str) -> bool:
+    """Hand a message to the outbound workers, sending it directly when they are not running.
+
+    Returns True when the message was queued.
     """
+    if outbound_dispatcher.submit(to_number, message):
+        return True
+    send_message(to_number, message)
+    return False
+
+def _get_command_response(message_text: str) -> Optional[tuple[str, str]]:
+    """Return the (response_text, message_type) for bot commands, or None for city lookups."""
     message = message_text.strip().lower()
     
     if message in ["hello", "hi", "start"]:
@@ -110,7 +282,7 @@ Commands:
 - 'ping' to test
 
 Example: London"""
-        message_type = 'greeting'
+        return response, 'greeting'
         
     elif message in ["help", "?"]:
         response = """Available commands:
@@ -119,55 +291,125 @@ Example: London"""
 - 'help' - show commands
 
 Supported: Any city worldwide"""
-        message_type = 'help'
+        return response, 'help'
         
     elif message == "ping":
-        response = "Weather bot is working!"
-        message_type = 'ping'
-        
-    else:
-        # Treat any other message as a city name
-        try:
-            # Validate city name using Pydantic
-            weather_request = WeatherRequest(city=message_text.strip())
-            
-            if db:
-                result = weather_service.get_current_weather(
-                    city=weather_request.city, 
-                    db=db
-                )
-                
-                if result["status"] == "success":
-                    response = weather_service.format_weather_message(result)
-                    message_type = 'weather_success'
-                    logger.info(f"Weather data retrieved for {result['data']['city']}")
-                else:
-                    response = f"""Weather Error
-
-Could not fetch weather for: {weather_request.city}
+        return "Weather bot is working!", 'ping'
+    
+    return None
+
+def _get_weather_reply(city: str, result: dict) -> tuple[str, str]:
+    if result["status"] == "success":
+        logger.info("Weather data retrieved for %s", result['data']['city'])
+        return weather_service.format_weather_message(result), 'weather_success'
+    if result.get("not_found"):
+        return _get_unknown_city_reply(_unknown_city(city))
+    
+    response = f"""Weather Error
+
+Could not fetch weather for: {city}
 Error: {result.get('error', 'Unknown error')}
 
 Try a different city name."""
-                    message_type = 'weather_error'
-            else:
-                # No database available, return error
-                response = "Database not available. Please try again later."
-                message_type = 'database_error'
-                
-        except ValueError as e:
-            response = f"""Invalid Input
+    return response, 'weather_error'
+
+def _resolve_city(city: str) -> tuple[str, Optional[str]]:
+    """Resolve user input against the local gazetteer before any upstream call.
+    
+    Names the gazetteer does not know are sent upstream as typed; only
+    CITY_INDEX_STRICT rejects them with UnknownCityError. Until the index has
+    loaded during warmup every name is sent upstream as typed.
+    """
+    index = get_city_index()
+    if index is None:
+        return parse_city_query(city) if settings.city_index_enabled else (city, None)
+    return index.resolve(city, strict=settings.city_index_strict)
 
-Error: {str(e)}
+def _unknown_city(city: str) -> UnknownCityError:
+    """UnknownCityError for a name the upstream API did not find, with gazetteer suggestions."""
+    index = get_city_index()
+    name, country = parse_city_query(city)
+    return UnknownCityError(name, index.suggest(name, country) if index else [])
+
+def _format_suggestions(error: UnknownCityError) -> str:
+    return ", ".join(f"{match.name} ({match.country})" for match in error.suggestions)
+
+def _get_unknown_city_reply(error: UnknownCityError) -> tuple[str, str]:
+    logger.info("Unknown city: %s", error.city)
+    response = f"""City Not Found
+
+Could not find: {error.city}"""
+    if error.suggestions:
+        response += (
+            f"\nDid you mean: {_format_suggestions(error)}?"
+            "\n\nSend one of these names to get the weather."
+        )
+    else:
+        response += "\n\nCheck the spelling, or add a country code (e.g. Paris, FR)."
+    return response, 'unknown_city'
+
+def _get_invalid_input_reply(error: ValueError) -> tuple[str, str]:
+    logger.warning(f"Invalid city name: {str(error)}")
+    response = f"""Invalid Input
+
+Error: {str(error)}
 
 Please send a valid city name (letters only)."""
-            message_type = 'invalid_input'
-            logger.warning(f"Invalid city name: {str(e)}")
-        except Exception as e:
-            response = "Sorry, an error occurred. Please try again later."
-            message_type = 'error'
-            logger.error(f"Weather request error: {str(e)}")
+    return response, 'invalid_input'
+
+def get_message_response(message_text: str, db: Session = None) -> tuple[str, str]:
+    """
+    Process a message and return the response text and message type.
+    Returns: (response_text, message_type)
+    """
+    command_response = _get_command_response(message_text)
+    if command_response:
+        return command_response
     
-    return response, message_type
+    # Treat any other message as a city name
+    try:
+        # Validate city name using Pydantic
+        weather_request = WeatherRequest(city=message_text.strip())
+        city, country = _resolve_city(weather_request.city)
+        
+        if not db:
+            # No database available, return error
+            return "Database not available. Please try again later.", 'database_error'
+        
+        result = weather_service.get_current_weather(city=city, country=country, db=db)
+        return _get_weather_reply(city, result)
+        
+    except UnknownCityError as e:
+        return _get_unknown_city_reply(e)
+    except ValueError as e:
+        return _get_invalid_input_reply(e)
+    except Exception as e:
+        logger.error(f"Weather request error: {str(e)}")
+        return "Sorry, an error occurred. Please try again later.", 'error'
+
+async def get_message_response_async(message_text: str, db: Session = None) -> tuple[str, str]:
+    """Async variant of get_message_response for use inside request handlers."""
+    command_response = _get_command_response(message_text)
+    if command_response:
+        return command_response
+    
+    try:
+        weather_request = WeatherRequest(city=message_text.strip())
+        city, country = _resolve_city(weather_request.city)
+        
+        if not db:
+            return "Database not available. Please try again later.", 'database_error'
+        
+        result = await weather_service.get_current_weather_async(city=city, country=country, db=db)
+        return _get_weather_reply(city, result)
+        
+    except UnknownCityError as e:
+        return _get_unknown_city_reply(e)
+    except ValueError as e:
+        return _get_invalid_input_reply(e)
+    except Exception as e:
+        logger.error(f"Weather request error: {str(e)}")
+        return "Sorry, an error occurred. Please try again later.", 'error'
 
 def handle_message(phone_number: str, message_text: str, db: Session):
     """Legacy function for backward compatibility."""
@@ -179,7 +421,7 @@ def handle_message(phone_number: str, message_text: str, db: Session):
     
     # Send immediate response for weather requests
     if message_type in ['weather_success', 'weather_error']:
-        send_message(f"whatsapp:{phone_number}", "Fetching weather data... Please wait.")
+        queue_message(f"whatsapp:{phone_number}", "Fetching weather data... Please wait.")
     
     logger.info(f"Response prepared for {phone_number}, length: {len(response)}")
     return response
@@ -189,44 +431,82 @@ async def root():
     logger.info("Root endpoint accessed")
     return {"message": "WhatsApp Weather Bot", "status": "running"}
 
+async def _probe_database() -> str:
+    if not await run_db(test_database_connection):
+        raise RuntimeError("SELECT 1 failed")
+    return "connected"
+
+# Dependencies are probed in the background; health endpoints only read the latest results
+health_prober = HealthProber(
+    checks={
+        "database": _probe_database,
+        "weather_api": lambda: weather_service.probe_upstream(),
+        "twilio": outbound_dispatcher.sender.probe,
+    },
+    interval=settings.health_probe_interval,
+    timeout=settings.health_probe_timeout,
+    required=("database",)
+)
+
 @app.get("/health")
 async def health():
-    logger.info("Health check requested")
-    
-    try:
-        database_connected = test_database_connection()
-        
-        health_status = {
-            "status": "healthy" if database_connected else "unhealthy",
-            "twilio_configured": bool(twilio_client),
-            "credentials_present": bool(account_sid and auth_token),
-            "database_connected": database_connected,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        logger.info("Health check completed successfully")
-        return health_status
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return {
-            "status": "error",
-            "error": str(e),
-            "timestamp": datetime.now().isoformat()
-        }
+    """Detailed status from the last background probe round."""
+    dependencies = health_prober.snapshot()
+    return {
+        "status": "healthy" if health_prober.healthy else "unhealthy",
+        "ready": getattr(app.state, "ready", False),
+        "twilio_configured": bool(twilio_client),
+        "credentials_present": bool(settings.twilio_account_sid and settings.twilio_auth_token),
+        "database_connected": dependencies.get("database", {}).get("ok", False),
+        "weather_api": weather_service.upstream_status() if weather_service else None,
+        "dependencies": dependencies,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and its event loop is answering."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness for load balancers: 503 until warmup has finished and while the DB probe fails."""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    if not health_prober.healthy:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "dependencies": health_prober.snapshot()}
+        )
+    return {"status": "ready"}
+
+def _unknown_city_http_error(city: str, error: UnknownCityError) -> HTTPException:
+    _record_weather_request(city, 'unknown_city')
+    detail = f"Unknown city: {error.city}"
+    if error.suggestions:
+        detail += f". Did you mean: {_format_suggestions(error)}?"
+    return HTTPException(status_code=404, detail=detail)
 
 @app.post("/weather", response_model=WeatherResponse)
 async def get_weather(request: WeatherRequest, db: Session = Depends(get_db)):
-    logger.info(f"Weather API requested for city: {request.city}")
+    logger.info("Weather API requested for city: %s", request.city)
+    
+    try:
+        city, country = _resolve_city(request.city)
+    except UnknownCityError as e:
+        raise _unknown_city_http_error(request.city, e) from None
     
     try:
         with database_operations_duration.labels(operation='weather_lookup').time():
-            result = weather_service.get_current_weather(city=request.city, db=db)
+            result = await weather_service.get_current_weather_async(
+                city=city, country=country, db=db
+            )
         
         if result["status"] == "success":
             data = result["data"]
             
             # Record successful weather request
-            weather_requests_total.labels(city=request.city, status='success').inc()
+            _record_weather_request(request.city, 'success')
             
             # Weather data is already stored by weather_service.get_current_weather()
             response = WeatherResponse(
@@ -235,71 +515,232 @@ async def get_weather(request: WeatherRequest, db: Session = Depends(get_db)):
                 description=data["description"],
                 humidity=data.get("humidity"),
                 feels_like=data.get("feels_like"),
-                created_at=datetime.now()  # Use current timestamp since data was just fetched
+                created_at=data["timestamp"]
             )
             
-            logger.info(f"Weather API completed successfully for {request.city}")
+            logger.info("Weather API completed successfully for %s", request.city)
             return response
+        elif result.get("not_found"):
+            raise _unknown_city_http_error(request.city, _unknown_city(city))
         else:
             # Record failed weather request
-            weather_requests_total.labels(city=request.city, status='error').inc()
+            _record_weather_request(request.city, 'error')
             logger.error(f"Weather API failed for {request.city}: {result.get('error')}")
             raise HTTPException(
                 status_code=400,
-                detail=f"Weather data not found for {request.city}: {result.get('error', 'Unknown error')}"
+                detail=(
+                    f"Weather data not found for {request.city}: "
+                    f"{result.get('error', 'Unknown error')}"
+                )
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         # Record failed weather request
-        weather_requests_total.labels(city=request.city, status='exception').inc()
+        _record_weather_request(request.city, 'exception')
         logger.error(f"Weather API error for {request.city}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+def _normalize_city_param(city: str) -> str:
+    try:
+        return WeatherRequest(city=city).city
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid city name: {city}") from e
+
+@app.get("/weather/latest", response_model=List[WeatherReading])
+async def get_latest_weather(limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Latest stored reading for each city."""
+    return await run_db(repository.get_latest_readings, db, limit=limit)
+
+@app.get("/weather/history", response_model=WeatherHistoryPage)
+async def get_weather_history(
+    city: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Stored readings, newest first. Pass next_cursor back as cursor to get the next page."""
+    if city:
+        city = _normalize_city_param(city)
+    
+    try:
+        readings, next_cursor = await run_db(
+            repository.get_readings, db,
+            city=city, start=start, end=end, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    
+    return WeatherHistoryPage(
+        items=[WeatherReading.model_validate(reading) for reading in readings],
+        next_cursor=next_cursor
+    )
+
+@app.get("/weather/{city}/stats", response_model=CityWeatherStats)
+async def get_weather_stats(
+    city: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """Temperature and humidity aggregates for a city over an optional time window."""
+    city = _normalize_city_param(city)
+    return await run_db(repository.get_city_stats, db, city, start=start, end=end)
+
+def _record_message_metrics(message_text: str, message_type: str, duration: float):
+    whatsapp_messages_total.labels(message_type=message_type).inc()
+    whatsapp_message_duration.labels(message_type=message_type).observe(duration)
+    
+    # Update weather-specific metrics
+    if message_type == 'weather_success':
+        _record_weather_request(message_text, 'success')
+    elif message_type == 'weather_error':
+        _record_weather_request(message_text, 'error')
+
+async def _process_reply_job(job: ReplyJob):
+    """Build the reply for a deferred webhook message and queue it for delivery."""
+    db = next(get_db())
+    try:
+        start = time.perf_counter()
+        reply_text, message_type = await get_message_response_async(job.body, db)
+        _record_message_metrics(job.body, message_type, time.perf_counter() - start)
+    finally:
+        await run_db(db.close)
+    
+    await outbound_dispatcher.enqueue(job.from_number, reply_text, received_at=job.received_at)
+
+reply_workers = ReplyWorkerPool(
+    handler=_process_reply_job,
+    workers=settings.reply_workers,
+    max_size=settings.reply_queue_max_size
+)
+
+_cache_backend = get_cache_backend()
+webhook_dedup = WebhookDeduplicator(
+    ttl=settings.webhook_dedup_ttl,
+    maxsize=settings.webhook_dedup_max_size,
+    shared=(
+        SharedCache(_cache_backend, namespace="webhook", ttl=settings.webhook_dedup_ttl)
+        if _cache_backend else None
+    ),
+    wait=settings.webhook_dedup_wait
+)
+
+sender_limiter = SenderRateLimiter(
+    rate=settings.webhook_sender_rate_per_minute / 60,
+    burst=settings.webhook_sender_burst,
+    max_senders=settings.webhook_sender_max_tracked
+)
+webhook_concurrency = ConcurrencyLimiter(
+    max_concurrent=settings.webhook_max_concurrency,
+    max_waiting=settings.webhook_max_queued,
+    max_wait=settings.webhook_queue_timeout,
+    name="webhook"
+)
+
+def _twiml_message(text: str) -> str:
+    resp = MessagingResponse()
+    resp.message(text)
+    return str(resp)
+
+# Built once: rejected requests are answered without touching the database or upstream
+RATE_LIMITED_TWIML = _twiml_message(
+    "You're sending messages too quickly. Please wait a minute and try again."
+)
+BUSY_TWIML = _twiml_message("We're busy right now. Please try again in a moment.")
+
+async def _build_webhook_reply(sender: str, message_text: str, received_at: float) -> str:
+    """Build the TwiML answering one inbound message."""
+    # Fast path: acknowledge now, reply through the REST API once the workers have built it.
+    # Falls through to an inline reply when the workers are off or their queue is full.
+    job = ReplyJob(from_number=sender, body=message_text, received_at=received_at)
+    if reply_workers.submit(job):
+        logger.info("Webhook acknowledged, reply deferred to workers")
+        return str(MessagingResponse())
+    
+    # Use consolidated message handler; blocking DB calls go through the database executor
+    db = next(get_db())
+    try:
+        start = time.perf_counter()
+        reply_text, message_type = await get_message_response_async(message_text, db)
+        _record_message_metrics(message_text, message_type, time.perf_counter() - start)
+    finally:
+        await run_db(db.close)
+
+    # Build TwiML safely via Twilio helper to avoid XML issues
+    safe_text = html.escape(reply_text)
+    resp = MessagingResponse()
+    resp.message(safe_text)
+
+    logger.info("Webhook processed and replying with TwiML, reply_length=%d", len(safe_text))
+    return str(resp)
+
+async def _read_webhook_form(request: Request) -> List[Tuple[str, str]]:
+    """Parse the webhook form once; the fields feed both signature validation and the handler."""
+    if request.headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
+        return parse_qsl((await request.body()).decode("utf-8"), keep_blank_values=True)
+    form = await request.form()
+    return [(name, value) for name, value in form.multi_items() if isinstance(value, str)]
+
+async def _admit_webhook(sender: str, message_text: str, received_at: float) -> str:
+    """Build the reply for a first delivery if the sender's rate and the concurrency cap allow it.
+
+    Raises AdmissionRejected with a prebuilt TwiML reply otherwise; nothing
+    touches the database or the upstream API before admission.
+    """
+    if not sender_limiter.try_acquire(sender):
+        webhook_admissions_total.labels(outcome="rate_limited").inc()
+        logger.info("Webhook from %s rate limited", sender)
+        raise AdmissionRejected("rate_limited", RATE_LIMITED_TWIML)
+    if not await webhook_concurrency.acquire():
+        webhook_admissions_total.labels(outcome="shed").inc()
+        logger.warning(
+            "Webhook from %s shed, %d requests waiting", sender, webhook_concurrency.waiting
+        )
+        raise AdmissionRejected("shed", BUSY_TWIML)
+    webhook_admissions_total.labels(outcome="admitted").inc()
+    try:
+        return await _build_webhook_reply(sender, message_text, received_at)
+    finally:
+        webhook_concurrency.release()
 
 @app.post("/webhook")
-async def webhook(request: Request, From: str = Form(...), Body: str = Form(...)):
-    logger.info(f"Webhook received from {From}, body length: {len(Body)}")
+async def webhook(request: Request):
+    received_at = time.time()
+    try:
+        fields = await _read_webhook_form(request)
+    except UnicodeDecodeError:
+        return Response(status_code=400, content="Form body must be UTF-8")
+    form = dict(fields)
+    sender, body = form.get("From"), form.get("Body")
+    if sender is None or body is None:
+        return Response(status_code=422, content="From and Body are required")
+    
+    logger.info("Webhook received from %s, body length: %d", sender, len(body))
     try:
         # Validate Twilio signature when credentials are configured
-        if auth_token:
-            try:
-                signature = request.headers.get("X-Twilio-Signature", "")
-                form_data = dict((await request.form()).items())
-                url = str(request.url)
-                validator = RequestValidator(auth_token)
-                if not validator.validate(url, form_data, signature):
-                    logger.warning("Twilio signature validation failed")
-                    return Response(status_code=403, content="Forbidden")
-            except Exception as e:
-                logger.exception(f"Signature validation error: {e}")
+        _refresh_twilio()
+        if signature_validator:
+            signature = request.headers.get("X-Twilio-Signature", "")
+            if not signature_validator.validate(str(request.url), fields, signature):
+                logger.warning("Twilio signature validation failed")
                 return Response(status_code=403, content="Forbidden")
 
-        message_text = Body.strip()
-        
-        # Use consolidated message handler
-        db = next(get_db())
-        try:
-            reply_text, message_type = get_message_response(message_text, db)
-            
-            # Update metrics based on message type
-            whatsapp_messages_total.labels(message_type=message_type).inc()
-            
-            # Update weather-specific metrics
-            if message_type == 'weather_success':
-                weather_requests_total.labels(city=message_text.strip(), status='success').inc()
-            elif message_type == 'weather_error':
-                weather_requests_total.labels(city=message_text.strip(), status='error').inc()
-                
-        finally:
-            db.close()
-
-        # Build TwiML safely via Twilio helper to avoid XML issues
-        safe_text = html.escape(reply_text)
-        resp = MessagingResponse()
-        resp.message(safe_text)
-
-        logger.info(f"Webhook processed and replying with TwiML, reply_length={len(safe_text)}")
-        return Response(content=str(resp), media_type="application/xml", status_code=200)
+        message_text = body.strip()
+        # Twilio retries slow deliveries with the same MessageSid; answer those from the
+        # first reply.
+        # Only first deliveries reach admission control, so retries never spend the sender's budget.
+        content = await webhook_dedup.run(
+            form.get("MessageSid"), lambda: _admit_webhook(sender, message_text, received_at)
+        )
+        return Response(content=content, media_type="application/xml", status_code=200)
 
+    except AdmissionRejected as rejected:
+        # Not cached by the deduplicator, so Twilio's retry of this message is admitted afresh
+        return Response(content=rejected.response, media_type="application/xml", status_code=200)
     except Exception as e:
         logger.exception(f"Webhook error: {str(e)}")
         return Response(status_code=500, content="Internal Server Error")
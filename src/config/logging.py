@@ -1,16 +1,190 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from prometheus_client import Counter
+
 from src.config.settings import settings
 
-def setup_logging():
-    logging.basicConfig(
-        level=getattr(logging, settings.log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
-    logger = logging.getLogger(__name__)
-    logger.info(f"Logging initialized with level: {settings.log_level}")
-    return logger
\ No newline at end of file
+log_records_dropped_total = Counter(
+    'log_records_dropped_total',
+    'Log records not written, by reason (sampled out or queue full)',
+    ['reason']
+)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Keyword arguments the stdlib logger understands; anything else is a structured field
+_LOGGING_KWARGS = frozenset(("exc_info", "stack_info", "stacklevel", "extra"))
+
+# Argument types that cannot change between the log call and the background write
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+_setup_lock = threading.Lock()
+_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger that accepts structured fields as keyword arguments.
+
+    logger.info("Message sent", to_number=..., message_sid=...) stores the
+    fields on the record; the JSON formatter emits them as keys and the text
+    formatter appends them as key=value.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, {})
+
+    def process(self, msg, kwargs):
+        if not kwargs:
+            return msg, kwargs
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _LOGGING_KWARGS}
+        if fields:
+            extra = dict(kwargs.get("extra") or {})
+            extra["fields"] = {**extra.get("fields", {}), **fields}
+            kwargs["extra"] = extra
+        return msg, kwargs
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(logging.getLogger(name))
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, fields and exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records per level; levels without a rate are always kept."""
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        if rate is None or rate >= 1 or random.random() < rate:
+            return True
+        log_records_dropped_total.labels(reason="sampled").inc()
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the background writer without formatting or blocking the caller.
+
+    Messages are formatted by the writer thread unless an argument is mutable
+    and could change before then. When the queue is full the record is dropped
+    and counted rather than stalling the request. Used with LOG_QUEUE_ENABLED.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not all(isinstance(arg, _IMMUTABLE_ARGS) for arg in _iter_args(args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.labels(reason="queue_full").inc()
+
+
+def _iter_args(args):
+    return args.values() if isinstance(args, dict) else args
+
+
+def _parse_sample_rates(spec: str) -> Dict[int, float]:
+    """Parse "DEBUG=0.01,INFO=0.5" into {logging.DEBUG: 0.01, logging.INFO: 0.5}."""
+    rates = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        level, rate = item.split("=", 1)
+        levelno = logging.getLevelName(level.strip().upper())
+        if isinstance(levelno, int):
+            rates[levelno] = float(rate)
+    return rates
+
+
+def setup_logging(name: str = __name__) -> StructuredLogger:
+    """Configure root logging once per process and return a structured logger for name.
+
+    Records are formatted as text, or JSON with LOG_FORMAT=json, and written
+    to stdout by the calling thread. With LOG_QUEUE_ENABLED they go through a
+    bounded queue to a background writer instead; that costs more per record
+    on a fast stdout but keeps request handlers from blocking on a slow or
+    backpressured one (see benchmarks/bench_logging.py). Safe to call from
+    every module.
+    """
+    global _handler, _listener
+    with _setup_lock:
+        if _handler is None:
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(
+                JsonFormatter() if settings.log_format == "json" else TextFormatter(TEXT_FORMAT)
+            )
+
+            if settings.log_queue_enabled:
+                _handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+                _listener = logging.handlers.QueueListener(_handler.queue, stream_handler)
+                _listener.start()
+                # Flush what is still queued when the process exits
+                atexit.register(shutdown_logging)
+            else:
+                _handler = stream_handler
+            sample_rates = _parse_sample_rates(settings.log_sample_rates)
+            if sample_rates:
+                _handler.addFilter(SamplingFilter(sample_rates))
+
+            root = logging.getLogger()
+            root.setLevel(getattr(logging, settings.log_level.upper()))
+            root.addHandler(_handler)
+            logging.getLogger(__name__).info(
+                "Logging initialized with level: %s, format: %s, queue: %s",
+                settings.log_level, settings.log_format, settings.log_queue_enabled
+            )
+    return get_logger(name)
+
+
+def shutdown_logging():
+    """Write out queued records and stop the background writer, if one is running."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -1,6 +1,5 @@
-import boto3
-import os
 import logging
+import threading
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -8,8 +7,19 @@ logger = logging.getLogger(__name__)
 class ParameterStoreClient:
     def __init__(self, region_name: str = "us-east-1"):
         self.region_name = region_name
-        self.client = boto3.client('ssm', region_name=region_name)
         self.prefix = "weather-bot"
+        self._client = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """SSM client, created on first use so importing this module does not import boto3."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import boto3
+                    self._client = boto3.client('ssm', region_name=self.region_name)
+        return self._client
     
     def get_parameter(self, parameter_name: str, with_decryption: bool = True) -> Optional[str]:
         """Get a parameter from AWS Parameter Store."""
@@ -44,5 +54,5 @@ class ParameterStoreClient:
             logger.error(f"Failed to get parameters {parameter_names}: {str(e)}")
             return {}
 
-# Global instance
+# Global instance (no AWS calls until a parameter is requested)
 parameter_store = ParameterStoreClient()
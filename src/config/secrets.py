@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EncryptedFileCache:
+    """Secrets persisted to a local file, encrypted with a Fernet key, for warm restarts.
+
+    Entries older than max_age seconds are ignored. The cryptography package is
+    imported lazily so it is only needed when a cache key is configured.
+    """
+
+    def __init__(self, path: str, key: str, max_age: float = 86400):
+        from cryptography.fernet import Fernet
+
+        self.path = path
+        self.max_age = max_age
+        self._fernet = Fernet(key.encode() if isinstance(key, str) else key)
+
+    def load(self) -> Optional[Dict[str, str]]:
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self.path, "rb") as f:
+                token = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read secrets cache {self.path}: {e}")
+            return None
+        try:
+            return json.loads(self._fernet.decrypt(token, ttl=int(self.max_age)))
+        except (InvalidToken, ValueError):
+            logger.warning(f"Ignoring expired or unreadable secrets cache {self.path}")
+            return None
+
+    def save(self, values: Dict[str, str]):
+        token = self._fernet.encrypt(json.dumps(values).encode())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".secrets-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(token)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write secrets cache {self.path}: {e}")
+
+
+class SecretStore:
+    """Secrets fetched lazily in one batch and refreshed in the background.
+
+    Nothing is fetched until the first get(). Values older than ttl seconds
+    are still returned while a background thread fetches new ones, so only
+    the very first lookup of a cold process waits on the loader, and not even
+    that when a disk cache holds a recent copy. A failed or empty fetch keeps
+    the previous values.
+    """
+
+    def __init__(self, names: List[str], loader: Callable[[List[str]], Dict[str, str]],
+                 ttl: float = 300, disk_cache: Optional[EncryptedFileCache] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.names = list(names)
+        self.ttl = ttl
+        self._loader = loader
+        self._disk_cache = disk_cache
+        self._clock = clock
+        self._values: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self, name: str) -> Optional[str]:
+        values = self._values
+        if values is None:
+            values = self._initial_load()
+        elif self.ttl > 0 and self._clock() - self._loaded_at >= self.ttl:
+            self._refresh_in_background()
+        return values.get(name)
+
+    def _initial_load(self) -> Dict[str, str]:
+        with self._lock:
+            if self._values is not None:
+                return self._values
+            cached = self._disk_cache.load() if self._disk_cache else None
+            if cached is not None:
+                # Serve the warm copy now and confirm it against the source right away
+                self._values, self._loaded_at = cached, self._clock() - self.ttl
+                logger.info("Loaded secrets from the local cache")
+            else:
+                self._values = self._fetch() or {}
+                self._loaded_at = self._clock()
+            return self._values
+
+    def _fetch(self) -> Optional[Dict[str, str]]:
+        start = time.perf_counter()
+        try:
+            values = self._loader(self.names)
+        except Exception as e:
+            logger.error(f"Failed to load secrets: {e}")
+            return None
+        if not values:
+            return None
+        logger.info(f"Loaded {len(values)} secrets in {time.perf_counter() - start:.2f}s")
+        if self._disk_cache:
+            self._disk_cache.save(values)
+        return values
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="secrets-refresh", daemon=True).start()
+
+    def refresh(self):
+        """Fetch all secrets now, keeping the current values if that fails."""
+        try:
+            values = self._fetch()
+            with self._lock:
+                if values is not None:
+                    self._values = values
+                # Failures also wait a full ttl before the next attempt
+                self._loaded_at = self._clock()
+        finally:
+            self._refreshing = False
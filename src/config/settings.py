@@ -1,6 +1,19 @@
+import logging
 import os
 from typing import Optional
 
+from .secrets import EncryptedFileCache, SecretStore
+
+logger = logging.getLogger(__name__)
+
+# Parameter Store names of the secrets and the environment variables they fall back to
+SECRET_ENV_VARS = {
+    "openweather-key": "WEATHER_API_KEY",
+    "account-sid": "TWILIO_ACCOUNT_SID",
+    "auth-token": "TWILIO_AUTH_TOKEN",
+    "whatsapp-from": "TWILIO_WHATSAPP_FROM",
+}
+
 class Settings:
     def __init__(self):
         self.database_url = os.getenv("DATABASE_URL", "sqlite:///./weather_bot.db")
@@ -8,39 +21,206 @@ class Settings:
         self.api_port = int(os.getenv("API_PORT", "8000"))
         self.debug = os.getenv("DEBUG", "false").lower() == "true"
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
+        # Text or json, optional per-level sampling ("DEBUG=0.01,INFO=0.5"); the background
+        # writer queue is only worth its overhead when stdout can block
+        self.log_format = os.getenv("LOG_FORMAT", "text").lower()
+        self.log_queue_enabled = os.getenv("LOG_QUEUE_ENABLED", "false").lower() == "true"
+        self.log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        self.log_sample_rates = os.getenv("LOG_SAMPLE_RATES", "")
+
+        # Startup warmup before the app reports ready
+        self.warmup_cities = [
+            city.strip() for city in os.getenv("WARMUP_CITIES", "").split(",") if city.strip()
+        ]
+        self.warmup_timeout = float(os.getenv("WARMUP_TIMEOUT", "30"))
+        self.warmup_db_connections = int(
+            os.getenv("WARMUP_DB_CONNECTIONS", os.getenv("DB_POOL_SIZE", "8"))
+        )
+
+        # Background dependency probes behind /health and /health/ready (seconds)
+        self.health_probe_interval = float(os.getenv("HEALTH_PROBE_INTERVAL", "10"))
+        self.health_probe_timeout = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+
+        # Weather cache (a TTL of 0 disables caching)
+        self.weather_cache_ttl = int(os.getenv("WEATHER_CACHE_TTL", "300"))
+        self.weather_cache_max_size = int(os.getenv("WEATHER_CACHE_MAX_SIZE", "1024"))
+        # Cache shared by all replicas: none, memory (single process) or redis
+        # (any Redis-protocol server)
+        self.cache_backend = os.getenv("CACHE_BACKEND", "none").lower()
+        self.cache_redis_url = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        self.cache_redis_timeout = float(os.getenv("CACHE_REDIS_TIMEOUT", "0.25"))
+
+        # Serve readings stored within this many seconds (by any replica) before going
+        # upstream; 0 disables
+        self.weather_db_freshness = int(os.getenv("WEATHER_DB_FRESHNESS_SECONDS", "300"))
+        # Seconds past the TTL a cached reading may still be served while it is refreshed
+        self.weather_cache_stale_ttl = int(os.getenv("WEATHER_CACHE_STALE_TTL", "300"))
+
+        # Local city gazetteer consulted before upstream lookups
+        self.city_index_enabled = os.getenv("CITY_INDEX_ENABLED", "true").lower() == "true"
+        self.city_gazetteer_path = os.getenv("CITY_GAZETTEER_PATH")
+        self.city_index_strict = os.getenv("CITY_INDEX_STRICT", "false").lower() == "true"
+
+        # Batch upstream lookups of cities with known IDs through the /group endpoint
+        self.weather_batch_enabled = os.getenv("WEATHER_BATCH_ENABLED", "false").lower() == "true"
+        self.weather_batch_size = int(os.getenv("WEATHER_BATCH_SIZE", "20"))
+        self.weather_batch_window = float(os.getenv("WEATHER_BATCH_WINDOW", "0.05"))
+        # Group calls are slower than single lookups, so they get their own read timeout
+        self.weather_batch_timeout = float(os.getenv("WEATHER_BATCH_TIMEOUT", "10"))
+        self.weather_city_id_cache_size = int(os.getenv("WEATHER_CITY_ID_CACHE_SIZE", "10000"))
+
+        # Background refresh of the most requested cities, ahead of cache expiry
+        self.weather_refresh_enabled = (
+            os.getenv("WEATHER_REFRESH_ENABLED", "true").lower() == "true"
+        )
+        self.weather_refresh_interval = float(os.getenv("WEATHER_REFRESH_INTERVAL", "30"))
+        self.weather_refresh_ahead = float(os.getenv("WEATHER_REFRESH_AHEAD", "0.8"))
+        self.weather_refresh_hot_cities = int(os.getenv("WEATHER_REFRESH_HOT_CITIES", "50"))
+        self.weather_refresh_min_requests = float(os.getenv("WEATHER_REFRESH_MIN_REQUESTS", "2"))
+        self.weather_refresh_budget = int(os.getenv("WEATHER_REFRESH_BUDGET", "20"))
+        self.weather_refresh_concurrency = int(os.getenv("WEATHER_REFRESH_CONCURRENCY", "4"))
+
+        # Upstream weather HTTP client (timeouts in seconds)
+        self.weather_http_timeout = float(os.getenv("WEATHER_HTTP_TIMEOUT", "10"))
+        self.weather_http_connect_timeout = float(os.getenv("WEATHER_HTTP_CONNECT_TIMEOUT", "3"))
+        self.weather_http_max_connections = int(os.getenv("WEATHER_HTTP_MAX_CONNECTIONS", "100"))
+        self.weather_http_max_keepalive = int(os.getenv("WEATHER_HTTP_MAX_KEEPALIVE", "20"))
+        # Read timeouts adapt to recent latency between these bounds
+        # (WEATHER_HTTP_TIMEOUT is the upper one)
+        self.weather_http_min_timeout = float(os.getenv("WEATHER_HTTP_MIN_TIMEOUT", "1"))
+        self.weather_timeout_percentile = float(os.getenv("WEATHER_TIMEOUT_PERCENTILE", "0.99"))
+        self.weather_timeout_multiplier = float(os.getenv("WEATHER_TIMEOUT_MULTIPLIER", "3"))
+        self.weather_hedge_enabled = os.getenv("WEATHER_HEDGE_ENABLED", "true").lower() == "true"
+        self.weather_hedge_percentile = float(os.getenv("WEATHER_HEDGE_PERCENTILE", "0.95"))
+        self.weather_breaker_failure_threshold = int(
+            os.getenv("WEATHER_BREAKER_FAILURE_THRESHOLD", "5")
+        )
+        self.weather_breaker_recovery_timeout = float(
+            os.getenv("WEATHER_BREAKER_RECOVERY_TIMEOUT", "30")
+        )
+
+        # Threads used for blocking database calls from async handlers
+        self.db_executor_workers = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+
+        # Database connection pool and SQLite production profile
+        pre_ping = os.getenv("DB_POOL_PRE_PING")
+        self.db_pool_pre_ping = None if pre_ping is None else pre_ping.lower() == "true"
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", "8"))
+        self.db_pool_max_overflow = int(os.getenv("DB_POOL_MAX_OVERFLOW", "8"))
+        self.sqlite_tuning = os.getenv("SQLITE_TUNING", "true").lower() == "true"
+        self.sqlite_busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+        self.sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+        # Negative values are KiB, so the default is a 64 MiB page cache per connection
+        self.sqlite_cache_size = int(os.getenv("SQLITE_CACHE_SIZE", str(-64 * 1024)))
+
+        # Write-behind persistence of weather readings
+        self.weather_writer_batch_size = int(os.getenv("WEATHER_WRITER_BATCH_SIZE", "100"))
+        self.weather_writer_flush_interval_ms = int(
+            os.getenv("WEATHER_WRITER_FLUSH_INTERVAL_MS", "500")
+        )
+        self.weather_writer_max_buffer = int(os.getenv("WEATHER_WRITER_MAX_BUFFER", "10000"))
+        self.weather_writer_block_timeout_ms = int(
+            os.getenv("WEATHER_WRITER_BLOCK_TIMEOUT_MS", "100")
+        )
+
+        # Retention of raw weather_data rows (granularity: hour, day or none to just delete)
+        self.retention_enabled = os.getenv("RETENTION_ENABLED", "false").lower() == "true"
+        self.retention_days = int(os.getenv("RETENTION_DAYS", "30"))
+        self.retention_granularity = os.getenv("RETENTION_GRANULARITY", "hour")
+        self.retention_batch_size = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+        self.retention_interval_seconds = int(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+        self.retention_vacuum_pages = int(os.getenv("RETENTION_VACUUM_PAGES", "1000"))
+
+        # Outbound WhatsApp delivery (queue backend: memory or database)
+        self.twilio_api_url = os.getenv("TWILIO_API_URL", "https://api.twilio.com")
+        self.outbound_queue_backend = os.getenv("OUTBOUND_QUEUE_BACKEND", "memory")
+        self.outbound_queue_max_size = int(os.getenv("OUTBOUND_QUEUE_MAX_SIZE", "10000"))
+        self.outbound_workers = int(os.getenv("OUTBOUND_WORKERS", "4"))
+        self.outbound_rate_per_second = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "10"))
+        self.outbound_burst = int(os.getenv("OUTBOUND_BURST", "20"))
+        self.outbound_max_attempts = int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "5"))
+        self.outbound_backoff_base_ms = int(os.getenv("OUTBOUND_BACKOFF_BASE_MS", "500"))
+        self.outbound_backoff_max_ms = int(os.getenv("OUTBOUND_BACKOFF_MAX_MS", "30000"))
+
+        # Fast-path webhook: acknowledge with empty TwiML and deliver the reply via the REST API
+        self.webhook_async_reply = os.getenv("WEBHOOK_ASYNC_REPLY", "false").lower() == "true"
+        self.reply_workers = int(os.getenv("REPLY_WORKERS", "8"))
+        self.reply_queue_max_size = int(os.getenv("REPLY_QUEUE_MAX_SIZE", "10000"))
+        # Replies remembered per MessageSid so Twilio retries are not processed twice
+        # (TTL 0 disables)
+        self.webhook_dedup_ttl = int(os.getenv("WEBHOOK_DEDUP_TTL", "900"))
+        self.webhook_dedup_max_size = int(os.getenv("WEBHOOK_DEDUP_MAX_SIZE", "20000"))
+        self.webhook_dedup_wait = float(os.getenv("WEBHOOK_DEDUP_WAIT", "10"))
+        # Webhook admission control: per-sender token buckets (rate 0 disables) and a global
+        # concurrency cap (0 disables) that sheds requests once too many are waiting
+        self.webhook_sender_rate_per_minute = float(
+            os.getenv("WEBHOOK_SENDER_RATE_PER_MINUTE", "10")
+        )
+        self.webhook_sender_burst = int(os.getenv("WEBHOOK_SENDER_BURST", "5"))
+        self.webhook_sender_max_tracked = int(os.getenv("WEBHOOK_SENDER_MAX_TRACKED", "100000"))
+        self.webhook_max_concurrency = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "64"))
+        self.webhook_max_queued = int(os.getenv("WEBHOOK_MAX_QUEUED", "128"))
+        self.webhook_queue_timeout = float(os.getenv("WEBHOOK_QUEUE_TIMEOUT", "5"))
+
+        # Prometheus label cardinality limits
+        self.metrics_city_allowlist = [
+            city.strip()
+            for city in os.getenv("METRICS_CITY_ALLOWLIST", "").split(",")
+            if city.strip()
+        ]
+        self.metrics_city_top_k = int(os.getenv("METRICS_CITY_TOP_K", "50"))
+        self.metrics_city_min_count = int(os.getenv("METRICS_CITY_MIN_COUNT", "5"))
+        self.metrics_max_series_per_metric = int(os.getenv("METRICS_MAX_SERIES_PER_METRIC", "500"))
+
+        # Secrets are resolved on first use; in AWS they come from Parameter Store in one batch
+        self.secrets_refresh_interval = float(os.getenv("SECRETS_REFRESH_INTERVAL", "300"))
+        self.secrets_cache_path = os.getenv("SECRETS_CACHE_PATH")
+        self.secrets_cache_key = os.getenv("SECRETS_CACHE_KEY")
+        self.secrets_cache_max_age = float(os.getenv("SECRETS_CACHE_MAX_AGE", "86400"))
+        self._secrets = self._secret_store()
+        
+    def _secret_store(self) -> Optional[SecretStore]:
+        """Parameter Store backed secrets in AWS (EKS), otherwise None (environment only)."""
+        if not (os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION")):
+            return None
         
-        # Try to get secrets from Parameter Store first (when running in AWS)
-        self._load_secrets()
+        def load(names):
+            from .parameter_store import parameter_store
+            return parameter_store.get_parameters(names)
         
-    def _load_secrets(self):
-        """Load secrets from environment variables or Parameter Store."""
-        # Check if we're running in AWS (EKS) by looking for AWS-specific environment variables
-        if os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION"):
+        disk_cache = None
+        if self.secrets_cache_path and self.secrets_cache_key:
             try:
-                from .parameter_store import parameter_store
-                secrets = parameter_store.get_parameters([
-                    "openweather-key",
-                    "account-sid", 
-                    "auth-token",
-                    "whatsapp-from"
-                ])
-                
-                self.weather_api_key = secrets.get("openweather-key") or os.getenv("WEATHER_API_KEY", "")
-                self.twilio_account_sid = secrets.get("account-sid") or os.getenv("TWILIO_ACCOUNT_SID", "")
-                self.twilio_auth_token = secrets.get("auth-token") or os.getenv("TWILIO_AUTH_TOKEN", "")
-                self.twilio_whatsapp_from = secrets.get("whatsapp-from") or os.getenv("TWILIO_WHATSAPP_FROM", "")
+                disk_cache = EncryptedFileCache(
+                    self.secrets_cache_path, self.secrets_cache_key,
+                    max_age=self.secrets_cache_max_age
+                )
             except Exception as e:
-                # Fallback to environment variables if Parameter Store fails
-                self.weather_api_key = os.getenv("WEATHER_API_KEY", "")
-                self.twilio_account_sid = os.getenv("TWILIO_ACCOUNT_SID", "")
-                self.twilio_auth_token = os.getenv("TWILIO_AUTH_TOKEN", "")
-                self.twilio_whatsapp_from = os.getenv("TWILIO_WHATSAPP_FROM", "")
-        else:
-            # Running locally, use environment variables
-            self.weather_api_key = os.getenv("WEATHER_API_KEY", "")
-            self.twilio_account_sid = os.getenv("TWILIO_ACCOUNT_SID", "")
-            self.twilio_auth_token = os.getenv("TWILIO_AUTH_TOKEN", "")
-            self.twilio_whatsapp_from = os.getenv("TWILIO_WHATSAPP_FROM", "")
+                logger.warning(f"Secrets cache disabled: {e}")
+        return SecretStore(
+            list(SECRET_ENV_VARS), load, ttl=self.secrets_refresh_interval, disk_cache=disk_cache
+        )
+    
+    def _secret(self, name: str) -> str:
+        # Parameter Store wins; environment variables are the fallback
+        value = self._secrets.get(name) if self._secrets else None
+        return value or os.getenv(SECRET_ENV_VARS[name], "")
+    
+    @property
+    def weather_api_key(self) -> str:
+        return self._secret("openweather-key")
+    
+    @property
+    def twilio_account_sid(self) -> str:
+        return self._secret("account-sid")
+    
+    @property
+    def twilio_auth_token(self) -> str:
+        return self._secret("auth-token")
+    
+    @property
+    def twilio_whatsapp_from(self) -> str:
+        return self._secret("whatsapp-from")
         
     def validate(self):
         if not self.weather_api_key:
@@ -1,3 +1,20 @@
-from .config import get_db, engine, Base, WeatherData, init_database, migrate_database, test_database_connection
+from .config import (
+    Base,
+    OutboundMessageRecord,
+    WeatherData,
+    WeatherDataAggregate,
+    engine,
+    get_db,
+    init_database,
+    migrate_database,
+    test_database_connection,
+    warm_connection_pool,
+)
+from .executor import db_executor, run_db
+from .writer import weather_writer
 
-__all__ = ["get_db", "engine", "Base", "WeatherData", "init_database", "migrate_database", "test_database_connection"]
+__all__ = [
+    "get_db", "engine", "Base", "WeatherData", "WeatherDataAggregate", "OutboundMessageRecord",
+    "init_database", "migrate_database", "test_database_connection", "warm_connection_pool",
+    "db_executor", "run_db", "weather_writer",
+]
@@ -1,9 +1,28 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, text
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
-from datetime import datetime, timezone
 import logging
 import os
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    create_engine,
+    event,
+    inspect,
+    text,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +51,60 @@ def get_database_url():
     
     return db_url
 
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Production SQLite profile, applied to every new pooled connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL lets readers run concurrently with the single writer; NORMAL sync is
+        # durable across app crashes and only fsyncs the WAL at checkpoints
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+def create_database_engine(database_url: str, sqlite_tuning: Optional[bool] = None,
+                           pool_pre_ping: Optional[bool] = None) -> Engine:
+    """Create an engine, applying the SQLite production profile for SQLite URLs."""
+    if sqlite_tuning is None:
+        sqlite_tuning = settings.sqlite_tuning
+    if pool_pre_ping is None:
+        pool_pre_ping = settings.db_pool_pre_ping
+    
+    if not database_url.startswith("sqlite") or not sqlite_tuning:
+        # Pre-ping guards against server-side disconnects, so it stays on by default here
+        return create_engine(
+            database_url, pool_pre_ping=True if pool_pre_ping is None else pool_pre_ping
+        )
+    
+    if database_url in ("sqlite://", "sqlite:///:memory:"):
+        # An in-memory database only exists on its one connection
+        sqlite_engine = create_engine(
+            database_url,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False}
+        )
+    else:
+        # A local file cannot drop connections, so pre-ping is just an extra round trip per
+        # checkout.
+        # The pool hands each connection to one thread at a time, so cross-thread use is safe.
+        sqlite_engine = create_engine(
+            database_url,
+            poolclass=QueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_pool_max_overflow,
+            pool_pre_ping=bool(pool_pre_ping),
+            connect_args={"check_same_thread": False}
+        )
+    
+    event.listen(sqlite_engine, "connect", _apply_sqlite_pragmas)
+    return sqlite_engine
+
 DATABASE_URL = get_database_url()
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+engine = create_database_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class WeatherData(Base):
@@ -41,11 +112,61 @@ class WeatherData(Base):
     
     id = Column(Integer, primary_key=True)
     city = Column(String(100), nullable=False)
+    # Normalized "city[,country]" lookup that produced the reading (the weather cache key)
+    lookup_key = Column(String(120))
     temperature = Column(Float, nullable=False)
     description = Column(String(200))
     humidity = Column(Integer)
     feels_like = Column(Float)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        # Serves per-city latest/history/stats lookups and keyset pagination
+        Index("ix_weather_data_city_created_at", "city", "created_at"),
+        # Serves the freshness lookup of the weather service's database tier
+        Index("ix_weather_data_lookup_key_created_at", "lookup_key", "created_at"),
+        # Serves cross-city time-window queries and retention scans
+        Index("ix_weather_data_created_at", "created_at"),
+    )
+
+class WeatherDataAggregate(Base):
+    """Downsampled weather_data readings, one row per city per hour or day bucket."""
+    __tablename__ = "weather_data_aggregates"
+    
+    id = Column(Integer, primary_key=True)
+    city = Column(String(100), nullable=False)
+    granularity = Column(String(10), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    readings = Column(Integer, nullable=False)
+    min_temperature = Column(Float, nullable=False)
+    max_temperature = Column(Float, nullable=False)
+    avg_temperature = Column(Float, nullable=False)
+    humidity_readings = Column(Integer, nullable=False, default=0)
+    avg_humidity = Column(Float)
+    
+    __table_args__ = (
+        UniqueConstraint(
+            "city", "granularity", "bucket_start", name="uq_weather_data_aggregates_bucket"
+        ),
+    )
+
+class OutboundMessageRecord(Base):
+    """Durable outbound WhatsApp message awaiting delivery by the outbound workers."""
+    __tablename__ = "outbound_messages"
+    
+    id = Column(Integer, primary_key=True)
+    to_number = Column(String(50), nullable=False)
+    from_number = Column(String(50))
+    body = Column(String(1600), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(500))
+    next_attempt_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        Index("ix_outbound_messages_status_next_attempt", "status", "next_attempt_at"),
+    )
 
 def get_db():
     db = SessionLocal()
@@ -58,11 +179,41 @@ def get_db():
     finally:
         db.close()
 
+def _create_schema():
+    # Create all tables
+    Base.metadata.create_all(bind=engine)
+    
+    # create_all skips existing tables, so add nullable columns and indexes introduced after
+    # a table was created
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            present = {column["name"] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    ))
+                    logger.info(f"Added column {table.name}.{column.name}")
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 def init_database():
     """Initialize database with proper error handling and migration support."""
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        for attempt in range(3):
+            try:
+                _create_schema()
+                break
+            except OperationalError as e:
+                # Several workers starting together race between checking for a table and
+                # creating it; the loser retries and then finds everything in place
+                raced = any(race in str(e) for race in ("already exists", "duplicate column"))
+                if not raced or attempt == 2:
+                    raise
+                logger.info("Schema was created concurrently by another process, checking again")
         
         # Verify database is working
         with engine.connect() as conn:
@@ -85,12 +236,25 @@ def migrate_database():
         logger.error(f"Database migration failed: {e}")
         raise e
 
+def warm_connection_pool(connections: int) -> int:
+    """Open up to connections pooled connections now, so first requests skip connect and pragmas."""
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
 def test_database_connection():
     try:
         with engine.connect() as conn:
             result = conn.execute(text("SELECT 1"))
             result.fetchone()
-        logger.info("Database connection test successful")
+        logger.debug("Database connection test successful")
         return True
     except Exception as e:
         logger.error(f"Database connection test failed: {e}")
@@ -0,0 +1,92 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from prometheus_client import Gauge
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+database_executor_queue_depth = Gauge(
+    'database_executor_queue_depth',
+    'Database calls waiting for a free executor thread'
+)
+
+database_executor_active = Gauge(
+    'database_executor_active',
+    'Database calls currently running on executor threads'
+)
+
+
+class DatabaseExecutor:
+    """Bounded thread pool that runs blocking SQLAlchemy work off the event loop."""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) on a database thread and await its result."""
+        with self._lock:
+            self._queued += 1
+        database_executor_queue_depth.inc()
+
+        try:
+            future = self._get_executor().submit(functools.partial(self._call, fn, *args, **kwargs))
+        except BaseException:
+            self._dequeue()
+            raise
+        # A call cancelled before a thread picks it up never reaches _call
+        future.add_done_callback(self._dequeue_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily so the executor can be restarted after shutdown
+        # (e.g. between app lifespans)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="db"
+                )
+            return self._executor
+
+    def _dequeue(self):
+        with self._lock:
+            self._queued -= 1
+        database_executor_queue_depth.dec()
+
+    def _dequeue_if_cancelled(self, future: Future):
+        if future.cancelled():
+            self._dequeue()
+
+    def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self._dequeue()
+        database_executor_active.inc()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            database_executor_active.dec()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            logger.info(f"Shutting down database executor, queued calls: {self._queued}")
+            executor.shutdown(wait=wait)
+
+
+db_executor = DatabaseExecutor(max_workers=settings.db_executor_workers)
+
+async def run_db(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await a blocking database call on the shared database executor."""
+    return await db_executor.run(fn, *args, **kwargs)
@@ -0,0 +1,129 @@
+import base64
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from .config import WeatherData
+
+
+def _as_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """created_at is stored as naive UTC, so normalize aware datetimes before comparing."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def encode_cursor(reading: WeatherData) -> str:
+    raw = f"{reading.created_at.isoformat()}|{reading.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a keyset cursor into (created_at, id). Raises ValueError when malformed."""
+    try:
+        created_at, reading_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(reading_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def get_latest_reading(db: Session, city: str,
+                       since: Optional[datetime] = None) -> Optional[WeatherData]:
+    """Latest reading for a city, optionally no older than since; one seek on (city, created_at)."""
+    query = select(WeatherData).where(WeatherData.city == city)
+    if since is not None:
+        query = query.where(WeatherData.created_at >= _as_utc_naive(since))
+    return db.execute(
+        query
+        .order_by(WeatherData.created_at.desc(), WeatherData.id.desc())
+        .limit(1)
+    ).scalars().first()
+
+def get_latest_reading_by_key(db: Session, lookup_key: str,
+                              since: Optional[datetime] = None) -> Optional[WeatherData]:
+    """Most recent reading stored for a weather cache key, optionally no older than since."""
+    query = select(WeatherData).where(WeatherData.lookup_key == lookup_key)
+    if since is not None:
+        query = query.where(WeatherData.created_at >= _as_utc_naive(since))
+    return db.execute(
+        query
+        .order_by(WeatherData.created_at.desc(), WeatherData.id.desc())
+        .limit(1)
+    ).scalars().first()
+
+def get_latest_readings(db: Session, limit: int = 100) -> List[WeatherData]:
+    """Most recent reading for each city, ordered by city name; ties on created_at go to the
+    highest id, as in get_latest_reading."""
+    ranked = select(
+        WeatherData.id,
+        func.row_number().over(
+            partition_by=WeatherData.city,
+            order_by=(WeatherData.created_at.desc(), WeatherData.id.desc())
+        ).label("rank")
+    ).subquery()
+    return list(db.execute(
+        select(WeatherData)
+        .join(ranked, and_(WeatherData.id == ranked.c.id, ranked.c.rank == 1))
+        .order_by(WeatherData.city)
+        .limit(limit)
+    ).scalars())
+
+def get_readings(db: Session, city: Optional[str] = None, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None, limit: int = 50,
+                 cursor: Optional[str] = None) -> Tuple[List[WeatherData], Optional[str]]:
+    """Readings in [start, end), newest first, paginated by a (created_at, id) keyset cursor.
+
+    Returns (readings, next_cursor); next_cursor is None on the last page.
+    """
+    query = select(WeatherData)
+    if city:
+        query = query.where(WeatherData.city == city)
+    if start:
+        query = query.where(WeatherData.created_at >= _as_utc_naive(start))
+    if end:
+        query = query.where(WeatherData.created_at < _as_utc_naive(end))
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(or_(
+            WeatherData.created_at < cursor_created_at,
+            and_(WeatherData.created_at == cursor_created_at, WeatherData.id < cursor_id)
+        ))
+
+    # Fetch one extra row to learn whether another page exists
+    readings = list(db.execute(
+        query.order_by(WeatherData.created_at.desc(), WeatherData.id.desc()).limit(limit + 1)
+    ).scalars())
+
+    next_cursor = None
+    if len(readings) > limit:
+        readings = readings[:limit]
+        next_cursor = encode_cursor(readings[-1])
+    return readings, next_cursor
+
+def get_city_stats(db: Session, city: str, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> Dict:
+    """Aggregate temperature and humidity for a city over [start, end)."""
+    query = select(
+        func.count(WeatherData.id),
+        func.min(WeatherData.temperature),
+        func.max(WeatherData.temperature),
+        func.avg(WeatherData.temperature),
+        func.avg(WeatherData.humidity),
+        func.min(WeatherData.created_at),
+        func.max(WeatherData.created_at),
+    ).where(WeatherData.city == city)
+    if start:
+        query = query.where(WeatherData.created_at >= _as_utc_naive(start))
+    if end:
+        query = query.where(WeatherData.created_at < _as_utc_naive(end))
+
+    count, min_temp, max_temp, avg_temp, avg_humidity, first_at, last_at = db.execute(query).one()
+    return {
+        "city": city,
+        "readings": count,
+        "min_temperature": min_temp,
+        "max_temperature": max_temp,
+        "avg_temperature": avg_temp,
+        "avg_humidity": avg_humidity,
+        "first_reading_at": first_at,
+        "last_reading_at": last_at,
+    }
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import delete, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from src.config.settings import settings
+
+from .config import SessionLocal, WeatherData, WeatherDataAggregate, engine
+from .executor import run_db
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day", "none")
+
+retention_rows_deleted_total = Counter(
+    'retention_rows_deleted_total',
+    'Raw weather_data rows removed by the retention job'
+)
+
+retention_batch_duration = Histogram(
+    'retention_batch_duration_seconds',
+    'Duration of one retention batch transaction'
+)
+
+
+def bucket_start(created_at: datetime, granularity: str) -> datetime:
+    start = created_at.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        start = start.replace(hour=0)
+    return start
+
+def _aggregate(rows: List[WeatherData], granularity: str) -> Dict[Tuple[str, datetime], Dict]:
+    buckets: Dict[Tuple[str, datetime], Dict] = {}
+    for row in rows:
+        key = (row.city, bucket_start(row.created_at, granularity))
+        bucket = buckets.setdefault(key, {
+            "readings": 0, "temperature_sum": 0.0,
+            "min_temperature": row.temperature, "max_temperature": row.temperature,
+            "humidity_readings": 0, "humidity_sum": 0.0,
+        })
+        bucket["readings"] += 1
+        bucket["temperature_sum"] += row.temperature
+        bucket["min_temperature"] = min(bucket["min_temperature"], row.temperature)
+        bucket["max_temperature"] = max(bucket["max_temperature"], row.temperature)
+        if row.humidity is not None:
+            bucket["humidity_readings"] += 1
+            bucket["humidity_sum"] += row.humidity
+    return buckets
+
+def _merge_aggregates(db: Session, buckets: Dict[Tuple[str, datetime], Dict],
+                      granularity: str) -> int:
+    """Fold batch buckets into weather_data_aggregates, merging with earlier batches' buckets."""
+    existing = {
+        (agg.city, agg.bucket_start): agg
+        for agg in db.execute(
+            select(WeatherDataAggregate).where(
+                WeatherDataAggregate.granularity == granularity,
+                tuple_(
+                    WeatherDataAggregate.city, WeatherDataAggregate.bucket_start
+                ).in_(list(buckets))
+            )
+        ).scalars()
+    }
+
+    for (city, start), bucket in buckets.items():
+        agg = existing.get((city, start))
+        if agg is None:
+            agg = WeatherDataAggregate(
+                city=city, granularity=granularity, bucket_start=start,
+                readings=0, min_temperature=bucket["min_temperature"],
+                max_temperature=bucket["max_temperature"], avg_temperature=0.0,
+                humidity_readings=0
+            )
+            db.add(agg)
+
+        readings = agg.readings + bucket["readings"]
+        temperature_sum = agg.avg_temperature * agg.readings + bucket["temperature_sum"]
+        agg.avg_temperature = temperature_sum / readings
+        agg.min_temperature = min(agg.min_temperature, bucket["min_temperature"])
+        agg.max_temperature = max(agg.max_temperature, bucket["max_temperature"])
+        agg.readings = readings
+
+        humidity_readings = agg.humidity_readings + bucket["humidity_readings"]
+        if humidity_readings:
+            agg.avg_humidity = (
+                (agg.avg_humidity or 0.0) * agg.humidity_readings + bucket["humidity_sum"]
+            ) / humidity_readings
+        agg.humidity_readings = humidity_readings
+
+    return len(buckets)
+
+def run_retention_batch(cutoff: datetime, granularity: str, batch_size: int,
+                        session_factory=SessionLocal) -> Tuple[int, int]:
+    """Downsample and delete up to batch_size rows older than cutoff in one short transaction.
+
+    Returns (rows_deleted, aggregate_buckets_touched).
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown retention granularity: {granularity}")
+
+    start = time.perf_counter()
+    db = session_factory()
+    try:
+        rows = list(db.execute(
+            select(WeatherData)
+            .where(WeatherData.created_at < cutoff)
+            .order_by(WeatherData.created_at, WeatherData.id)
+            .limit(batch_size)
+        ).scalars())
+        if not rows:
+            return 0, 0
+
+        touched = 0
+        if granularity != "none":
+            touched = _merge_aggregates(db, _aggregate(rows, granularity), granularity)
+
+        db.execute(
+            delete(WeatherData).where(WeatherData.id.in_([row.id for row in rows])),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+
+        retention_rows_deleted_total.inc(len(rows))
+        return len(rows), touched
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        retention_batch_duration.observe(time.perf_counter() - start)
+
+def compact_database(vacuum_pages: int, allow_full_vacuum: bool = False):
+    """Reclaim free pages incrementally and refresh planner statistics (SQLite only).
+
+    Incremental vacuum needs auto_vacuum=INCREMENTAL, which an existing database
+    only picks up after one full VACUUM; that is only run when allow_full_vacuum
+    is set, since it rewrites the whole file under an exclusive lock.
+    """
+    if engine.dialect.name != "sqlite":
+        logger.info("Skipping compaction, only supported for SQLite")
+        return
+
+    with engine.connect() as conn:
+        auto_vacuum = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+        if auto_vacuum != 2:
+            if allow_full_vacuum:
+                logger.info("Enabling incremental auto_vacuum with a one-off full VACUUM")
+                conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+                conn.execute(text("VACUUM"))
+            else:
+                logger.warning(
+                    "auto_vacuum is not INCREMENTAL; run the retention CLI with --full-vacuum once"
+                )
+        else:
+            conn.execute(text(f"PRAGMA incremental_vacuum({int(vacuum_pages)})"))
+
+        # Bounded, sampled ANALYZE of whatever tables changed enough to need it
+        conn.execute(text("PRAGMA analysis_limit = 400"))
+        conn.execute(text("PRAGMA optimize"))
+        conn.commit()
+
+def run_retention(retention_days: int, granularity: str, batch_size: int,
+                  vacuum_pages: int = 0, allow_full_vacuum: bool = False,
+                  max_batches: Optional[int] = None) -> Dict:
+    """Apply retention until no rows older than retention_days remain, then compact."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).replace(tzinfo=None)
+    logger.info(
+        f"Running retention: cutoff={cutoff.isoformat()}, granularity={granularity}, "
+        f"batch_size={batch_size}"
+    )
+
+    deleted = touched = batches = 0
+    while max_batches is None or batches < max_batches:
+        batch_deleted, batch_touched = run_retention_batch(cutoff, granularity, batch_size)
+        if not batch_deleted:
+            break
+        deleted += batch_deleted
+        touched += batch_touched
+        batches += 1
+
+    if vacuum_pages or allow_full_vacuum:
+        compact_database(vacuum_pages, allow_full_vacuum)
+
+    logger.info(
+        f"Retention completed: {deleted} rows removed in {batches} batches, "
+        f"{touched} aggregate buckets updated"
+    )
+    return {"rows_deleted": deleted, "aggregates_updated": touched, "batches": batches}
+
+async def retention_loop(interval_seconds: int = None):
+    """Background task: apply retention periodically, one batch per database executor call."""
+    interval_seconds = interval_seconds or settings.retention_interval_seconds
+    while True:
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=settings.retention_days)
+            cutoff = cutoff.replace(tzinfo=None)
+            deleted = 0
+            while True:
+                batch_deleted, _ = await run_db(
+                    run_retention_batch, cutoff,
+                    settings.retention_granularity, settings.retention_batch_size
+                )
+                deleted += batch_deleted
+                if batch_deleted < settings.retention_batch_size:
+                    break
+                # Let request writes in between batches
+                await asyncio.sleep(0.05)
+
+            if deleted:
+                await run_db(compact_database, settings.retention_vacuum_pages)
+            logger.info(f"Retention pass removed {deleted} rows")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Retention pass failed: {e}")
+
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,167 @@
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import insert
+
+from src.config.settings import settings
+
+from .config import SessionLocal, WeatherData
+
+logger = logging.getLogger(__name__)
+
+weather_writer_flush_size = Histogram(
+    'weather_writer_flush_size',
+    'Rows written per write-behind flush',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+
+weather_writer_flush_duration = Histogram(
+    'weather_writer_flush_duration_seconds',
+    'Write-behind flush duration'
+)
+
+weather_writer_buffered = Gauge(
+    'weather_writer_buffered_rows',
+    'Rows waiting in the write-behind buffer'
+)
+
+weather_writer_dropped_total = Counter(
+    'weather_writer_dropped_total',
+    'Rows dropped by the write-behind buffer',
+    ['reason']
+)
+
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    """Collects weather_data rows and flushes them with one bulk insert per batch.
+
+    A background thread flushes whenever batch_size rows are buffered or
+    flush_interval seconds have passed since the first buffered row. The
+    buffer is bounded; producers wait up to block_timeout seconds for room
+    and the row is dropped after that.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_buffer: int,
+                 block_timeout: float, session_factory=SessionLocal):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self._session_factory = session_factory
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_buffer)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def submit(self, row: Dict) -> bool:
+        """Buffer a row, blocking up to block_timeout when the buffer is full."""
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.block_timeout)
+        except queue.Full:
+            return self._drop(row)
+        weather_writer_buffered.inc()
+        return True
+
+    async def submit_async(self, row: Dict) -> bool:
+        """Buffer a row, yielding to the event loop instead of blocking while the buffer is full."""
+        self._ensure_started()
+        deadline = time.monotonic() + self.block_timeout
+        while True:
+            try:
+                self._queue.put_nowait(row)
+                weather_writer_buffered.inc()
+                return True
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    return self._drop(row)
+                await asyncio.sleep(0.005)
+
+    def _drop(self, row: Dict) -> bool:
+        weather_writer_dropped_total.labels(reason='buffer_full').inc()
+        logger.warning(f"Write-behind buffer full, dropping weather reading for {row.get('city')}")
+        return False
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="weather-writer", daemon=True
+                )
+                self._thread.start()
+                if not self._atexit_registered:
+                    # Scripts using the sync API have no lifespan to flush on exit
+                    atexit.register(self.stop)
+                    self._atexit_registered = True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch: List[Dict] = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+    def _flush(self, batch: List[Dict]):
+        weather_writer_buffered.dec(len(batch))
+        start = time.perf_counter()
+        session = self._session_factory()
+        try:
+            session.execute(insert(WeatherData), batch)
+            session.commit()
+            weather_writer_flush_size.observe(len(batch))
+            logger.debug(f"Flushed {len(batch)} weather readings")
+        except Exception as e:
+            session.rollback()
+            weather_writer_dropped_total.labels(reason='flush_error').inc(len(batch))
+            logger.error(f"Failed to flush {len(batch)} weather readings: {e}")
+        finally:
+            session.close()
+            weather_writer_flush_duration.observe(time.perf_counter() - start)
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything buffered and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None or not thread.is_alive():
+            return
+        # Blocks until there is room so the stop marker lands behind every buffered row
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("Write-behind writer did not finish flushing before timeout")
+        else:
+            logger.info("Write-behind writer flushed and stopped")
+
+
+weather_writer = WriteBehindBuffer(
+    batch_size=settings.weather_writer_batch_size,
+    flush_interval=settings.weather_writer_flush_interval_ms / 1000,
+    max_buffer=settings.weather_writer_max_buffer,
+    block_timeout=settings.weather_writer_block_timeout_ms / 1000
+)
@@ -1,3 +1,13 @@
-from .schemas import WeatherRequest, WeatherResponse, ErrorResponse
+from .schemas import (
+    CityWeatherStats,
+    ErrorResponse,
+    WeatherHistoryPage,
+    WeatherReading,
+    WeatherRequest,
+    WeatherResponse,
+)
 
-__all__ = ["WeatherRequest", "WeatherResponse", "ErrorResponse"]
+__all__ = [
+    "WeatherRequest", "WeatherResponse", "WeatherReading", "WeatherHistoryPage",
+    "CityWeatherStats", "ErrorResponse",
+]
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
 
 class WeatherRequest(BaseModel):
     city: str = Field(..., min_length=1, max_length=100, description="City name")
@@ -22,6 +24,31 @@ class WeatherResponse(BaseModel):
     feels_like: Optional[float] = None
     created_at: datetime
 
+class WeatherReading(BaseModel):
+    id: int
+    city: str
+    temperature: float
+    description: Optional[str] = None
+    humidity: Optional[int] = None
+    feels_like: Optional[float] = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+class WeatherHistoryPage(BaseModel):
+    items: List[WeatherReading]
+    next_cursor: Optional[str] = None
+
+class CityWeatherStats(BaseModel):
+    city: str
+    readings: int
+    min_temperature: Optional[float] = None
+    max_temperature: Optional[float] = None
+    avg_temperature: Optional[float] = None
+    avg_humidity: Optional[float] = None
+    first_reading_at: Optional[datetime] = None
+    last_reading_at: Optional[datetime] = None
+
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+upstream_batch_size = Histogram(
+    'upstream_batch_size',
+    'Keys fetched per batched upstream call',
+    ['batcher'],
+    buckets=(1, 2, 5, 10, 15, 20, 50)
+)
+
+
+class GroupBatcher:
+    """Collects keys requested within a short window and fetches them with one call.
+
+    A batch is sent when it reaches max_batch keys or window seconds after its
+    first key arrived, whichever comes first. fetch_many receives the list of
+    keys and returns a dict of results; keys missing from it resolve to None.
+    Callers for the same key within one window share a single slot.
+    """
+
+    def __init__(self, fetch_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+                 max_batch: int = 20, window: float = 0.05, name: str = "default"):
+        self.fetch_many = fetch_many
+        self.max_batch = max_batch
+        self.window = window
+        self.name = name
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def get(self, key: Hashable) -> Any:
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        # Shield so one cancelled caller does not fail the whole batch
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]):
+        upstream_batch_size.labels(batcher=self.name).observe(len(batch))
+        try:
+            results = await self.fetch_many(list(batch))
+        except Exception as e:
+            logger.error(f"Batched fetch of {len(batch)} keys failed: {e}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark retrieved in case every caller was cancelled
+                    future.exception()
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
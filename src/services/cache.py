@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+cache_hits_total = Counter(
+    'cache_hits_total',
+    'Total cache hits',
+    ['cache']
+)
+
+cache_misses_total = Counter(
+    'cache_misses_total',
+    'Total cache misses',
+    ['cache']
+)
+
+cache_stale_hits_total = Counter(
+    'cache_stale_hits_total',
+    'Cache lookups served from an expired entry still inside the staleness window',
+    ['cache']
+)
+
+cache_evictions_total = Counter(
+    'cache_evictions_total',
+    'Total cache evictions',
+    ['cache', 'reason']
+)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire a fixed number of seconds after being set.
+
+    With stale_ttl > 0, expired entries are kept for that many extra seconds so
+    get_entry can serve them while a refresh runs (stale-while-revalidate).
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "default",
+                 clock: Callable[[], float] = time.monotonic, stale_ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if it is missing or expired."""
+        entry = self.get_entry(key, allow_stale=False)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: Hashable, allow_stale: bool = True) -> Optional[Tuple[Any, float]]:
+        """Return (value, age_seconds) for key, including stale entries when allow_stale is set."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                cache_misses_total.labels(cache=self.name).inc()
+                return None
+
+            stored_at, value = entry
+            age = self._clock() - stored_at
+            if age >= self.ttl + self.stale_ttl:
+                del self._data[key]
+                cache_evictions_total.labels(cache=self.name, reason='expired').inc()
+                cache_misses_total.labels(cache=self.name).inc()
+                return None
+            if age >= self.ttl:
+                if not allow_stale:
+                    cache_misses_total.labels(cache=self.name).inc()
+                    return None
+                cache_stale_hits_total.labels(cache=self.name).inc()
+            else:
+                cache_hits_total.labels(cache=self.name).inc()
+
+            self._data.move_to_end(key)
+            return value, age
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Seconds since key was set, or None if absent. Does not count as a lookup."""
+        with self._lock:
+            entry = self._data.get(key)
+        return self._clock() - entry[0] if entry else None
+
+    def set(self, key: Hashable, value: Any, age: float = 0) -> None:
+        """Store value under key, evicting the least recently used entry when full.
+
+        age backdates the entry, for values that were already cached elsewhere.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._data[key] = (self._clock() - age, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                cache_evictions_total.labels(cache=self.name, reason='size').inc()
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PopularityTracker:
+    """Approximate, decaying request counts per key in bounded memory.
+
+    Uses Space-Saving replacement when full; decay() ages counts so the
+    ranking follows recent traffic.
+    """
+
+    def __init__(self, max_keys: int = 1000):
+        self.max_keys = max_keys
+        self._counts: Dict[Hashable, float] = {}
+        self._meta: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable, meta: Any = None):
+        with self._lock:
+            if key in self._counts:
+                self._counts[key] += 1
+            elif len(self._counts) < self.max_keys:
+                self._counts[key] = 1
+            else:
+                victim = min(self._counts, key=self._counts.__getitem__)
+                self._counts[key] = self._counts.pop(victim) + 1
+                self._meta.pop(victim, None)
+            self._meta[key] = meta
+
+    def top(self, n: int, min_count: float = 1) -> List[Tuple[Hashable, Any]]:
+        """The n most requested keys with their metadata, most popular first."""
+        with self._lock:
+            ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+            return [(key, self._meta.get(key)) for key, count in ranked[:n] if count >= min_count]
+
+    def decay(self, factor: float = 0.5):
+        with self._lock:
+            for key in list(self._counts):
+                self._counts[key] *= factor
+                if self._counts[key] < 0.1:
+                    del self._counts[key]
+                    self._meta.pop(key, None)
@@ -0,0 +1,231 @@
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_PATH = Path(__file__).parent.parent / "data" / "cities.tsv"
+
+# Shorter queries match too many unrelated names at edit distance one
+MIN_FUZZY_LENGTH = 4
+MIN_PREFIX_LENGTH = 3
+MAX_PREFIX_SCAN = 200
+
+
+class CityMatch(NamedTuple):
+    name: str
+    country: str
+    population: int
+
+
+class UnknownCityError(ValueError):
+    """Raised when a city is not in the gazetteer; carries the closest known cities."""
+
+    def __init__(self, city: str, suggestions: List[CityMatch]):
+        super().__init__(f"Unknown city: {city}")
+        self.city = city
+        self.suggestions = suggestions
+
+
+def normalize_name(name: str) -> str:
+    """Lookup key: accents stripped, casefolded, punctuation and repeated spaces collapsed."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return " ".join("".join(char if char.isalnum() else " " for char in folded).split())
+
+
+def parse_city_query(text: str) -> Tuple[str, Optional[str]]:
+    """Split "Paris, FR" into ("Paris", "FR"); the country part must be a 2-letter code."""
+    city, sep, country = text.rpartition(",")
+    country = country.strip()
+    if sep and city.strip() and len(country) == 2 and country.isalpha():
+        return city.strip(), country.upper()
+    return text.strip(), None
+
+
+def _deletes(key: str) -> List[str]:
+    return [key[:i] + key[i + 1:] for i in range(len(key))]
+
+
+class CityIndex:
+    """In-memory gazetteer with O(1) exact lookup and edit-distance-one suggestions.
+
+    Cities live in parallel arrays. Each normalized name or alias maps to a
+    slice of city indexes ordered by population, so ambiguous names resolve
+    to the largest city unless a country is given. Fuzzy matching uses
+    symmetric deletes: the hash of every single-character deletion of every
+    key is kept in a sorted int64 array, searched with bisect.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, int, Iterable[str]]]):
+        names: List[str] = []
+        countries = bytearray()
+        populations = array("Q")
+        members_by_key = {}
+
+        for name, country, population, aliases in rows:
+            index = len(names)
+            names.append(name)
+            countries += country.upper().encode("ascii")[:2].ljust(2)
+            populations.append(population)
+            for key in {normalize_name(name), *(normalize_name(alias) for alias in aliases)}:
+                if key:
+                    members_by_key.setdefault(key, []).append(index)
+
+        self._names = names
+        self._countries = bytes(countries)
+        self._populations = populations
+        self._keys = sorted(members_by_key)
+        self._key_ids = {key: i for i, key in enumerate(self._keys)}
+
+        # CSR layout: members of key i are _members[_offsets[i]:_offsets[i + 1]]
+        self._offsets = array("I", [0])
+        self._members = array("I")
+        for key in self._keys:
+            members = sorted(members_by_key[key], key=lambda i: -populations[i])
+            self._members.extend(members)
+            self._offsets.append(len(self._members))
+
+        pairs = sorted(
+            (hash(deleted), key_id)
+            for key_id, key in enumerate(self._keys)
+            if len(key) >= MIN_FUZZY_LENGTH
+            for deleted in set(_deletes(key))
+        )
+        self._delete_hashes = array("q", (h for h, _ in pairs))
+        self._delete_keys = array("I", (key_id for _, key_id in pairs))
+
+    @classmethod
+    def load(cls, path: Path) -> "CityIndex":
+        """Load a name<TAB>country<TAB>population<TAB>aliases file (scripts/build-gazetteer.py)."""
+        def rows():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("#") or not line.strip():
+                        continue
+                    name, country, population, *rest = line.rstrip("\n").split("\t")
+                    aliases = rest[0].split(",") if rest and rest[0] else []
+                    yield name, country, int(population or 0), aliases
+
+        return cls(rows())
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _match(self, index: int) -> CityMatch:
+        return CityMatch(
+            self._names[index],
+            self._countries[2 * index:2 * index + 2].decode("ascii").strip(),
+            self._populations[index]
+        )
+
+    def _cities_for_key(self, key_id: int, country: Optional[str]) -> List[CityMatch]:
+        members = self._members[self._offsets[key_id]:self._offsets[key_id + 1]]
+        matches = [self._match(i) for i in members]
+        if country:
+            matches = [match for match in matches if match.country == country.upper()]
+        return matches
+
+    def lookup(self, name: str, country: Optional[str] = None) -> List[CityMatch]:
+        """Cities whose name or alias matches exactly, largest first."""
+        key_id = self._key_ids.get(normalize_name(name))
+        if key_id is None:
+            return []
+        return self._cities_for_key(key_id, country)
+
+    def suggest(self, name: str, country: Optional[str] = None, limit: int = 3) -> List[CityMatch]:
+        """Closest known cities: names one edit away, then names starting with the query."""
+        key = normalize_name(name)
+        key_ids = set()
+
+        if len(key) >= MIN_FUZZY_LENGTH - 1:
+            for candidate in [key, *_deletes(key)]:
+                # Query deletion equals a key (an extra character was typed)
+                if candidate != key and candidate in self._key_ids:
+                    key_ids.add(self._key_ids[candidate])
+                # Query (or its deletion) equals a key deletion (missing or wrong character)
+                h = hash(candidate)
+                i = bisect.bisect_left(self._delete_hashes, h)
+                while i < len(self._delete_hashes) and self._delete_hashes[i] == h:
+                    key_ids.add(self._delete_keys[i])
+                    i += 1
+        key_ids.discard(self._key_ids.get(key))
+
+        fuzzy = self._ranked(key_ids, country)
+        if len(fuzzy) >= limit or len(key) < MIN_PREFIX_LENGTH:
+            return fuzzy[:limit]
+
+        start = bisect.bisect_left(self._keys, key)
+        prefix_ids = set()
+        for key_id in range(start, min(start + MAX_PREFIX_SCAN, len(self._keys))):
+            if not self._keys[key_id].startswith(key):
+                break
+            prefix_ids.add(key_id)
+        prefix_ids -= key_ids
+        prefix_ids.discard(self._key_ids.get(key))
+
+        seen = set(fuzzy)
+        prefixed = [match for match in self._ranked(prefix_ids, country) if match not in seen]
+        return (fuzzy + prefixed)[:limit]
+
+    def _ranked(self, key_ids: Iterable[int], country: Optional[str]) -> List[CityMatch]:
+        matches = {match for key_id in key_ids for match in self._cities_for_key(key_id, country)}
+        return sorted(matches, key=lambda match: -match.population)
+
+    def resolve(self, text: str, strict: bool = False) -> Tuple[str, Optional[str]]:
+        """Map user input to the (city, country) to query upstream.
+
+        Known cities resolve to their gazetteer name, keeping the country only
+        when the user gave one; without it the upstream API picks the largest
+        city just like the index does. The gazetteer only holds larger cities,
+        so unknown input passes through unchanged for the upstream API to
+        decide, unless strict is set, in which case it raises UnknownCityError
+        with the closest known cities.
+        """
+        city, country = parse_city_query(text)
+        matches = self.lookup(city, country)
+        if matches:
+            return matches[0].name, country
+        if strict:
+            raise UnknownCityError(city, self.suggest(city, country))
+        return city, country
+
+
+_city_index: Optional[CityIndex] = None
+_city_index_lock = threading.Lock()
+_city_index_failed = False
+
+
+def get_city_index() -> Optional[CityIndex]:
+    """The shared gazetteer index, or None until load_city_index has finished (or when disabled).
+
+    Never loads the file itself, so it is safe to call from request handlers.
+    """
+    return _city_index
+
+
+def load_city_index() -> Optional[CityIndex]:
+    """Load the shared gazetteer index once; blocking, so call it at startup or in a thread."""
+    global _city_index, _city_index_failed
+    if not settings.city_index_enabled:
+        return None
+
+    with _city_index_lock:
+        if _city_index is None and not _city_index_failed:
+            path = Path(settings.city_gazetteer_path or DEFAULT_GAZETTEER_PATH)
+            start = time.perf_counter()
+            try:
+                _city_index = CityIndex.load(path)
+                elapsed = time.perf_counter() - start
+                logger.info(f"Loaded {len(_city_index)} cities from {path} in {elapsed:.2f}s")
+            except OSError as e:
+                _city_index_failed = True
+                logger.warning(f"City index unavailable, sending all city names upstream: {e}")
+    return _city_index
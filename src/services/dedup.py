@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from prometheus_client import Counter
+
+from src.services.cache import TTLCache
+from src.services.shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+webhook_duplicates_total = Counter(
+    'webhook_duplicates_total',
+    'Webhook retries answered with the reply already built for their MessageSid',
+    ['source']
+)
+
+
+class WebhookDeduplicator:
+    """Answer Twilio webhook retries with the reply built for the first delivery.
+
+    Replies are kept per MessageSid for ttl seconds in a bounded LRU, so a
+    retry costs one dict lookup. A retry that arrives while the first delivery
+    is still being processed waits for its reply instead of starting a second
+    lookup. With a shared cache, replicas also claim each MessageSid there and
+    share the finished replies; a retry whose claim holder has not answered
+    within wait seconds is processed again rather than dropped. Failed
+    deliveries are forgotten so Twilio's next retry is processed normally.
+    """
+
+    PENDING = ""
+
+    def __init__(self, ttl: float, maxsize: int, shared: Optional[SharedCache] = None,
+                 wait: float = 10.0, poll_interval: float = 0.1):
+        self.ttl = ttl
+        self.shared = shared
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self._replies = TTLCache(maxsize=maxsize, ttl=ttl, name="webhook_replies")
+
+    @property
+    def enabled(self) -> bool:
+        return self._replies.enabled
+
+    async def run(self, message_sid: Optional[str], process: Callable[[], Awaitable[str]]) -> str:
+        """Return the reply for message_sid, calling process() only for its first delivery."""
+        if not message_sid or not self.enabled:
+            return await process()
+
+        entry = self._replies.get(message_sid)
+        if entry is not None:
+            reply = await asyncio.shield(entry) if isinstance(entry, asyncio.Future) else entry
+            if reply is not None:
+                webhook_duplicates_total.labels(source="local").inc()
+                logger.info("Duplicate webhook %s answered from the reply cache", message_sid)
+                return reply
+            # The first delivery failed; process this one as a fresh delivery
+            return await process()
+
+        pending = asyncio.get_running_loop().create_future()
+        self._replies.set(message_sid, pending)
+        reply = None
+        try:
+            reply = await self._shared_reply(message_sid) if self.shared else None
+            if reply is not None:
+                webhook_duplicates_total.labels(source="shared").inc()
+                logger.info("Duplicate webhook %s answered by another replica's reply", message_sid)
+            else:
+                reply = await process()
+                if self.shared:
+                    await asyncio.to_thread(self.shared.set, message_sid, reply)
+            self._replies.set(message_sid, reply)
+            return reply
+        finally:
+            if reply is None:
+                self._replies.pop(message_sid)
+                if self.shared:
+                    await asyncio.to_thread(self.shared.delete, message_sid)
+            pending.set_result(reply)
+
+    async def _shared_reply(self, message_sid: str) -> Optional[str]:
+        """Claim message_sid across replicas; return another replica's reply if it owns it."""
+        if await asyncio.to_thread(self.shared.add, message_sid, self.PENDING, self.ttl):
+            return None
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait
+        while True:
+            found = await asyncio.to_thread(self.shared.get, message_sid)
+            if found is None:
+                # The claim holder failed and released it
+                return None
+            if found[0] != self.PENDING:
+                return found[0]
+            if loop.time() >= deadline:
+                logger.warning(
+                    f"No reply for webhook {message_sid} from another replica after {self.wait}s"
+                )
+                return None
+            await asyncio.sleep(self.poll_interval)
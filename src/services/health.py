@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+health_probe_duration = Histogram(
+    'health_probe_duration_seconds',
+    'Latency of background dependency health probes',
+    ['dependency'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+health_probe_up = Gauge(
+    'health_probe_up',
+    'Result of the last health probe per dependency (1=ok, 0=failing)',
+    ['dependency']
+)
+
+# A check returns an optional detail string and raises when the dependency is unhealthy
+HealthCheck = Callable[[], Awaitable[Optional[str]]]
+
+
+class HealthProber:
+    """Probes dependencies on an interval and keeps the latest results.
+
+    Health endpoints answer from snapshot() instead of touching dependencies,
+    so probe traffic from Docker, Kubernetes and the load balancer costs a
+    dict copy. Only the required dependencies decide healthy; the others are
+    reported for diagnosis.
+    """
+
+    def __init__(self, checks: Dict[str, HealthCheck], interval: float = 10, timeout: float = 2,
+                 required: Iterable[str] = ()):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        self.required = tuple(required)
+        self._results: Dict[str, Dict] = {}
+
+    async def probe_once(self):
+        """Run every check concurrently and record the results."""
+        await asyncio.gather(*(self._probe(name, check) for name, check in self.checks.items()))
+
+    async def _probe(self, name: str, check: HealthCheck):
+        start = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(check(), timeout=self.timeout)
+            ok, error = True, None
+        except asyncio.TimeoutError:
+            detail, ok, error = None, False, f"timed out after {self.timeout}s"
+        except Exception as e:
+            detail, ok, error = None, False, str(e) or type(e).__name__
+        elapsed = time.perf_counter() - start
+
+        health_probe_duration.labels(dependency=name).observe(elapsed)
+        health_probe_up.labels(dependency=name).set(1 if ok else 0)
+        previous = self._results.get(name)
+        if previous is not None and previous["ok"] != ok:
+            state = "healthy" if ok else "failing"
+            logger.warning(f"Dependency {name} is now {state}" + (f": {error}" if error else ""))
+
+        result = {
+            "ok": ok,
+            "latency_ms": round(elapsed * 1000, 2),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if detail:
+            result["detail"] = detail
+        if error:
+            result["error"] = error
+        self._results[name] = result
+
+    async def run(self):
+        """Background task: probe now, then every interval seconds."""
+        while True:
+            try:
+                await self.probe_once()
+            except Exception as e:
+                logger.error(f"Health probe round failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: dict(result) for name, result in self._results.items()}
+
+    @property
+    def healthy(self) -> bool:
+        """True once every required dependency has been probed and its last probe passed."""
+        return all(self._results.get(name, {}).get("ok", False) for name in self.required)
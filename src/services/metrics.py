@@ -0,0 +1,104 @@
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from prometheus_client import Counter
+
+OTHER_LABEL = "other"
+
+metrics_series_capped_total = Counter(
+    'metrics_series_capped_total',
+    'Label sets folded into the overflow series because a metric hit its series cap',
+    ['metric']
+)
+
+
+def normalize_city(city: str) -> str:
+    """Canonical city label: trimmed, single-spaced, title case."""
+    return " ".join(city.split()).title()
+
+
+class CityLabeler:
+    """Maps free-form city names onto a bounded set of metric label values.
+
+    Cities in the configured allowlist always get their own label. Other
+    cities are learned: a Space-Saving counter tracks approximate request
+    frequency in bounded memory, and a city is admitted once it has been
+    seen min_count times, up to top_k learned cities. Everything else is
+    reported as "other". Admission is permanent because the series already
+    exists in Prometheus.
+    """
+
+    def __init__(self, allowlist: Iterable[str] = (), top_k: int = 50,
+                 min_count: int = 5, tracker_size: int = 1000):
+        self.allowlist: Set[str] = {normalize_city(city) for city in allowlist if city.strip()}
+        self.top_k = top_k
+        self.min_count = min_count
+        self.tracker_size = tracker_size
+        self._counts: Dict[str, int] = {}
+        self._learned: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def learned(self) -> Set[str]:
+        return set(self._learned)
+
+    def label(self, city: Optional[str], learn: bool = False) -> str:
+        """Return the label for city. Only pass learn=True for cities that resolved upstream."""
+        if not city or not city.strip():
+            return OTHER_LABEL
+
+        city = normalize_city(city)
+        if city in self.allowlist or city in self._learned:
+            return city
+        if not learn:
+            return OTHER_LABEL
+
+        with self._lock:
+            count = self._observe(city)
+            if count >= self.min_count and len(self._learned) < self.top_k:
+                self._learned.add(city)
+                return city
+        return OTHER_LABEL
+
+    def _observe(self, city: str) -> int:
+        # Space-Saving: when full, the new key replaces the minimum and inherits its count
+        if city in self._counts:
+            self._counts[city] += 1
+        elif len(self._counts) < self.tracker_size:
+            self._counts[city] = 1
+        else:
+            victim = min(self._counts, key=self._counts.__getitem__)
+            self._counts[city] = self._counts.pop(victim) + 1
+        return self._counts[city]
+
+
+class CappedMetric:
+    """Wraps a labelled metric and caps how many label sets it may create.
+
+    Once max_series distinct label sets exist, new ones have their
+    overflow_labels replaced with "other" and are counted in
+    metrics_series_capped_total under name.
+    """
+
+    def __init__(self, metric, name: str, max_series: int, overflow_labels: Tuple[str, ...]):
+        self.metric = metric
+        self.name = name
+        self.max_series = max_series
+        self.overflow_labels = overflow_labels
+        self._seen: Set[Tuple] = set()
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if key in self._seen:
+                return self.metric.labels(**labels)
+            if len(self._seen) < self.max_series:
+                self._seen.add(key)
+                return self.metric.labels(**labels)
+
+        metrics_series_capped_total.labels(metric=self.name).inc()
+        return self.metric.labels(**{
+            name: OTHER_LABEL if name in self.overflow_labels else value
+            for name, value in labels.items()
+        })
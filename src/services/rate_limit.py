@@ -0,0 +1,157 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+from prometheus_client import Gauge
+
+from src.services.cache import TTLCache
+
+admission_in_flight = Gauge(
+    'admission_in_flight',
+    'Requests holding a concurrency slot',
+    ['limiter']
+)
+
+admission_waiting = Gauge(
+    'admission_waiting',
+    'Requests waiting for a concurrency slot',
+    ['limiter']
+)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens per second, up to capacity.
+
+    Not thread-safe; meant to be used from a single event loop.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """Seconds until tokens would be available."""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available and take them."""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.wait_time(tokens))
+
+
+class AdmissionRejected(Exception):
+    """Raised instead of doing the work when admission control turns a request away.
+
+    Carries the cheap response to send back; outcome is "rate_limited" or "shed".
+    """
+
+    def __init__(self, outcome: str, response: str):
+        super().__init__(outcome)
+        self.outcome = outcome
+        self.response = response
+
+
+class SenderRateLimiter:
+    """One token bucket per sender, kept in a bounded LRU.
+
+    A bucket left idle for burst / rate seconds has refilled completely, so
+    it expires then and is recreated full on the sender's next message;
+    at most max_senders buckets are held, least recently active first out.
+    """
+
+    def __init__(self, rate: float, burst: float, max_senders: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        idle_ttl = burst / rate if rate > 0 else 0
+        self._buckets = TTLCache(
+            maxsize=max_senders, ttl=idle_ttl, name="sender_buckets", clock=clock
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.burst > 0 and self._buckets.enabled
+
+    def try_acquire(self, sender: str) -> bool:
+        """Take a token from sender's bucket; False when the sender is over its rate."""
+        if not self.enabled:
+            return True
+        bucket = self._buckets.get(sender)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, clock=self._clock)
+        admitted = bucket.try_acquire()
+        # Re-set so the entry expires burst / rate seconds after the sender's last message
+        self._buckets.set(sender, bucket)
+        return admitted
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    """Caps requests in progress and sheds load once too many are waiting.
+
+    Up to max_concurrent callers hold a slot at once. Others wait in line,
+    but acquire() returns False straight away when max_waiting callers are
+    already waiting, or after max_wait seconds in line, so the queue (and
+    the latency of what is admitted) stays bounded. max_concurrent 0 disables.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int, max_wait: Optional[float] = None,
+                 name: str = "default"):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.name = name
+        self.waiting = 0
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+
+    @property
+    def enabled(self) -> bool:
+        return self._semaphore is not None
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in line if allowed; False when the request should be shed."""
+        if self._semaphore is None:
+            return True
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            return False
+
+        self.waiting += 1
+        admission_waiting.labels(limiter=self.name).set(self.waiting)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait or None)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+            admission_waiting.labels(limiter=self.name).set(self.waiting)
+        self.in_flight += 1
+        admission_in_flight.labels(limiter=self.name).set(self.in_flight)
+        return True
+
+    def release(self):
+        if self._semaphore is not None:
+            self._semaphore.release()
+            self.in_flight -= 1
+            admission_in_flight.labels(limiter=self.name).set(self.in_flight)
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_breaker_state = Gauge(
+    'circuit_breaker_state',
+    'Circuit breaker state (0=closed, 1=half_open, 2=open)',
+    ['breaker']
+)
+
+circuit_breaker_transitions_total = Counter(
+    'circuit_breaker_transitions_total',
+    'Circuit breaker state transitions',
+    ['breaker', 'state']
+)
+
+circuit_breaker_rejected_total = Counter(
+    'circuit_breaker_rejected_total',
+    'Calls rejected without trying because the circuit was open',
+    ['breaker']
+)
+
+adaptive_timeout_seconds = Gauge(
+    'adaptive_timeout_seconds',
+    'Current adaptive request timeout',
+    ['upstream']
+)
+
+hedged_requests_total = Counter(
+    'hedged_requests_total',
+    'Hedged second requests sent for slow calls, by which request answered first',
+    ['upstream', 'winner']
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker.
+
+    Closed: calls pass; failure_threshold consecutive failures open the circuit.
+    Open: calls are rejected for recovery_timeout seconds.
+    Half-open: one trial call at a time; a success closes the circuit, a failure reopens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        circuit_breaker_state.labels(breaker=name).set(_STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.recovery_timeout:
+                    circuit_breaker_rejected_total.labels(breaker=self.name).inc()
+                    return False
+                self._transition(HALF_OPEN)
+
+            if self._state == HALF_OPEN:
+                if self._trial_in_flight:
+                    circuit_breaker_rejected_total.labels(breaker=self.name).inc()
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            tripped = self._state == CLOSED and self._failures >= self.failure_threshold
+            if self._state == HALF_OPEN or tripped:
+                self._opened_at = self._clock()
+                self._transition(OPEN)
+
+    def release(self):
+        """End a call that neither succeeded nor failed, e.g. a 404 or a cancelled request."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures}
+
+    def _transition(self, state: str):
+        logger.warning(f"Circuit breaker {self.name}: {self._state} -> {state}")
+        self._state = state
+        circuit_breaker_state.labels(breaker=self.name).set(_STATE_VALUES[state])
+        circuit_breaker_transitions_total.labels(breaker=self.name, state=state).inc()
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies driving timeouts and hedge delays.
+
+    timeout() is the timeout_percentile latency times multiplier, clamped to
+    [min_timeout, max_timeout]; until min_samples calls have been seen it is
+    max_timeout and hedge_delay() is None.
+    """
+
+    def __init__(self, name: str, min_timeout: float, max_timeout: float, window: int = 200,
+                 timeout_percentile: float = 0.99, multiplier: float = 3.0,
+                 hedge_percentile: float = 0.95, min_samples: int = 20):
+        self.name = name
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_percentile = timeout_percentile
+        self.multiplier = multiplier
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        adaptive_timeout_seconds.labels(upstream=name).set(max_timeout)
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+        adaptive_timeout_seconds.labels(upstream=self.name).set(self.timeout())
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def timeout(self) -> float:
+        latency = self.percentile(self.timeout_percentile)
+        if latency is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, latency * self.multiplier))
+
+    def hedge_delay(self) -> Optional[float]:
+        return self.percentile(self.hedge_percentile)
+
+
+async def hedged(call: Callable[[], Awaitable[Any]], delay: Optional[float], upstream: str) -> Any:
+    """Await call(); if it has not finished after delay seconds, race a second call against it.
+
+    The first successful result wins and the other call is cancelled. If both
+    fail, the last error is raised. delay=None disables hedging.
+    """
+    primary = asyncio.ensure_future(call())
+    if delay is None:
+        return await primary
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+    except asyncio.CancelledError:
+        primary.cancel()
+        raise
+    if done:
+        return primary.result()
+
+    hedge = asyncio.ensure_future(call())
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    hedged_requests_total.labels(
+                        upstream=upstream, winner="primary" if task is primary else "hedge"
+                    ).inc()
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,383 @@
+import logging
+import struct
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+shared_cache_requests_total = Counter(
+    'shared_cache_requests_total',
+    'Shared cache lookups by result',
+    ['cache', 'result']
+)
+
+shared_cache_invalidations_total = Counter(
+    'shared_cache_invalidations_total',
+    'Near-cache entries dropped because another replica wrote a newer value',
+    ['cache']
+)
+
+
+# Compact tagged binary encoding for cached values. Only plain data types are
+# supported, so unlike pickle a poisoned cache entry cannot execute code.
+# Lengths and ints are LEB128 varints (ints zigzag-encoded), floats are 8-byte IEEE 754.
+_FLOAT64 = struct.Struct(">d")
+
+
+def _write_varint(n: int, out: bytearray):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data: memoryview, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize None, bool, int, float, str, datetime, list/tuple and str-keyed dicts."""
+    out = bytearray()
+    _encode(value, out)
+    return bytes(out)
+
+
+def loads(data: bytes) -> Any:
+    value, end = _decode(memoryview(data), 0)
+    if end != len(data):
+        raise ValueError("Trailing bytes in cached value")
+    return value
+
+
+def _encode(value: Any, out: bytearray):
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        out += b"i"
+        _write_varint(value << 1 if value >= 0 else (-value << 1) - 1, out)
+    elif isinstance(value, float):
+        out += b"f" + _FLOAT64.pack(value)
+    elif isinstance(value, str):
+        raw = value.encode("utf-8")
+        out += b"s"
+        _write_varint(len(raw), out)
+        out += raw
+    elif isinstance(value, datetime):
+        # Naive datetimes round-trip as local time; aware ones come back in UTC
+        out += (b"Z" if value.tzinfo else b"t") + _FLOAT64.pack(value.timestamp())
+    elif isinstance(value, (list, tuple)):
+        out += b"L"
+        _write_varint(len(value), out)
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += b"D"
+        _write_varint(len(value), out)
+        for key, item in value.items():
+            _encode(str(key), out)
+            _encode(item, out)
+    else:
+        raise TypeError(f"Cannot serialize {type(value).__name__} for the shared cache")
+
+
+def _decode(data: memoryview, pos: int) -> Tuple[Any, int]:
+    tag = bytes(data[pos:pos + 1])
+    pos += 1
+    if tag == b"N":
+        return None, pos
+    if tag == b"T":
+        return True, pos
+    if tag == b"F":
+        return False, pos
+    if tag == b"i":
+        zigzag, pos = _read_varint(data, pos)
+        return (zigzag >> 1) ^ -(zigzag & 1), pos
+    if tag == b"f":
+        return _FLOAT64.unpack_from(data, pos)[0], pos + 8
+    if tag in (b"t", b"Z"):
+        timestamp = _FLOAT64.unpack_from(data, pos)[0]
+        tz = timezone.utc if tag == b"Z" else None
+        value = datetime.fromtimestamp(timestamp, tz)
+        return value, pos + 8
+    if tag == b"s":
+        length, pos = _read_varint(data, pos)
+        return str(data[pos:pos + length], "utf-8"), pos + length
+    if tag == b"L":
+        length, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(length):
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == b"D":
+        length, pos = _read_varint(data, pos)
+        result = {}
+        for _ in range(length):
+            key, pos = _decode(data, pos)
+            result[key], pos = _decode(data, pos)
+        return result, pos
+    raise ValueError(f"Unknown type tag {tag!r} in cached value")
+
+
+class MemoryCacheBackend:
+    """In-process backend with RedisCacheBackend's interface; for tests and single-pod setups."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+        self._subscribers: Dict[str, List[Callable[[bytes], None]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._data[key]
+            return None
+        return entry[1]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        with self._lock:
+            found = {key: self._live(key) for key in keys}
+        return {key: value for key, value in found.items() if value is not None}
+
+    def set_many(self, items: Dict[str, bytes], ttl: float):
+        with self._lock:
+            expires_at = self._clock() + ttl
+            for key, value in items.items():
+                self._data[key] = (expires_at, value)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Set key only if it does not exist; True when this call set it."""
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._data[key] = (self._clock() + ttl, value)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def publish(self, channel: str, message: bytes):
+        for callback in list(self._subscribers.get(channel, ())):
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]):
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    def close(self):
+        self._subscribers.clear()
+
+
+class RedisCacheBackend:
+    """Backend for any server speaking the Redis protocol (Redis, Valkey, KeyDB, ElastiCache).
+
+    Multi-key reads are a single MGET and multi-key writes one pipelined
+    round trip. The redis package is imported lazily so it is only needed
+    when this backend is configured.
+    """
+
+    def __init__(self, url: str, socket_timeout: float = 0.25):
+        import redis
+
+        self._redis = redis.Redis.from_url(
+            url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout
+        )
+        self._pubsub = None
+        self._pubsub_thread = None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._redis.mget(keys)
+        return {key: value for key, value in zip(keys, values, strict=True) if value is not None}
+
+    def set_many(self, items: Dict[str, bytes], ttl: float):
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, value in items.items():
+            pipeline.set(key, value, px=max(1, int(ttl * 1000)))
+        pipeline.execute()
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self._redis.set(key, value, px=max(1, int(ttl * 1000)), nx=True))
+
+    def delete(self, key: str):
+        self._redis.delete(key)
+
+    def publish(self, channel: str, message: bytes):
+        self._redis.publish(channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]):
+        if self._pubsub is None:
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: lambda message: callback(message["data"])})
+        if self._pubsub_thread is None:
+            self._pubsub_thread = self._pubsub.run_in_thread(
+                sleep_time=0.5, daemon=True, exception_handler=self._pubsub_error
+            )
+
+    @staticmethod
+    def _pubsub_error(error, pubsub, thread):
+        # Keep the listener alive; the next read reconnects and resubscribes
+        logger.warning(f"Shared cache invalidation listener error: {error}")
+        time.sleep(1)
+
+    def close(self):
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread.join(timeout=2)
+            self._pubsub_thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+        self._redis.close()
+
+
+_cache_backend = None
+_cache_backend_lock = threading.Lock()
+
+
+def get_cache_backend():
+    """The process-wide backend selected by CACHE_BACKEND, or None when shared caching is off."""
+    global _cache_backend
+    with _cache_backend_lock:
+        if _cache_backend is None:
+            if settings.cache_backend == "redis":
+                _cache_backend = RedisCacheBackend(
+                    settings.cache_redis_url, socket_timeout=settings.cache_redis_timeout
+                )
+            elif settings.cache_backend == "memory":
+                _cache_backend = MemoryCacheBackend()
+        return _cache_backend
+
+
+def close_cache_backend():
+    global _cache_backend
+    with _cache_backend_lock:
+        if _cache_backend is not None:
+            _cache_backend.close()
+            _cache_backend = None
+
+
+class SharedCache:
+    """Namespaced, serialized view of a backend shared by all replicas.
+
+    Values are stored with their wall-clock write time so every replica sees
+    the same age. Each replica keeps its own near-cache; store() publishes the
+    key so other replicas drop their copy (via on_invalidate) and read the
+    newer value on their next lookup. Backend errors are logged and treated
+    as misses so a cache outage never fails a request.
+    """
+
+    def __init__(self, backend, namespace: str, ttl: float,
+                 on_invalidate: Optional[Callable[[str], None]] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self._instance_id = uuid.uuid4().hex
+        self._channel = f"{namespace}:invalidate"
+        self._on_invalidate = on_invalidate
+        if on_invalidate is not None:
+            try:
+                backend.subscribe(self._channel, self._handle_invalidation)
+            except Exception as e:
+                # Near-caches then only expire by TTL
+                logger.warning(
+                    f"Shared cache {namespace} could not subscribe to invalidations: {e}"
+                )
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        """Return {key: (value, age_seconds)} for the keys present, in one round trip."""
+        keys = list(keys)
+        try:
+            raw = self.backend.get_many([self._key(key) for key in keys])
+        except Exception as e:
+            logger.warning(f"Shared cache {self.namespace} read failed: {e}")
+            shared_cache_requests_total.labels(cache=self.namespace, result="error").inc(len(keys))
+            return {}
+
+        now = time.time()
+        found = {}
+        for key in keys:
+            data = raw.get(self._key(key))
+            if data is None:
+                continue
+            try:
+                stored_at, value = loads(data)
+            except (ValueError, TypeError, IndexError, struct.error) as e:
+                logger.warning(f"Discarding undecodable shared cache entry {key}: {e}")
+                continue
+            found[key] = (value, max(0.0, now - stored_at))
+
+        shared_cache_requests_total.labels(cache=self.namespace, result="hit").inc(len(found))
+        misses = len(keys) - len(found)
+        shared_cache_requests_total.labels(cache=self.namespace, result="miss").inc(misses)
+        return found
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Dict[str, Any], age: float = 0):
+        """Store values for all keys; age backdates values that were already cached elsewhere."""
+        stored_at = time.time() - age
+        try:
+            encoded = {self._key(key): dumps([stored_at, value]) for key, value in items.items()}
+            self.backend.set_many(encoded, self.ttl)
+            # Only namespaces with near-caches listen for invalidations
+            if self._on_invalidate is not None:
+                for key in items:
+                    self.backend.publish(self._channel, f"{self._instance_id}|{key}".encode())
+        except Exception as e:
+            logger.warning(f"Shared cache {self.namespace} write failed: {e}")
+
+    def set(self, key: str, value: Any, age: float = 0):
+        self.set_many({key: value}, age=age)
+
+    def delete(self, key: str):
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            logger.warning(f"Shared cache {self.namespace} delete failed: {e}")
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Atomically claim key across replicas; True when this call created it.
+
+        If the backend is unreachable the claim is granted, so callers fail open.
+        """
+        try:
+            return self.backend.add(self._key(key), dumps([time.time(), value]), ttl or self.ttl)
+        except Exception as e:
+            logger.warning(f"Shared cache {self.namespace} add failed: {e}")
+            return True
+
+    def _handle_invalidation(self, message: bytes):
+        if isinstance(message, str):
+            message = message.encode()
+        instance_id, _, key = message.decode().partition("|")
+        if instance_id != self._instance_id and key:
+            shared_cache_invalidations_total.labels(cache=self.namespace).inc()
+            self._on_invalidate(key)
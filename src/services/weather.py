@@ -1,85 +1,851 @@
-import requests
+import asyncio
 import os
-from typing import Dict, Optional
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import httpx
+import requests
+from prometheus_client import Counter, Histogram
+from sqlalchemy.orm import Session
+
 from src.config.logging import setup_logging
 from src.config.settings import settings
-from src.database import get_db, WeatherData
-from src.models.schemas import WeatherResponse
-from sqlalchemy.orm import Session
-import logging
+from src.database import WeatherData, repository, run_db, weather_writer
+from src.services.batching import GroupBatcher
+from src.services.cache import PopularityTracker, TTLCache
+from src.services.cities import normalize_name
+from src.services.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, hedged
+from src.services.shared_cache import SharedCache, get_cache_backend
+
+logger = setup_logging(__name__)
+
+weather_requests_coalesced_total = Counter(
+    'weather_requests_coalesced_total',
+    'Weather lookups that shared an in-flight upstream fetch instead of starting their own'
+)
+
+weather_upstream_fetch_duration = Histogram(
+    'weather_upstream_fetch_duration_seconds',
+    'OpenWeatherMap request latency',
+    ['outcome']
+)
+
+weather_background_refresh_total = Counter(
+    'weather_background_refresh_total',
+    'Background refreshes of cached weather (stale revalidation and hot-city refresh)',
+    ['trigger', 'outcome']
+)
+
+weather_db_lookups_total = Counter(
+    'weather_db_lookups_total',
+    'Lookups of a recently stored reading before going upstream',
+    ['result']
+)
+
+weather_db_lookup_duration = Histogram(
+    'weather_db_lookup_duration_seconds',
+    'Time spent looking up a recently stored reading',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+weather_lookup_duration = Histogram(
+    'weather_lookup_duration_seconds',
+    'End-to-end weather lookup latency by cache outcome',
+    ['cache_status'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+def _observe_lookup(cache_status: str, start: float):
+    weather_lookup_duration.labels(cache_status=cache_status).observe(time.perf_counter() - start)
+
+def _observe_upstream_fetch(outcome: str, start: float):
+    weather_upstream_fetch_duration.labels(outcome=outcome).observe(time.perf_counter() - start)
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution whose result is shared."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _InFlightCall] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn for key, or wait for the call already in flight.
+
+        Returns (result, shared) where shared is True when this caller reused
+        another caller's result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
 
-logger = setup_logging()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        future = self._calls.get(key)
+        if future is not None:
+            # Shield so a cancelled follower does not cancel the leader's fetch
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+# City IDs are stable, so resolutions only expire to bound memory on long-running workers
+CITY_ID_TTL = 7 * 24 * 3600
+
+# Maximum number of city IDs accepted per /group request
+OPENWEATHER_GROUP_LIMIT = 20
 
 class WeatherService:
     def __init__(self):
-        self.api_key = settings.weather_api_key
+        # None reads the key from settings on every use, so a rotated key needs no restart
+        self._api_key: Optional[str] = None
         self.base_url = os.getenv("WEATHER_API_URL", "https://api.openweathermap.org/data/2.5")
         self.default_city = os.getenv("DEFAULT_CITY", "London")
         self.default_country = os.getenv("DEFAULT_COUNTRY", "UK")
+        self.cache = TTLCache(
+            maxsize=settings.weather_cache_max_size,
+            ttl=settings.weather_cache_ttl,
+            stale_ttl=settings.weather_cache_stale_ttl,
+            name="weather"
+        )
+        self.popularity = PopularityTracker(max_keys=settings.weather_cache_max_size)
+        # Second tier shared by all replicas; self.cache acts as this replica's near-cache
+        self.shared_cache: Optional[SharedCache] = None
+        backend = get_cache_backend()
+        if backend is not None and self.cache.enabled:
+            self.shared_cache = SharedCache(
+                backend,
+                namespace="weather",
+                ttl=settings.weather_cache_ttl,
+                on_invalidate=lambda key: self.cache.pop(key)
+            )
+        # OpenWeatherMap city IDs, learned from /weather responses; needed for /group batching
+        self.city_ids = TTLCache(
+            maxsize=settings.weather_city_id_cache_size,
+            ttl=CITY_ID_TTL,
+            name="weather_city_id"
+        )
+        # Fail fast while OpenWeatherMap is down, and time out relative to its recent latency
+        self.breaker = CircuitBreaker(
+            "openweathermap",
+            failure_threshold=settings.weather_breaker_failure_threshold,
+            recovery_timeout=settings.weather_breaker_recovery_timeout
+        )
+        self.upstream_latency = LatencyTracker(
+            "openweathermap",
+            min_timeout=settings.weather_http_min_timeout,
+            max_timeout=settings.weather_http_timeout,
+            timeout_percentile=settings.weather_timeout_percentile,
+            multiplier=settings.weather_timeout_multiplier,
+            hedge_percentile=settings.weather_hedge_percentile
+        )
+        self._batcher: Optional[GroupBatcher] = None
+        if settings.weather_batch_enabled:
+            self._batcher = GroupBatcher(
+                self._fetch_group_from_api_async,
+                max_batch=min(settings.weather_batch_size, OPENWEATHER_GROUP_LIMIT),
+                window=settings.weather_batch_window,
+                name="weather"
+            )
+        self._inflight = SingleFlight()
+        self._async_inflight = AsyncSingleFlight()
+        self._background_tasks: set = set()
+        # Sync stale refreshes run on a bounded pool, at most one queued or running per key
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        
+        # Pooled keep-alive HTTP clients; the async one is created lazily on the serving loop
+        self._session = requests.Session()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
         
-        if not self.api_key or self.api_key == "your_openweathermap_api_key_here":
+        if self._use_test_data():
             logger.warning("Weather API key not found, running in test mode")
     
-    def get_current_weather(self, city: str = None, country: str = None, db: Session = None) -> Dict:
-        """Get current weather for a city and store it in database."""
+    @property
+    def api_key(self) -> str:
+        return self._api_key if self._api_key is not None else settings.weather_api_key
+    
+    @api_key.setter
+    def api_key(self, value: str):
+        self._api_key = value
+    
+    def get_current_weather(self, city: str = None, country: str = None,
+                            db: Session = None) -> Dict:
+        """Current weather for a city, served from cache when fresh, and stored in the database."""
+        start = time.perf_counter()
         city = city or self.default_city
         country = country or None
         
-        logger.info(f"Fetching weather data for {city}, {country}")
+        cache_key = self._cache_key(city, country)
+        self.popularity.record(cache_key, (city, country))
+        cached = self._get_cached_weather(cache_key, city, country)
+        if cached is not None:
+            if cached["cache_status"] == "stale":
+                self._schedule_refresh(city, country, cache_key, "stale")
+            _observe_lookup(cached["cache_status"], start)
+            return cached
+        
+        weather_data, shared = self._inflight.do(
+            cache_key, lambda: self._fetch_and_cache(city, country, cache_key, db)
+        )
+        weather_data = self._finish_lookup(weather_data, shared, city, country)
         
-        if not self.api_key or self.api_key == "your_openweathermap_api_key_here":
+        if db and weather_data.get("circuit_open"):
+            weather_data = self._get_stored_weather(db, city, cache_key) or weather_data
+        # Queue fresh upstream readings for write-behind persistence if a database is available
+        elif (db and weather_data["cache_status"] in ("miss", "bypass")
+              and weather_data["status"] == "success"):
+            self._store_weather_data(weather_data["data"], cache_key)
+        
+        _observe_lookup(weather_data["cache_status"], start)
+        return weather_data
+    
+    async def get_current_weather_async(self, city: str = None, country: str = None,
+                                        db: Session = None) -> Dict:
+        """Async variant of get_current_weather that never blocks the event loop on upstream I/O."""
+        start = time.perf_counter()
+        city = city or self.default_city
+        country = country or None
+        
+        cache_key = self._cache_key(city, country)
+        self.popularity.record(cache_key, (city, country))
+        cached = self._get_cached_weather(cache_key, city, country)
+        if cached is not None:
+            if cached["cache_status"] == "stale" and not self._async_inflight.in_flight(cache_key):
+                # Serve the stale reading now; the refresh runs after this reply
+                task = asyncio.create_task(self._refresh_async(city, country, cache_key, "stale"))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            _observe_lookup(cached["cache_status"], start)
+            return cached
+        
+        weather_data, shared = await self._async_inflight.do(
+            cache_key, lambda: self._fetch_and_cache_async(city, country, cache_key, db)
+        )
+        weather_data = self._finish_lookup(weather_data, shared, city, country)
+        
+        if db and weather_data.get("circuit_open"):
+            stored = await run_db(self._get_stored_weather, db, city, cache_key)
+            weather_data = stored or weather_data
+        # Queue fresh upstream readings for write-behind persistence if a database is available
+        elif (db and weather_data["cache_status"] in ("miss", "bypass")
+              and weather_data["status"] == "success"):
+            await weather_writer.submit_async(self._weather_row(weather_data["data"], cache_key))
+        
+        _observe_lookup(weather_data["cache_status"], start)
+        return weather_data
+    
+    def _get_cached_weather(self, cache_key: str, city: str,
+                            country: Optional[str]) -> Optional[Dict]:
+        """Cached result tagged "hit", or "stale" when past TTL but inside the staleness window."""
+        if not self.cache.enabled:
+            return None
+        
+        entry = self.cache.get_entry(cache_key)
+        if entry is None:
+            return None
+        
+        cached, age = entry
+        cache_status = "hit" if age < self.cache.ttl else "stale"
+        logger.info("Weather cache %s for %s, %s", cache_status, city, country)
+        return {
+            "status": "success",
+            "data": dict(cached),
+            "cache_status": cache_status
+        }
+    
+    def _schedule_refresh(self, city: str, country: Optional[str], cache_key: str, trigger: str):
+        """Queue a refresh of cache_key on the refresh pool unless one is pending or in flight."""
+        with self._refresh_lock:
+            if cache_key in self._refreshing or self._inflight.in_flight(cache_key):
+                return
+            self._refreshing.add(cache_key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=settings.weather_refresh_concurrency,
+                    thread_name_prefix="weather-refresh"
+                )
+            executor = self._refresh_executor
+        executor.submit(self._refresh, city, country, cache_key, trigger)
+    
+    def _refresh(self, city: str, country: Optional[str], cache_key: str, trigger: str):
+        """Re-fetch a cached city off the request path (sync API)."""
+        try:
+            result, _ = self._inflight.do(
+                cache_key, lambda: self._fetch_and_cache(city, country, cache_key)
+            )
+            outcome = result["status"]
+        except Exception as e:
+            logger.error(f"Background refresh failed for {city}: {e}")
+            outcome = "error"
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(cache_key)
+        weather_background_refresh_total.labels(trigger=trigger, outcome=outcome).inc()
+    
+    async def _refresh_async(self, city: str, country: Optional[str], cache_key: str, trigger: str):
+        try:
+            result, _ = await self._async_inflight.do(
+                cache_key, lambda: self._fetch_and_cache_async(city, country, cache_key)
+            )
+            outcome = result["status"]
+        except Exception as e:
+            logger.error(f"Background refresh failed for {city}: {e}")
+            outcome = "error"
+        weather_background_refresh_total.labels(trigger=trigger, outcome=outcome).inc()
+    
+    async def refresh_hot_cities(self) -> int:
+        """Refresh the most requested cities whose cache entries are close to expiry.
+        
+        Returns the number of refreshes started, at most weather_refresh_budget.
+        """
+        refresh_after = self.cache.ttl * settings.weather_refresh_ahead
+        candidates = []
+        for cache_key, (city, country) in self.popularity.top(
+            settings.weather_refresh_hot_cities, min_count=settings.weather_refresh_min_requests
+        ):
+            age = self.cache.age(cache_key)
+            due = age is None or age >= refresh_after
+            if due and not self._async_inflight.in_flight(cache_key):
+                candidates.append((city, country, cache_key))
+            if len(candidates) >= settings.weather_refresh_budget:
+                break
+        
+        if self.shared_cache is not None and candidates:
+            # Another replica may already have refreshed some of these; one MGET checks them all
+            keys = [key for _, _, key in candidates]
+            shared = await asyncio.to_thread(self.shared_cache.get_many, keys)
+            for cache_key, (data, age) in shared.items():
+                if age < refresh_after:
+                    self.cache.set(cache_key, dict(data), age=age)
+            candidates = [
+                candidate for candidate in candidates
+                if candidate[2] not in shared or shared[candidate[2]][1] >= refresh_after
+            ]
+        
+        concurrency = settings.weather_refresh_concurrency
+        if self._batcher is not None:
+            # Refreshes of cities with known IDs share /group calls of up to max_batch cities
+            concurrency *= self._batcher.max_batch
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def refresh(city, country, cache_key):
+            async with semaphore:
+                await self._refresh_async(city, country, cache_key, "hot")
+        
+        await asyncio.gather(*(refresh(*candidate) for candidate in candidates))
+        return len(candidates)
+    
+    async def refresh_loop(self):
+        """Background task: keep hot cities warm so their lookups stay cache hits."""
+        while True:
+            await asyncio.sleep(settings.weather_refresh_interval)
+            try:
+                refreshed = await self.refresh_hot_cities()
+                if refreshed:
+                    logger.info(f"Refreshed {refreshed} hot cities")
+            except Exception as e:
+                logger.error(f"Hot city refresh failed: {e}")
+            # Age request counts so the hot set follows recent traffic
+            self.popularity.decay()
+
+    async def warmup(self, cities: List[Tuple[str, Optional[str]]]) -> int:
+        """Open the upstream connection pool and cache (city, country) lookups ahead of traffic.
+
+        Returns how many cities were loaded successfully.
+        """
+        self._get_async_client()
+        semaphore = asyncio.Semaphore(max(1, settings.weather_refresh_concurrency))
+
+        async def load(city: str, country: Optional[str]) -> bool:
+            async with semaphore:
+                try:
+                    result = await self.get_current_weather_async(city=city, country=country)
+                except Exception as e:
+                    logger.warning(f"Warmup lookup for {city} failed: {e}")
+                    return False
+                return result.get("status") == "success"
+
+        results = await asyncio.gather(*(load(city, country) for city, country in cities))
+        return sum(results)
+
+    def _get_stored_weather(self, db: Session, city: str, cache_key: str) -> Optional[Dict]:
+        """Last persisted reading for a city, served while the upstream circuit is open."""
+        result = self._query_stored_weather(db, cache_key, "fallback")
+        if result is None:
+            # Readings stored before lookup keys were recorded only match by upstream name
+            result = self._query_stored_weather(db, cache_key, "fallback", city=city)
+        if result is not None:
+            logger.info(
+                "Serving stored weather for %s from %s while upstream is unavailable",
+                city, result["data"]["timestamp"]
+            )
+        return result
+    
+    def _get_fresh_stored_weather(self, db: Session, city: str, cache_key: str) -> Optional[Dict]:
+        """A reading stored in the last weather_db_freshness seconds, maybe by another replica."""
+        start = time.perf_counter()
+        since = datetime.now(timezone.utc) - timedelta(seconds=settings.weather_db_freshness)
+        result = self._query_stored_weather(db, cache_key, "database", since=since)
+        weather_db_lookup_duration.observe(time.perf_counter() - start)
+        weather_db_lookups_total.labels(result="hit" if result else "miss").inc()
+        
+        if result is not None:
+            logger.info(f"Serving weather for {city} stored at {result['data']['timestamp']}")
+        return result
+    
+    def _query_stored_weather(self, db: Session, cache_key: str, cache_status: str,
+                              since: Optional[datetime] = None,
+                              city: Optional[str] = None) -> Optional[Dict]:
+        try:
+            if city is not None:
+                row = repository.get_latest_reading(db, city, since=since)
+            else:
+                row = repository.get_latest_reading_by_key(db, cache_key, since=since)
+            return self._stored_result(row, cache_status) if row is not None else None
+        finally:
+            # End the read transaction so the request does not hold a pooled connection
+            # through the upstream call that usually follows a miss
+            db.rollback()
+    
+    def _use_database_tier(self, db: Optional[Session]) -> bool:
+        return db is not None and settings.weather_db_freshness > 0
+    
+    def _stored_result(self, row: WeatherData, cache_status: str) -> Dict:
+        return {
+            "status": "success",
+            "data": {
+                "city": row.city,
+                "temperature": row.temperature,
+                "description": row.description,
+                "humidity": row.humidity,
+                "feels_like": row.feels_like,
+                # Stored as naive UTC; live readings carry aware UTC timestamps too
+                "timestamp": row.created_at.replace(tzinfo=timezone.utc)
+            },
+            "cache_status": cache_status
+        }
+    
+    @staticmethod
+    def _stored_age(data: Dict) -> float:
+        """Seconds since a stored reading was written, so caching it does not restart its TTL."""
+        return max(0.0, (datetime.now(timezone.utc) - data["timestamp"]).total_seconds())
+    
+    def _finish_lookup(self, weather_data: Dict, shared: bool, city: str,
+                       country: Optional[str]) -> Dict:
+        """Copy a fetched result for this caller and tag it with its cache status."""
+        # The fetched dict is shared with coalesced callers, so never mutate it in place
+        weather_data = dict(weather_data)
+        
+        if shared:
+            # Another caller already fetched (and stored) this reading
+            weather_requests_coalesced_total.inc()
+            logger.info("Weather lookup for %s, %s coalesced with in-flight fetch", city, country)
+            if "data" in weather_data:
+                weather_data["data"] = dict(weather_data["data"])
+            weather_data["cache_status"] = "coalesced"
+        elif "cache_status" not in weather_data:
+            weather_data["cache_status"] = "miss" if self.cache.enabled else "bypass"
+        
+        return weather_data
+    
+    def _fetch_and_cache(self, city: str, country: Optional[str], cache_key: str,
+                         db: Optional[Session] = None) -> Dict:
+        """Fetch from a fresh stored reading, upstream (or test data) and cache successes."""
+        weather_data = self._get_shared_weather(cache_key)
+        if weather_data is not None:
+            return weather_data
+        
+        weather_data = None
+        if self._use_database_tier(db):
+            weather_data = self._get_fresh_stored_weather(db, city, cache_key)
+        if weather_data is not None:
+            age = self._stored_age(weather_data["data"])
+            self._cache_weather(cache_key, weather_data["data"], age=age)
+            return weather_data
+        
+        logger.info("Fetching weather data for %s, %s", city, country)
+        
+        if self._use_test_data():
             weather_data = self._get_test_weather(city, country)
         else:
             weather_data = self._fetch_weather_from_api(city, country)
         
-        # Store in database if available
-        if db and weather_data["status"] == "success":
-            self._store_weather_data(db, weather_data["data"])
+        if weather_data["status"] == "success":
+            self._cache_weather(cache_key, weather_data["data"])
         
         return weather_data
     
+    async def _fetch_and_cache_async(self, city: str, country: Optional[str], cache_key: str,
+                                     db: Optional[Session] = None) -> Dict:
+        if self.shared_cache is not None:
+            weather_data = await asyncio.to_thread(self._get_shared_weather, cache_key)
+            if weather_data is not None:
+                return weather_data
+        
+        if self._use_database_tier(db):
+            weather_data = await run_db(self._get_fresh_stored_weather, db, city, cache_key)
+            if weather_data is not None:
+                await self._cache_weather_async(
+                    cache_key, weather_data["data"], age=self._stored_age(weather_data["data"])
+                )
+                return weather_data
+        
+        logger.info("Fetching weather data for %s, %s", city, country)
+        
+        if self._use_test_data():
+            weather_data = self._get_test_weather(city, country)
+        elif self._batcher is not None and self.city_ids.get(cache_key) is not None:
+            city_id = self.city_ids.get(cache_key)
+            weather_data = await self._fetch_weather_batched(city, country, city_id)
+        else:
+            weather_data = await self._fetch_weather_from_api_async(city, country)
+        
+        if weather_data["status"] == "success":
+            await self._cache_weather_async(cache_key, weather_data["data"])
+        
+        return weather_data
+    
+    def _get_shared_weather(self, cache_key: str) -> Optional[Dict]:
+        """A fresh reading fetched by any replica, copied into the local near-cache."""
+        if self.shared_cache is None:
+            return None
+        
+        entry = self.shared_cache.get(cache_key)
+        if entry is None or entry[1] >= self.cache.ttl:
+            return None
+        
+        data, age = entry
+        self.cache.set(cache_key, dict(data), age=age)
+        return {
+            "status": "success",
+            "data": data,
+            "cache_status": "shared"
+        }
+    
+    def _cache_weather(self, cache_key: str, data: Dict, age: float = 0):
+        self.cache.set(cache_key, dict(data), age=age)
+        if self.shared_cache is not None:
+            self.shared_cache.set(cache_key, data, age=age)
+    
+    async def _cache_weather_async(self, cache_key: str, data: Dict, age: float = 0):
+        self.cache.set(cache_key, dict(data), age=age)
+        if self.shared_cache is not None:
+            await asyncio.to_thread(self.shared_cache.set, cache_key, data, age)
+    
+    def _use_test_data(self) -> bool:
+        return not self.api_key or self.api_key == "your_openweathermap_api_key_here"
+    
+    @staticmethod
+    def _cache_key(city: str, country: Optional[str]) -> str:
+        """Normalize city and country into a cache key that ignores case, accents and punctuation.
+        
+        Also stored with each reading as lookup_key, so the database tier matches the same
+        spellings.
+        """
+        key = normalize_name(city)
+        if country:
+            key = f"{key},{country.strip().lower()}"
+        return key
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Return the pooled async HTTP client, created for the running event loop on first use."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    settings.weather_http_timeout,
+                    connect=settings.weather_http_connect_timeout
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.weather_http_max_connections,
+                    max_keepalive_connections=settings.weather_http_max_keepalive
+                )
+            )
+            self._async_client_loop = loop
+        return self._async_client
+    
+    async def aclose(self):
+        """Close pooled HTTP connections. Call on application shutdown."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+        with self._refresh_lock:
+            executor, self._refresh_executor = self._refresh_executor, None
+            self._refreshing.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+    
+    def _request_params(self, city: str, country: Optional[str]) -> Dict:
+        return {
+            "q": city if country is None else f"{city},{country}",
+            "appid": self.api_key,
+            "units": "metric"
+        }
+    
+    def _parse_weather_payload(self, data: Dict) -> Dict:
+        """Convert an OpenWeatherMap /weather payload into our result format."""
+        weather_data = {
+            "city": data["name"],
+            "temperature": data["main"]["temp"],
+            "description": data["weather"][0]["description"],
+            "humidity": data["main"]["humidity"],
+            "feels_like": data["main"]["feels_like"],
+            "timestamp": datetime.fromtimestamp(data["dt"], timezone.utc)
+        }
+        
+        logger.info(
+            "Weather data fetched successfully for %s, temperature: %s°C",
+            weather_data['city'], weather_data['temperature']
+        )
+        
+        return {
+            "status": "success",
+            "data": weather_data
+        }
+    
     def _fetch_weather_from_api(self, city: str, country: str) -> Dict:
         """Fetch weather data from OpenWeatherMap API."""
+        start = time.perf_counter()
         try:
-            url = f"{self.base_url}/weather"
-            params = {
-                "q": city if country is None else f"{city},{country}",
-                "appid": self.api_key,
-                "units": "metric"
-            }
+            self._check_circuit()
+            try:
+                response = self._session.get(
+                    f"{self.base_url}/weather",
+                    params=self._request_params(city, country),
+                    timeout=(settings.weather_http_connect_timeout, self.upstream_latency.timeout())
+                )
+                response.raise_for_status()
+            except BaseException as e:
+                self._record_upstream_error(e)
+                raise
+            self._record_upstream_success(time.perf_counter() - start)
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            payload = response.json()
+            self._remember_city_id(city, country, payload)
+            result = self._parse_weather_payload(payload)
+            _observe_upstream_fetch("success", start)
+            return result
+            
+        except Exception as e:
+            return self._upstream_error(city, e, start)
+    
+    async def _fetch_weather_from_api_async(self, city: str, country: str) -> Dict:
+        """Fetch weather data from OpenWeatherMap API over the pooled async client.
+        
+        Calls slower than the recent p95 latency are hedged with a second request.
+        """
+        start = time.perf_counter()
+        try:
+            self._check_circuit()
+            client = self._get_async_client()
+            url = f"{self.base_url}/weather"
+            params = self._request_params(city, country)
+            timeout = httpx.Timeout(
+                self.upstream_latency.timeout(), connect=settings.weather_http_connect_timeout
+            )
             
-            data = response.json()
+            async def call():
+                response = await client.get(url, params=params, timeout=timeout)
+                response.raise_for_status()
+                return response
             
-            weather_data = {
-                "city": data["name"],
-                "temperature": data["main"]["temp"],
-                "description": data["weather"][0]["description"],
-                "humidity": data["main"]["humidity"],
-                "feels_like": data["main"]["feels_like"],
-                "timestamp": datetime.fromtimestamp(data["dt"])
-            }
+            try:
+                response = await hedged(
+                    call,
+                    self.upstream_latency.hedge_delay() if settings.weather_hedge_enabled else None,
+                    upstream="openweathermap"
+                )
+            except BaseException as e:
+                self._record_upstream_error(e)
+                raise
+            self._record_upstream_success(time.perf_counter() - start)
             
-            logger.info(f"Weather data fetched successfully for {weather_data['city']}, temperature: {weather_data['temperature']}°C")
+            payload = response.json()
+            self._remember_city_id(city, country, payload)
+            result = self._parse_weather_payload(payload)
+            _observe_upstream_fetch("success", start)
+            return result
             
+        except Exception as e:
+            return self._upstream_error(city, e, start)
+    
+    def _check_circuit(self):
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Weather service temporarily unavailable")
+    
+    def _record_upstream_success(self, elapsed: float):
+        self.breaker.record_success()
+        self.upstream_latency.observe(elapsed)
+    
+    def _record_upstream_error(self, error: BaseException):
+        """Count timeouts, connection errors, 429s and 5xx against the breaker; not other errors."""
+        response = getattr(error, "response", None)
+        if response is not None:
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+            else:
+                # e.g. 404 for an unknown city: the API itself is healthy
+                self.breaker.record_success()
+        elif isinstance(error, (requests.RequestException, httpx.TransportError)):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+    
+    def _upstream_error(self, city: str, error: Exception, start: Optional[float] = None) -> Dict:
+        if isinstance(error, CircuitOpenError):
+            logger.warning(f"Circuit open, not fetching weather data for {city}")
             return {
-                "status": "success",
-                "data": weather_data
+                "status": "error",
+                "error": str(error),
+                "circuit_open": True
             }
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch weather data for {city}: {str(e)}")
+        
+        if start is not None:
+            _observe_upstream_fetch("error", start)
+        response = getattr(error, "response", None)
+        if response is not None and response.status_code == 404:
+            logger.info("Upstream does not know city %s", city)
             return {
                 "status": "error",
-                "error": str(e)
+                "error": f"City not found: {city}",
+                "not_found": True
             }
+        logger.error(f"Failed to fetch weather data for {city}: {str(error)}")
+        return {
+            "status": "error",
+            "error": str(error)
+        }
+    
+    def upstream_status(self) -> Dict:
+        """Circuit breaker state and current timeout of the upstream API, for /health."""
+        return {
+            **self.breaker.snapshot(),
+            "timeout_seconds": round(self.upstream_latency.timeout(), 3)
+        }
+    
+    async def probe_upstream(self) -> str:
+        """Reachability check for health probes; raises when the upstream is unreachable or failing.
+        
+        Sends no API key or city, so it reuses the pooled connection without spending quota.
+        """
+        if not self.api_key:
+            return "test_mode"
+        response = await self._get_async_client().get(f"{self.base_url}/weather")
+        if response.status_code >= 500:
+            raise RuntimeError(f"upstream returned HTTP {response.status_code}")
+        return f"reachable, circuit {self.breaker.state}"
+    
+    def _remember_city_id(self, city: str, country: Optional[str], payload: Dict):
+        if self._batcher is not None and payload.get("id"):
+            self.city_ids.set(self._cache_key(city, country), payload["id"])
+    
+    async def _fetch_group_from_api_async(self, city_ids: list) -> Dict[int, Dict]:
+        """Fetch current weather for up to OPENWEATHER_GROUP_LIMIT city IDs in one /group call."""
+        self._check_circuit()
+        start = time.perf_counter()
+        try:
+            client = self._get_async_client()
+            response = await client.get(
+                f"{self.base_url}/group",
+                params={
+                    "id": ",".join(str(city_id) for city_id in city_ids),
+                    "appid": self.api_key,
+                    "units": "metric"
+                },
+                timeout=httpx.Timeout(
+                    settings.weather_batch_timeout, connect=settings.weather_http_connect_timeout
+                )
+            )
+            response.raise_for_status()
+        except BaseException:
+            # Not counted against the breaker: a slow or failed group call says little about
+            # single lookups, and would otherwise open the circuit for every request
+            self.breaker.release()
+            _observe_upstream_fetch("error", start)
+            raise
+        
+        # Not fed to the latency tracker: group calls are slower than single lookups
+        self.breaker.record_success()
+        _observe_upstream_fetch("success", start)
+        return {item["id"]: item for item in response.json().get("list", [])}
+    
+    async def _fetch_weather_batched(self, city: str, country: Optional[str], city_id: int) -> Dict:
+        """Fetch a city with a known ID through the /group batcher."""
+        try:
+            payload = await self._batcher.get(city_id)
+        except Exception as e:
+            # The group call already recorded its duration
+            return self._upstream_error(city, e)
+        
+        if payload is None:
+            # The ID was not in the group response; re-resolve by name
+            self.city_ids.pop(self._cache_key(city, country))
+            return await self._fetch_weather_from_api_async(city, country)
+        
+        return self._parse_weather_payload(payload)
     
     def _get_test_weather(self, city: str, country: str) -> Dict:
         """Return test weather data when API key is not available."""
-        logger.info(f"Using test weather data for {city}, {country}")
+        logger.info("Using test weather data for %s, %s", city, country)
         
         return {
             "status": "success",
@@ -89,29 +855,26 @@ class WeatherService:
                 "description": "partly cloudy",
                 "humidity": 65,
                 "feels_like": 24.0,
-                "timestamp": datetime.now()
+                "timestamp": datetime.now(timezone.utc)
             }
         }
     
-    def _store_weather_data(self, db: Session, weather_data: Dict):
-        """Store weather data in the database."""
-        try:
-            db_weather = WeatherData(
-                city=weather_data["city"],
-                temperature=weather_data["temperature"],
-                description=weather_data["description"],
-                humidity=weather_data.get("humidity"),
-                feels_like=weather_data.get("feels_like")
-            )
-            
-            db.add(db_weather)
-            db.commit()
-            
-            logger.info(f"Weather data stored in database for {weather_data['city']}, record ID: {db_weather.id}")
-            
-        except Exception as e:
-            logger.error(f"Failed to store weather data for {weather_data['city']}: {str(e)}")
-            db.rollback()
+    def _weather_row(self, weather_data: Dict, cache_key: str) -> Dict:
+        """Build a weather_data row, stamped now since the insert itself is deferred."""
+        return {
+            "city": weather_data["city"],
+            "lookup_key": cache_key,
+            "temperature": weather_data["temperature"],
+            "description": weather_data["description"],
+            "humidity": weather_data.get("humidity"),
+            "feels_like": weather_data.get("feels_like"),
+            "created_at": datetime.now(timezone.utc)
+        }
+    
+    def _store_weather_data(self, weather_data: Dict, cache_key: str):
+        """Queue weather data for a batched insert by the write-behind writer."""
+        if weather_writer.submit(self._weather_row(weather_data, cache_key)):
+            logger.info("Weather data queued for storage for %s", weather_data['city'])
     
     def format_weather_message(self, weather_data: Dict) -> str:
         """Format weather data into a readable message."""
@@ -131,6 +894,7 @@ Conditions: {data['description'].title()}"""
         if data.get('humidity'):
             message += f"\nHumidity: {data['humidity']}%"
         
-        message += f"\n\nLast updated: {data['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"
+        updated = data['timestamp'].astimezone(timezone.utc)
+        message += f"\n\nLast updated: {updated.strftime('%Y-%m-%d %H:%M')} UTC"
         
         return message
\ No newline at end of file
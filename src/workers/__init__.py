@@ -0,0 +1,4 @@
+from .outbound import OutboundDispatcher, outbound_dispatcher
+from .replies import ReplyJob, ReplyWorkerPool
+
+__all__ = ["OutboundDispatcher", "outbound_dispatcher", "ReplyJob", "ReplyWorkerPool"]
@@ -0,0 +1,499 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import delete, func, select, update
+
+from src.config.settings import settings
+from src.database import OutboundMessageRecord, run_db
+from src.database.config import SessionLocal
+from src.services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+outbound_messages_total = Counter(
+    'outbound_messages_total',
+    'Outbound WhatsApp messages by delivery outcome',
+    ['status']
+)
+
+outbound_queue_depth = Gauge(
+    'outbound_queue_depth',
+    'Outbound messages waiting for delivery, including scheduled retries'
+)
+
+outbound_send_duration = Histogram(
+    'outbound_send_duration_seconds',
+    'Twilio API latency per delivery attempt'
+)
+
+webhook_reply_latency = Histogram(
+    'webhook_reply_end_to_end_seconds',
+    'Time from webhook receipt to delivery of a deferred reply',
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+)
+
+
+@dataclass
+class OutboundMessage:
+    to_number: str
+    body: str
+    from_number: str
+    attempts: int = 0
+    id: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    # Webhook receipt time for deferred replies; in-memory only, not persisted by the database queue
+    received_at: Optional[float] = None
+
+
+class DeliveryError(Exception):
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _whatsapp_address(number: str) -> str:
+    return number if number.startswith("whatsapp:") else f"whatsapp:{number}"
+
+
+class TwilioSender:
+    """Sends messages through the Twilio REST API over one pooled async HTTP client.
+
+    Credentials left as None are read from settings when first needed, so
+    creating a sender does not resolve secrets.
+    """
+
+    def __init__(self, account_sid: Optional[str] = None, auth_token: Optional[str] = None,
+                 api_url: str = "https://api.twilio.com"):
+        self._account_sid = account_sid
+        self._auth_token = auth_token
+        self.api_url = api_url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def account_sid(self) -> str:
+        return self._account_sid if self._account_sid is not None else settings.twilio_account_sid
+
+    @property
+    def auth_token(self) -> str:
+        return self._auth_token if self._auth_token is not None else settings.twilio_auth_token
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.account_sid and self.auth_token)
+
+    async def send(self, message: OutboundMessage) -> str:
+        """Deliver a message and return its Twilio SID. Raises DeliveryError on failure."""
+        if not self.configured:
+            logger.info(f"Test mode: message not sent to {message.to_number}")
+            return "test_mode"
+
+        try:
+            with outbound_send_duration.time():
+                response = await self._get_client().post(
+                    f"/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+                    auth=self._auth(),
+                    data={
+                        "From": message.from_number,
+                        "To": message.to_number,
+                        "Body": message.body
+                    }
+                )
+        except httpx.HTTPError as e:
+            raise DeliveryError(f"Twilio request failed: {e}", retryable=True) from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise DeliveryError(f"Twilio returned {response.status_code}", retryable=True)
+        if response.status_code >= 400:
+            raise DeliveryError(
+                f"Twilio rejected message with {response.status_code}: {response.text[:200]}",
+                retryable=False
+            )
+        return response.json().get("sid", "")
+
+    def _auth(self) -> Tuple[str, str]:
+        # Per request rather than on the pooled client, so rotated credentials apply at once
+        return (self.account_sid, self.auth_token)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                timeout=httpx.Timeout(10.0, connect=3.0),
+                limits=httpx.Limits(max_connections=settings.outbound_workers * 2,
+                                    max_keepalive_connections=settings.outbound_workers)
+            )
+        return self._client
+
+    async def probe(self) -> str:
+        """Health check: fetch the account resource, which also verifies the credentials."""
+        if not self.configured:
+            return "not_configured"
+        response = await self._get_client().get(
+            f"/2010-04-01/Accounts/{self.account_sid}.json", auth=self._auth()
+        )
+        if response.status_code >= 400:
+            raise RuntimeError(f"Twilio returned HTTP {response.status_code}")
+        return "reachable"
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class InMemoryOutboundQueue:
+    """Bounded in-process queue. Pending messages are lost if the process exits."""
+
+    def __init__(self, max_size: int, dead_letter_size: int = 1000):
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self.dead_letters: Deque[OutboundMessage] = deque(maxlen=dead_letter_size)
+
+    async def start(self):
+        # Bind the queue to the serving event loop
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+
+    async def put(self, message: OutboundMessage) -> bool:
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def get(self, timeout: float) -> Optional[OutboundMessage]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def retry(self, message: OutboundMessage, delay: float):
+        asyncio.get_running_loop().call_later(delay, self._requeue, message)
+
+    def _requeue(self, message: OutboundMessage):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.error(f"Outbound queue full, dead-lettering retry for {message.to_number}")
+            self.dead_letters.append(message)
+            outbound_queue_depth.dec()
+            outbound_messages_total.labels(status='dead_lettered').inc()
+
+    async def ack(self, message: OutboundMessage):
+        pass
+
+    async def dead_letter(self, message: OutboundMessage, error: str):
+        self.dead_letters.append(message)
+
+
+class DatabaseOutboundQueue:
+    """Durable queue stored in the outbound_messages table; survives restarts."""
+
+    def __init__(self, poll_interval: float = 0.2, session_factory=SessionLocal):
+        self.poll_interval = poll_interval
+        self._session_factory = session_factory
+
+    async def start(self):
+        recovered = await run_db(self._recover_inflight)
+        if recovered:
+            logger.info(f"Recovered {recovered} in-flight outbound messages")
+        # Rows left by earlier processes are still waiting for delivery
+        outbound_queue_depth.set(await run_db(self._count_pending))
+
+    def _count_pending(self) -> int:
+        db = self._session_factory()
+        try:
+            return db.execute(
+                select(func.count())
+                .select_from(OutboundMessageRecord)
+                .where(OutboundMessageRecord.status == "pending")
+            ).scalar_one()
+        finally:
+            db.close()
+
+    def _recover_inflight(self) -> int:
+        # Messages claimed by a process that died before acking them
+        db = self._session_factory()
+        try:
+            result = db.execute(
+                update(OutboundMessageRecord)
+                .where(OutboundMessageRecord.status == "inflight")
+                .values(status="pending")
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+    async def put(self, message: OutboundMessage) -> bool:
+        message.id = await run_db(self._insert, message)
+        return True
+
+    def _insert(self, message: OutboundMessage) -> int:
+        db = self._session_factory()
+        try:
+            record = OutboundMessageRecord(
+                to_number=message.to_number,
+                from_number=message.from_number,
+                body=message.body
+            )
+            db.add(record)
+            db.commit()
+            return record.id
+        finally:
+            db.close()
+
+    async def get(self, timeout: float) -> Optional[OutboundMessage]:
+        deadline = time.monotonic() + timeout
+        while True:
+            message = await run_db(self._claim)
+            if message is not None or time.monotonic() >= deadline:
+                return message
+            await asyncio.sleep(self.poll_interval)
+
+    def _claim(self) -> Optional[OutboundMessage]:
+        db = self._session_factory()
+        try:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            record = db.execute(
+                select(OutboundMessageRecord)
+                .where(OutboundMessageRecord.status == "pending",
+                       OutboundMessageRecord.next_attempt_at <= now)
+                .order_by(OutboundMessageRecord.next_attempt_at, OutboundMessageRecord.id)
+                .limit(1)
+            ).scalars().first()
+            if record is None:
+                return None
+
+            # Conditional update so two workers never claim the same row
+            claimed = db.execute(
+                update(OutboundMessageRecord)
+                .where(OutboundMessageRecord.id == record.id,
+                       OutboundMessageRecord.status == "pending")
+                .values(status="inflight")
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return None
+
+            return OutboundMessage(
+                id=record.id,
+                to_number=record.to_number,
+                from_number=record.from_number,
+                body=record.body,
+                attempts=record.attempts,
+                created_at=record.created_at.replace(tzinfo=timezone.utc).timestamp()
+            )
+        finally:
+            db.close()
+
+    async def retry(self, message: OutboundMessage, delay: float):
+        next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        await run_db(self._update, message.id, status="pending", attempts=message.attempts,
+                     next_attempt_at=next_attempt_at)
+
+    async def ack(self, message: OutboundMessage):
+        await run_db(self._delete, message.id)
+
+    async def dead_letter(self, message: OutboundMessage, error: str):
+        await run_db(self._update, message.id, status="dead", attempts=message.attempts,
+                     last_error=error[:500])
+
+    def _delete(self, message_id: int):
+        db = self._session_factory()
+        try:
+            db.execute(delete(OutboundMessageRecord).where(OutboundMessageRecord.id == message_id))
+            db.commit()
+        finally:
+            db.close()
+
+    def _update(self, message_id: int, **values):
+        db = self._session_factory()
+        try:
+            db.execute(
+                update(OutboundMessageRecord)
+                .where(OutboundMessageRecord.id == message_id)
+                .values(**values)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+class OutboundDispatcher:
+    """Worker tasks that drain the outbound queue with per-sender rate limiting and retries."""
+
+    def __init__(self, queue, sender: TwilioSender, from_number: Optional[str], workers: int,
+                 rate_per_second: float, burst: int, max_attempts: int,
+                 backoff_base: float, backoff_max: float):
+        self.queue = queue
+        self.sender = sender
+        self._from_number = from_number
+        self.workers = workers
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._limiters: Dict[str, TokenBucket] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    @property
+    def from_number(self) -> str:
+        # None means the configured WhatsApp sender, resolved on first use
+        return self._from_number if self._from_number is not None else settings.twilio_whatsapp_from
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and not self._stopping
+
+    async def start(self):
+        await self.queue.start()
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"outbound-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} outbound workers")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Stop accepting work, give workers drain_timeout to empty the queue, then cancel them."""
+        self._stopping = True
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        await self.sender.aclose()
+        logger.info("Outbound workers stopped")
+
+    async def enqueue(self, to_number: str, body: str, received_at: Optional[float] = None) -> bool:
+        """Queue a message for delivery. Returns False when the queue is full.
+
+        received_at is the webhook receipt time when this message is a deferred reply.
+        """
+        message = OutboundMessage(
+            to_number=_whatsapp_address(to_number),
+            body=body,
+            from_number=self.from_number,
+            received_at=received_at
+        )
+        if not await self.queue.put(message):
+            outbound_messages_total.labels(status='dropped').inc()
+            logger.error(f"Outbound queue full, dropping message to {message.to_number}")
+            return False
+        outbound_queue_depth.inc()
+        return True
+
+    def submit(self, to_number: str, body: str) -> bool:
+        """Queue a message from synchronous code on any thread. Returns False when not running."""
+        if not self.running:
+            return False
+        coro = self.enqueue(to_number, body)
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return True
+
+    def _limiter_for(self, from_number: str) -> TokenBucket:
+        limiter = self._limiters.get(from_number)
+        if limiter is None:
+            limiter = TokenBucket(self.rate_per_second, self.burst)
+            self._limiters[from_number] = limiter
+        return limiter
+
+    def _backoff(self, attempts: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempts)))
+
+    async def _worker(self):
+        while True:
+            message = await self.queue.get(timeout=0.5)
+            if message is None:
+                if self._stopping:
+                    return
+                continue
+
+            outbound_queue_depth.dec()
+            await self._deliver(message)
+
+    async def _deliver(self, message: OutboundMessage):
+        await self._limiter_for(message.from_number or "").acquire()
+        try:
+            sid = await self.sender.send(message)
+        except DeliveryError as e:
+            error, retryable = str(e), e.retryable
+        except Exception as e:
+            error, retryable = f"Unexpected delivery error: {e}", True
+        else:
+            await self._sent(message, sid)
+            return
+
+        message.attempts += 1
+        if retryable and message.attempts < self.max_attempts:
+            delay = self._backoff(message.attempts)
+            await self.queue.retry(message, delay)
+            outbound_queue_depth.inc()
+            outbound_messages_total.labels(status='retried').inc()
+            logger.warning(
+                f"Delivery to {message.to_number} failed ({error}), "
+                f"retry {message.attempts} in {delay:.2f}s"
+            )
+        else:
+            await self.queue.dead_letter(message, error)
+            outbound_messages_total.labels(status='dead_lettered').inc()
+            logger.error(
+                f"Delivery to {message.to_number} dead-lettered after {message.attempts} "
+                f"attempts: {error}"
+            )
+
+    async def _sent(self, message: OutboundMessage, sid: str):
+        outbound_messages_total.labels(status='sent').inc()
+        if message.received_at is not None:
+            webhook_reply_latency.observe(time.time() - message.received_at)
+        logger.info(f"Message sent to {message.to_number}, sid: {sid}")
+        try:
+            await self.queue.ack(message)
+        except Exception as e:
+            # Twilio already accepted the message; retrying would deliver it twice
+            logger.error(f"Message {sid} to {message.to_number} was sent but not acked: {e}")
+
+
+def create_outbound_dispatcher() -> OutboundDispatcher:
+    if settings.outbound_queue_backend == "database":
+        queue = DatabaseOutboundQueue()
+    else:
+        queue = InMemoryOutboundQueue(max_size=settings.outbound_queue_max_size)
+
+    return OutboundDispatcher(
+        queue=queue,
+        # Credentials and sender number come from settings on first use, keeping secrets off
+        # the import path
+        sender=TwilioSender(api_url=settings.twilio_api_url),
+        from_number=None,
+        workers=settings.outbound_workers,
+        rate_per_second=settings.outbound_rate_per_second,
+        burst=settings.outbound_burst,
+        max_attempts=settings.outbound_max_attempts,
+        backoff_base=settings.outbound_backoff_base_ms / 1000,
+        backoff_max=settings.outbound_backoff_max_ms / 1000
+    )
+
+outbound_dispatcher = create_outbound_dispatcher()
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+reply_jobs_total = Counter(
+    'reply_jobs_total',
+    'Deferred webhook reply jobs by outcome',
+    ['status']
+)
+
+reply_queue_depth = Gauge(
+    'reply_queue_depth',
+    'Deferred webhook reply jobs waiting for a worker'
+)
+
+
+@dataclass
+class ReplyJob:
+    from_number: str
+    body: str
+    received_at: float = field(default_factory=time.time)
+
+
+class ReplyWorkerPool:
+    """Computes webhook replies off the request path.
+
+    The webhook acknowledges Twilio right away and submits a ReplyJob; worker
+    tasks run handler(job), which builds the reply and queues it for delivery.
+    """
+
+    def __init__(self, handler: Callable[[ReplyJob], Awaitable[None]], workers: int, max_size: int):
+        self.handler = handler
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"reply-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} reply workers")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Let workers finish queued jobs for up to drain_timeout, then cancel them."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Reply workers stopped with {self._queue.qsize()} jobs still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Reply workers stopped")
+
+    def submit(self, job: ReplyJob) -> bool:
+        """Queue a job without waiting. Returns False when not running or the queue is full."""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            reply_jobs_total.labels(status='rejected').inc()
+            return False
+        reply_queue_depth.inc()
+        return True
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            reply_queue_depth.dec()
+            try:
+                await self.handler(job)
+                reply_jobs_total.labels(status='completed').inc()
+            except Exception as e:
+                reply_jobs_total.labels(status='failed').inc()
+                logger.exception(f"Reply job for {job.from_number} failed: {e}")
+            finally:
+                self._queue.task_done()
@@ -1,6 +1,9 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
 from src.api.main import app
+from src.database.config import Base, create_database_engine
 
 
 @pytest.fixture(scope="session")
@@ -8,3 +11,10 @@ def client():
     return TestClient(app)
 
 
+@pytest.fixture
+def session_factory(tmp_path):
+    """Sessions on a fresh SQLite database under tmp_path, so tests never touch ./weather_bot.db."""
+    engine = create_database_engine(f"sqlite:///{tmp_path}/test.db")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
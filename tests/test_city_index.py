@@ -0,0 +1,106 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from src.services.cities import (
+    DEFAULT_GAZETTEER_PATH,
+    CityIndex,
+    UnknownCityError,
+    normalize_name,
+    parse_city_query,
+)
+
+ROWS = [
+    ("London", "GB", 8961989, ["Londres"]),
+    ("London", "CA", 422324, []),
+    ("São Paulo", "BR", 12400232, []),
+    ("Paris", "FR", 2138551, []),
+    ("Parma", "IT", 146299, []),
+]
+
+
+def test_normalize_and_parse_city_query():
+    assert normalize_name("  São   Paulo ") == "sao paulo"
+    assert normalize_name("Saint-Étienne") == "saint etienne"
+    assert parse_city_query("London, ca") == ("London", "CA")
+    assert parse_city_query("Washington, D.C.") == ("Washington, D.C.", None)
+
+
+def test_exact_lookup_prefers_largest_city_unless_country_given():
+    index = CityIndex(ROWS)
+
+    assert [match.country for match in index.lookup("london")] == ["GB", "CA"]
+    assert index.resolve("London") == ("London", None)
+    assert index.resolve("London, CA") == ("London", "CA")
+    assert index.resolve("Londres") == ("London", None)
+    assert index.resolve("sao paulo") == ("São Paulo", None)
+
+
+def test_suggestions_for_typos_and_prefixes():
+    index = CityIndex(ROWS)
+
+    assert index.suggest("Lodnon")[0].name == "London"
+    assert index.suggest("Londn", country="CA")[0].country == "CA"
+    assert {match.name for match in index.suggest("Par")} == {"Paris", "Parma"}
+
+
+def test_unknown_cities_go_upstream_unless_strict():
+    index = CityIndex(ROWS)
+
+    # Smaller real cities are missing from the gazetteer and may sit one edit from a known one
+    assert index.resolve("Parsa") == ("Parsa", None)
+    assert index.resolve("Qwxz, FR") == ("Qwxz", "FR")
+
+    with pytest.raises(UnknownCityError) as excinfo:
+        index.resolve("Pariss", strict=True)
+    assert excinfo.value.suggestions[0].name == "Paris"
+    with pytest.raises(UnknownCityError):
+        index.resolve("Qwxz", strict=True)
+
+
+def test_bundled_gazetteer_loads():
+    index = CityIndex.load(DEFAULT_GAZETTEER_PATH)
+
+    assert len(index) > 10000
+    assert index.lookup("new york city")[0].country == "US"
+    assert index.suggest("Tel Avi")[0].name == "Tel Aviv"
+
+
+def test_unknown_names_are_only_rejected_after_upstream_404():
+    from src.api import main
+    from src.services.cities import get_city_index, load_city_index
+
+    assert load_city_index() is get_city_index() is not None
+    # Below the gazetteer's population cut-off and one edit away from Monza: still sent upstream
+    assert main._resolve_city("Monaco") == ("Monaco", None)
+
+    reply, message_type = main._get_weather_reply("Lodnon", {"status": "error", "not_found": True})
+    assert message_type == "unknown_city"
+    assert "Did you mean: London (GB)" in reply
+
+
+
+def test_webhook_and_api_label_the_same_city(monkeypatch):
+    from prometheus_client import REGISTRY
+
+    from src.api import main
+    from src.services import cities
+    from src.services.metrics import CityLabeler
+
+    monkeypatch.setattr(cities, "_city_index", CityIndex(ROWS))
+    monkeypatch.setattr(main, "city_labeler", CityLabeler(allowlist=["London"]))
+
+    def london_successes():
+        sample = {"city": "London", "status": "success"}
+        return REGISTRY.get_sample_value("weather_requests_total", sample) or 0
+
+    before = london_successes()
+    # Raw webhook text and the validated /weather query, including an alias
+    for query in ("  londres ", "London", "london, gb"):
+        main._record_weather_request(query, "success")
+
+    assert main._metric_city("Lodnon") == "Lodnon"
+    assert london_successes() == before + 3
@@ -1,16 +1,26 @@
-import pytest
-import sys
+import asyncio
 import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from src.database.config import get_db, WeatherData, init_database, test_database_connection as _test_db_conn
+from sqlalchemy import text
+
+from src.database import repository
+from src.database.config import WeatherData, WeatherDataAggregate, create_database_engine
+from src.database.config import test_database_connection as _test_db_conn
+from src.database.executor import DatabaseExecutor
+from src.database.retention import run_retention_batch
+from src.database.writer import WriteBehindBuffer
+
 
 def test_database_connection():
     assert _test_db_conn() is True
 
-def test_weather_data_creation():
-    init_database()
-    db = next(get_db())
+def test_weather_data_creation(session_factory):
+    db = session_factory()
     
     weather = WeatherData(
         city="Test City",
@@ -24,14 +34,10 @@ def test_weather_data_creation():
     result = db.query(WeatherData).filter(WeatherData.city == "Test City").first()
     assert result is not None
     assert result.temperature == 25.0
-    
-    db.delete(result)
-    db.commit()
     db.close()
 
-def test_weather_data_validation():
-    init_database()
-    db = next(get_db())
+def test_weather_data_validation(session_factory):
+    db = session_factory()
     
     weather = WeatherData(
         city="",  # Empty city should be handled
@@ -47,3 +53,148 @@ def test_weather_data_validation():
         db.rollback()
         db.close()
         assert True
+
+def test_database_executor_runs_off_event_loop():
+    executor = DatabaseExecutor(max_workers=2)
+
+    async def run_calls():
+        loop_thread = threading.get_ident()
+        thread_ids = await asyncio.gather(*(executor.run(threading.get_ident) for _ in range(4)))
+        return loop_thread, thread_ids
+
+    loop_thread, thread_ids = asyncio.run(run_calls())
+    executor.shutdown()
+
+    assert loop_thread not in thread_ids
+    assert executor.queue_depth == 0
+
+def test_database_executor_forgets_calls_cancelled_before_running():
+    executor = DatabaseExecutor(max_workers=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.create_task(executor.run(release.wait))
+        waiting = asyncio.create_task(executor.run(threading.get_ident))
+        await asyncio.sleep(0.05)
+        assert not running.done() and executor.queue_depth == 1
+
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        return executor.queue_depth
+
+    try:
+        assert asyncio.run(scenario()) == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+def test_write_behind_buffer_flushes_in_batches(session_factory):
+    writer = WriteBehindBuffer(batch_size=10, flush_interval=5, max_buffer=100, block_timeout=0.1,
+                               session_factory=session_factory)
+
+    for i in range(3):
+        assert writer.submit({
+            "city": "Writer Test City",
+            "temperature": 20.0 + i,
+            "description": "Test weather",
+            "created_at": datetime.now(timezone.utc)
+        })
+    writer.stop()
+
+    db = session_factory()
+    rows = db.query(WeatherData).filter(WeatherData.city == "Writer Test City").all()
+    assert len(rows) == 3
+    db.close()
+
+def test_weather_history_keyset_pagination(session_factory):
+    db = session_factory()
+    base_time = datetime(2024, 1, 1)
+    for i in range(5):
+        db.add(WeatherData(
+            city="History Test City",
+            temperature=float(i),
+            description="Test weather",
+            created_at=base_time + timedelta(hours=i)
+        ))
+    db.commit()
+
+    first_page, cursor = repository.get_readings(db, city="History Test City", limit=3)
+    second_page, last_cursor = repository.get_readings(
+        db, city="History Test City", limit=3, cursor=cursor
+    )
+    assert [r.temperature for r in first_page] == [4.0, 3.0, 2.0]
+    assert [r.temperature for r in second_page] == [1.0, 0.0]
+    assert last_cursor is None
+
+    latest = repository.get_latest_reading(db, "History Test City")
+    assert latest.temperature == 4.0
+
+    stats = repository.get_city_stats(
+        db, "History Test City", start=base_time + timedelta(hours=1)
+    )
+    assert stats["readings"] == 4
+    assert stats["min_temperature"] == 1.0
+    db.close()
+
+def test_latest_readings_break_ties_on_id(session_factory):
+    db = session_factory()
+    tied_at = datetime(2024, 1, 1, 12)
+    for temperature in (1.0, 2.0):
+        db.add(WeatherData(
+            city="Tie Test City", temperature=temperature, description="Test weather",
+            created_at=tied_at
+        ))
+    db.add(WeatherData(
+        city="Tie Test City", temperature=0.0, description="Test weather",
+        created_at=tied_at - timedelta(hours=1)
+    ))
+    db.commit()
+
+    latest = repository.get_latest_readings(db)
+    assert [(r.city, r.temperature) for r in latest] == [("Tie Test City", 2.0)]
+    db.close()
+
+def test_retention_downsamples_old_rows(session_factory):
+    db = session_factory()
+    old_time = datetime(2020, 1, 1, 10, 0)
+    for i in range(5):
+        db.add(WeatherData(
+            city="Retention Test City",
+            temperature=float(i),
+            humidity=50 + i,
+            description="Test weather",
+            created_at=old_time + timedelta(minutes=10 * i)
+        ))
+    db.commit()
+
+    cutoff = datetime(2021, 1, 1)
+    total_deleted = 0
+    while True:
+        deleted, _ = run_retention_batch(
+            cutoff, "hour", batch_size=2, session_factory=session_factory
+        )
+        if not deleted:
+            break
+        total_deleted += deleted
+
+    assert total_deleted == 5
+    assert db.query(WeatherData).count() == 0
+
+    buckets = db.query(WeatherDataAggregate).order_by(WeatherDataAggregate.bucket_start).all()
+    assert [(b.city, b.readings) for b in buckets] == [("Retention Test City", 5)]
+    assert buckets[0].avg_temperature == 2.0
+    assert buckets[0].min_temperature == 0.0
+    assert buckets[0].max_temperature == 4.0
+    assert buckets[0].avg_humidity == 52.0
+    db.close()
+
+def test_sqlite_tuning_profile(tmp_path):
+    tuned_engine = create_database_engine(f"sqlite:///{tmp_path}/tuned.db", sqlite_tuning=True)
+
+    with tuned_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+
+    assert tuned_engine.pool._pre_ping is False
+    tuned_engine.dispose()
@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.services.health import HealthProber
+
+
+async def ok():
+    return "connected"
+
+
+async def failing():
+    raise RuntimeError("connection refused")
+
+
+async def hanging():
+    await asyncio.sleep(10)
+
+
+def test_snapshot_reports_each_dependency():
+    prober = HealthProber({"database": ok, "twilio": failing}, timeout=0.5, required=("database",))
+    assert not prober.healthy
+
+    asyncio.run(prober.probe_once())
+    snapshot = prober.snapshot()
+
+    assert snapshot["database"]["ok"] and snapshot["database"]["detail"] == "connected"
+    assert not snapshot["twilio"]["ok"] and snapshot["twilio"]["error"] == "connection refused"
+    # Optional dependencies are reported but do not make the app unhealthy
+    assert prober.healthy
+
+
+def test_required_dependency_timeout_is_unhealthy():
+    prober = HealthProber({"database": hanging}, timeout=0.05, required=("database",))
+
+    asyncio.run(prober.probe_once())
+
+    assert not prober.healthy
+    assert "timed out" in prober.snapshot()["database"]["error"]
@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import queue
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.config import logging as log_config
+from src.config.logging import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    _parse_sample_rates,
+    get_logger,
+    setup_logging,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def capture(name):
+    handler = ListHandler()
+    stdlib_logger = logging.getLogger(name)
+    stdlib_logger.addHandler(handler)
+    stdlib_logger.setLevel(logging.DEBUG)
+    stdlib_logger.propagate = False
+    return handler
+
+
+def test_keyword_arguments_become_structured_fields():
+    handler = capture("test.structured")
+
+    get_logger("test.structured").info(
+        "Message sent to %s", "whatsapp:+1555", message_sid="SM1", exc_info=False
+    )
+
+    record = handler.records[0]
+    assert record.getMessage() == "Message sent to whatsapp:+1555"
+    assert record.fields == {"message_sid": "SM1"}
+
+
+def test_json_formatter_includes_fields_and_exception():
+    handler = capture("test.json")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        get_logger("test.json").error(
+            "Lookup failed for %s", "London", city="London", exc_info=True
+        )
+
+    entry = json.loads(JsonFormatter().format(handler.records[0]))
+
+    assert entry["message"] == "Lookup failed for London"
+    assert entry["level"] == "ERROR" and entry["logger"] == "test.json"
+    assert entry["city"] == "London"
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_sampling_keeps_unlisted_levels():
+    sampler = SamplingFilter({logging.DEBUG: 0.0})
+    debug = logging.LogRecord("test", logging.DEBUG, __file__, 1, "debug", None, None)
+    warning = logging.LogRecord("test", logging.WARNING, __file__, 1, "warning", None, None)
+
+    assert not sampler.filter(debug)
+    assert sampler.filter(warning)
+    expected = {logging.DEBUG: 0.01, logging.INFO: 0.5}
+    assert _parse_sample_rates("debug=0.01, INFO=0.5,bogus") == expected
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    stdlib_logger = logging.getLogger("test.full_queue")
+    stdlib_logger.addHandler(handler)
+    stdlib_logger.propagate = False
+
+    stdlib_logger.warning("first")
+    stdlib_logger.warning("second")
+
+    assert handler.queue.qsize() == 1
+    assert handler.queue.get_nowait().getMessage() == "first"
+
+
+def test_mutable_arguments_are_formatted_at_call_time():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    cities = ["London"]
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "Cities: %s", (cities,), None)
+
+    prepared = handler.prepare(record)
+    cities.append("Paris")
+
+    assert prepared.getMessage() == "Cities: ['London']"
+
+
+def test_setup_logging_is_idempotent():
+    setup_logging("test.one")
+    setup_logging("test.two")
+
+    root_handlers = logging.getLogger().handlers
+    assert root_handlers.count(log_config._handler) == 1
+    # Writing inline is the default; the queue is opt-in
+    assert not isinstance(log_config._handler, NonBlockingQueueHandler)
+    assert log_config._listener is None
+
+
+def test_queue_writer_is_opt_in(monkeypatch):
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "handlers", [])
+    monkeypatch.setattr(log_config, "_handler", None)
+    monkeypatch.setattr(log_config.settings, "log_queue_enabled", True)
+
+    setup_logging("test.queued")
+    try:
+        assert isinstance(log_config._handler, NonBlockingQueueHandler)
+        assert log_config._listener is not None
+    finally:
+        log_config.shutdown_logging()
+    assert log_config._listener is None
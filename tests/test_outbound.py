@@ -0,0 +1,152 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from prometheus_client import REGISTRY
+
+from src.database.config import OutboundMessageRecord
+from src.services.rate_limit import TokenBucket
+from src.workers.outbound import (
+    DatabaseOutboundQueue,
+    DeliveryError,
+    InMemoryOutboundQueue,
+    OutboundDispatcher,
+)
+from src.workers.replies import ReplyJob, ReplyWorkerPool
+
+
+class FakeSender:
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.sent = []
+
+    async def send(self, message):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(message)
+        return "SM123"
+
+    async def aclose(self):
+        pass
+
+
+def make_dispatcher(sender, max_attempts=3):
+    return OutboundDispatcher(
+        queue=InMemoryOutboundQueue(max_size=10),
+        sender=sender,
+        from_number="whatsapp:+14155238886",
+        workers=1,
+        rate_per_second=1000,
+        burst=10,
+        max_attempts=max_attempts,
+        backoff_base=0.001,
+        backoff_max=0.01
+    )
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_dispatcher_retries_retryable_failures():
+    sender = FakeSender(
+        [DeliveryError("503", retryable=True), DeliveryError("429", retryable=True)]
+    )
+    dispatcher = make_dispatcher(sender)
+
+    async def run():
+        await dispatcher.start()
+        assert await dispatcher.enqueue("+1234567890", "hello")
+        await wait_for(lambda: sender.sent)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+
+    assert len(sender.sent) == 1
+    assert sender.sent[0].to_number == "whatsapp:+1234567890"
+    assert sender.sent[0].attempts == 2
+
+def test_dispatcher_dead_letters_permanent_failures():
+    sender = FakeSender([DeliveryError("400", retryable=False)])
+    dispatcher = make_dispatcher(sender)
+
+    async def run():
+        await dispatcher.start()
+        await dispatcher.enqueue("+1234567890", "hello")
+        await wait_for(lambda: dispatcher.queue.dead_letters)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+
+    assert sender.sent == []
+    assert len(dispatcher.queue.dead_letters) == 1
+
+def test_failed_ack_does_not_resend():
+    class FailingAckQueue(InMemoryOutboundQueue):
+        async def ack(self, message):
+            raise RuntimeError("database is locked")
+
+    sender = FakeSender([])
+    dispatcher = make_dispatcher(sender)
+    dispatcher.queue = FailingAckQueue(max_size=10)
+
+    async def run():
+        await dispatcher.start()
+        await dispatcher.enqueue("+1234567890", "hello")
+        await wait_for(lambda: sender.sent)
+        await asyncio.sleep(0.05)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+
+    assert len(sender.sent) == 1
+    assert not dispatcher.queue.dead_letters
+
+def test_database_queue_depth_counts_recovered_rows(session_factory):
+    db = session_factory()
+    db.add_all([
+        OutboundMessageRecord(to_number="whatsapp:+1", body="a", status="pending"),
+        OutboundMessageRecord(to_number="whatsapp:+1", body="b", status="inflight"),
+        OutboundMessageRecord(to_number="whatsapp:+1", body="c", status="dead"),
+    ])
+    db.commit()
+    db.close()
+
+    asyncio.run(DatabaseOutboundQueue(session_factory=session_factory).start())
+
+    assert REGISTRY.get_sample_value("outbound_queue_depth") == 2
+
+def test_token_bucket_limits_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() == 0.5
+
+    now[0] = 0.5
+    assert bucket.try_acquire()
+
+def test_reply_worker_pool_runs_jobs_off_request_path():
+    handled = []
+
+    async def handler(job):
+        handled.append(job.body)
+
+    pool = ReplyWorkerPool(handler=handler, workers=2, max_size=1)
+
+    async def run():
+        assert not pool.submit(ReplyJob(from_number="whatsapp:+1", body="London"))
+        await pool.start()
+        assert pool.submit(ReplyJob(from_number="whatsapp:+1", body="London"))
+        assert not pool.submit(ReplyJob(from_number="whatsapp:+1", body="Paris"))
+        await pool.stop()
+
+    asyncio.run(run())
+
+    assert handled == ["London"]
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.services.rate_limit import ConcurrencyLimiter, SenderRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sender_limit_is_per_sender_and_refills():
+    clock = FakeClock()
+    limiter = SenderRateLimiter(rate=1.0, burst=2, max_senders=100, clock=clock)
+
+    assert limiter.try_acquire("whatsapp:+1") and limiter.try_acquire("whatsapp:+1")
+    assert not limiter.try_acquire("whatsapp:+1")
+    # Other senders have their own bucket
+    assert limiter.try_acquire("whatsapp:+2")
+
+    clock.now += 1.0
+    assert limiter.try_acquire("whatsapp:+1")
+    assert not limiter.try_acquire("whatsapp:+1")
+
+
+def test_sender_buckets_are_bounded_and_idle_ones_expire():
+    clock = FakeClock()
+    limiter = SenderRateLimiter(rate=1.0, burst=2, max_senders=2, clock=clock)
+
+    for sender in ("a", "b", "c"):
+        limiter.try_acquire(sender)
+    assert len(limiter) == 2
+
+    limiter.try_acquire("a")
+    limiter.try_acquire("a")
+    assert not limiter.try_acquire("a")
+    # Idle for burst / rate seconds: the bucket is gone and the sender starts full
+    clock.now += 2.0
+    assert limiter.try_acquire("a") and limiter.try_acquire("a")
+
+
+def test_concurrency_limiter_sheds_when_queue_is_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_waiting=1, max_wait=1.0)
+        assert await limiter.acquire()
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        # Slot taken and the line is full: shed without waiting
+        assert not await limiter.acquire()
+
+        limiter.release()
+        assert await waiter
+        assert limiter.in_flight == 1
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_limiter_sheds_after_max_wait():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_waiting=10, max_wait=0.05)
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        assert limiter.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_retries_skip_admission_and_rejections_are_not_cached(client, monkeypatch):
+    from src.api import main
+    from src.services.dedup import WebhookDeduplicator
+
+    built = []
+
+    async def build_reply(sender, message_text, received_at):
+        built.append(message_text)
+        return "<Response>ok</Response>"
+
+    def one_per_minute():
+        return SenderRateLimiter(rate=1 / 60, burst=1, max_senders=10)
+
+    monkeypatch.setattr(main, "_build_webhook_reply", build_reply)
+    monkeypatch.setattr(main, "webhook_dedup", WebhookDeduplicator(ttl=60, maxsize=100))
+    monkeypatch.setattr(main, "sender_limiter", one_per_minute())
+    monkeypatch.setattr(main, "signature_validator", None)
+
+    def post(message_sid):
+        form = {"From": "whatsapp:+15550001234", "Body": "London", "MessageSid": message_sid}
+        return client.post("/webhook", data=form).text
+
+    # Twilio retries of an answered message get the cached reply without spending tokens
+    assert [post("SM1") for _ in range(3)] == ["<Response>ok</Response>"] * 3
+    assert built == ["London"]
+
+    # A new message over the sender's rate gets the cheap reply, and its retry is not stuck with it
+    assert post("SM2") == main.RATE_LIMITED_TWIML
+    monkeypatch.setattr(main, "sender_limiter", one_per_minute())
+    assert post("SM2") == "<Response>ok</Response>"
+    assert len(built) == 2
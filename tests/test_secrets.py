@@ -0,0 +1,156 @@
+import os
+import subprocess
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from cryptography.fernet import Fernet
+
+from src.config.secrets import EncryptedFileCache, SecretStore
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLoader:
+    def __init__(self, values):
+        self.values = values
+        self.calls = []
+        self.called = threading.Event()
+
+    def __call__(self, names):
+        self.calls.append(list(names))
+        self.called.set()
+        if isinstance(self.values, Exception):
+            raise self.values
+        return dict(self.values)
+
+
+def test_secrets_are_loaded_lazily_in_one_batch():
+    loader = FakeLoader({"auth-token": "t1", "account-sid": "AC1"})
+    store = SecretStore(["auth-token", "account-sid"], loader, ttl=300)
+
+    assert loader.calls == []
+    assert store.get("auth-token") == "t1"
+    assert store.get("account-sid") == "AC1"
+    assert store.get("whatsapp-from") is None
+    assert loader.calls == [["auth-token", "account-sid"]]
+
+
+def test_expired_secrets_are_served_while_refreshing():
+    clock = FakeClock()
+    loader = FakeLoader({"auth-token": "old"})
+    store = SecretStore(["auth-token"], loader, ttl=300, clock=clock)
+    store.get("auth-token")
+
+    loader.values = {"auth-token": "new"}
+    loader.called.clear()
+    clock.now = 301
+    assert store.get("auth-token") == "old"
+    assert loader.called.wait(2)
+    for _ in range(100):
+        if store.get("auth-token") == "new":
+            break
+        threading.Event().wait(0.01)
+    assert store.get("auth-token") == "new"
+
+
+def test_failed_refresh_keeps_previous_values():
+    clock = FakeClock()
+    loader = FakeLoader({"auth-token": "t1"})
+    store = SecretStore(["auth-token"], loader, ttl=300, clock=clock)
+    store.get("auth-token")
+
+    loader.values = RuntimeError("SSM unavailable")
+    clock.now = 301
+    store.refresh()
+
+    assert store.get("auth-token") == "t1"
+
+
+def test_disk_cache_serves_warm_restart_encrypted(tmp_path):
+    key = Fernet.generate_key().decode()
+    path = str(tmp_path / "secrets.bin")
+    SecretStore(["auth-token"], FakeLoader({"auth-token": "s3cret"}),
+                disk_cache=EncryptedFileCache(path, key)).get("auth-token")
+
+    with open(path, "rb") as f:
+        assert b"s3cret" not in f.read()
+
+    # The next process reads the cached copy; the source is only consulted in the background
+    slow = FakeLoader(RuntimeError("SSM unavailable"))
+    restarted = SecretStore(["auth-token"], slow, disk_cache=EncryptedFileCache(path, key))
+    assert restarted.get("auth-token") == "s3cret"
+
+    assert EncryptedFileCache(path, Fernet.generate_key().decode()).load() is None
+
+
+def test_rotated_secrets_reach_their_consumers(monkeypatch):
+    import asyncio
+    import base64
+
+    import httpx
+
+    from src.api import main
+    from src.config.settings import settings
+    from src.services.weather import WeatherService
+    from src.workers.outbound import OutboundMessage, TwilioSender
+
+    clock = FakeClock()
+    loader = FakeLoader({"openweather-key": "key1", "account-sid": "AC1", "auth-token": "t1"})
+    monkeypatch.setattr(settings, "_secrets", SecretStore(list(loader.values), loader, clock=clock))
+    monkeypatch.setattr(main, "_twilio_credentials", None)
+    monkeypatch.setattr(main, "twilio_client", None)
+    monkeypatch.setattr(main, "signature_validator", None)
+
+    authorizations = []
+
+    def handler(request):
+        authorizations.append(request.headers["Authorization"])
+        return httpx.Response(201, json={"sid": "SM1"})
+
+    service = WeatherService()
+    sender = TwilioSender(api_url="https://twilio.test")
+    sender._client = httpx.AsyncClient(
+        base_url=sender.api_url, transport=httpx.MockTransport(handler)
+    )
+    message = OutboundMessage(to_number="whatsapp:+1", from_number="whatsapp:+2", body="hi")
+
+    def consumers():
+        main._refresh_twilio()
+        asyncio.run(sender.send(message))
+        return service._request_params("London", None)["appid"], main.signature_validator
+
+    key, validator = consumers()
+    assert key == "key1" and validator is not None
+
+    loader.values = {"openweather-key": "key2", "account-sid": "AC2", "auth-token": "t2"}
+    clock.now = 301
+    settings._secrets.refresh()
+    key, rotated_validator = consumers()
+
+    assert key == "key2"
+    assert rotated_validator is not validator
+    signature = rotated_validator.compute_signature("https://x.test/", []).decode()
+    assert rotated_validator.validate("https://x.test/", [], signature)
+    assert not validator.validate("https://x.test/", [], signature)
+    assert authorizations == [
+        "Basic " + base64.b64encode(credentials).decode()
+        for credentials in (b"AC1:t1", b"AC2:t2")
+    ]
+
+def test_importing_settings_does_not_import_boto3():
+    code = "import sys, src.config.settings; print('boto3' in sys.modules)"
+    env = dict(os.environ, AWS_REGION="us-east-1")
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from prometheus_client import REGISTRY, Counter
+
+from benchmarks.fakes import fake_redis
+from src.services.cache import TTLCache
+from src.services.metrics import CappedMetric, CityLabeler
+from src.services.shared_cache import (
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SharedCache,
+    dumps,
+    loads,
+)
+from src.services.weather import SingleFlight, WeatherService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_expires_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+
+    cache.set("london", {"temperature": 10})
+    assert cache.get("london") == {"temperature": 10}
+
+    clock.now = 61
+    assert cache.get("london") is None
+    assert len(cache) == 0
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    cache.set("london", 1)
+    cache.set("paris", 2)
+    cache.get("london")
+    cache.set("berlin", 3)
+
+    assert cache.get("paris") is None
+    assert cache.get("london") == 1
+    assert cache.get("berlin") == 3
+
+def test_cache_disabled_with_zero_ttl():
+    cache = TTLCache(maxsize=10, ttl=0)
+    cache.set("london", 1)
+    assert not cache.enabled
+    assert cache.get("london") is None
+
+def test_weather_service_cache_status():
+    service = WeatherService()
+    service.api_key = ""
+    service.cache = TTLCache(maxsize=10, ttl=60, name="test")
+
+    first = service.get_current_weather(city="London")
+    second = service.get_current_weather(city="  london ")
+
+    assert first["cache_status"] == "miss"
+    assert second["cache_status"] == "hit"
+    assert second["data"]["city"] == "London"
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(timeout=5)
+        return {"status": "success"}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("london", fetch)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5
+    assert sum(1 for _, shared in results if shared) == 4
+
+def test_city_labeler_bounds_cardinality():
+    labeler = CityLabeler(allowlist=["London"], top_k=1, min_count=2)
+
+    assert labeler.label("  london ") == "London"
+    assert labeler.label("Lodnon") == "other"
+    assert labeler.label("Paris", learn=True) == "other"
+    assert labeler.label("paris", learn=True) == "Paris"
+    assert labeler.label("Berlin", learn=True) == "other"
+    assert labeler.label("Berlin", learn=True) == "other"
+    assert labeler.learned == {"Paris"}
+
+def test_capped_metric_folds_overflow_into_other():
+    metric = CappedMetric(
+        Counter('test_capped_requests_total', 'Test counter', ['city', 'status']),
+        name='test_capped_requests_total',
+        max_series=2,
+        overflow_labels=('city',)
+    )
+
+    metric.labels(city="London", status="success").inc()
+    metric.labels(city="Paris", status="success").inc()
+    metric.labels(city="Berlin", status="success").inc()
+
+    assert REGISTRY.get_sample_value(
+        'test_capped_requests_total', {'city': 'other', 'status': 'success'}
+    ) == 1
+    assert REGISTRY.get_sample_value(
+        'test_capped_requests_total', {'city': 'Berlin', 'status': 'success'}
+    ) is None
+    assert REGISTRY.get_sample_value(
+        'metrics_series_capped_total', {'metric': 'test_capped_requests_total'}
+    ) == 1
+
+
+def test_shared_cache_codec_round_trip():
+    value = {"city": "São Paulo", "temperature": 21.5, "humidity": -3, "feels_like": None,
+             "timestamp": datetime(2024, 1, 1, 12, 30), "tags": [True, False, 2 ** 40]}
+
+    assert loads(dumps(value)) == value
+    assert len(dumps(value)) < len(json.dumps(value, default=str))
+
+
+def test_weather_replicas_share_cache_and_invalidate_near_cache():
+    backend = MemoryCacheBackend()
+    with patch("src.services.weather.get_cache_backend", return_value=backend):
+        first, second = WeatherService(), WeatherService()
+
+    result = first.get_current_weather(city="Sharedtown")
+    shared = second.get_current_weather(city="Sharedtown")
+    assert result["cache_status"] == "miss"
+    assert shared["cache_status"] == "shared"
+    assert second.get_current_weather(city="Sharedtown")["cache_status"] == "hit"
+
+    # A newer reading written by one replica evicts the other's near-cache copy
+    first._cache_weather("sharedtown", dict(result["data"], temperature=-1.0))
+    refreshed = second.get_current_weather(city="Sharedtown")
+    assert refreshed["cache_status"] == "shared"
+    assert refreshed["data"]["temperature"] == -1.0
+
+
+def test_redis_backend_against_fake_server():
+    with fake_redis() as server:
+        backend = RedisCacheBackend(server.url)
+        try:
+            cache = SharedCache(backend, namespace="test", ttl=60)
+            cache.set_many({"a": {"x": 1}, "b": [1, 2]})
+
+            found = cache.get_many(["a", "b", "missing"])
+            assert {key: value for key, (value, _) in found.items()} == {"a": {"x": 1}, "b": [1, 2]}
+            assert cache.add("claim", 1)
+            assert not cache.add("claim", 1)
+        finally:
+            backend.close()
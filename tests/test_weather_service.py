@@ -0,0 +1,377 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from src.database.config import WeatherData
+from src.services.batching import GroupBatcher
+from src.services.cache import TTLCache
+from src.services.resilience import CircuitBreaker, LatencyTracker, hedged
+from src.services.weather import WeatherService
+
+OPENWEATHER_PAYLOAD = {
+    "name": "London",
+    "main": {"temp": 12.3, "humidity": 80, "feels_like": 11.0},
+    "weather": [{"description": "light rain"}],
+    "dt": 1700000000,
+}
+
+
+def make_service(handler):
+    service = WeatherService()
+    service.api_key = "test-key"
+    service.cache = TTLCache(maxsize=10, ttl=60, name="test")
+    service._get_async_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+
+def test_async_fetch_uses_pooled_client():
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json=OPENWEATHER_PAYLOAD)
+
+    service = make_service(handler)
+
+    async def lookup_twice():
+        first = await service.get_current_weather_async(city="London")
+        second = await service.get_current_weather_async(city="london")
+        return first, second
+
+    first, second = asyncio.run(lookup_twice())
+
+    assert first["status"] == "success"
+    assert first["data"]["temperature"] == 12.3
+    assert first["cache_status"] == "miss"
+    assert second["cache_status"] == "hit"
+    assert len(requests_seen) == 1
+    assert requests_seen[0].url.params["q"] == "London"
+
+def test_async_fetch_coalesces_concurrent_lookups():
+    requests_seen = []
+
+    async def handler(request):
+        requests_seen.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=OPENWEATHER_PAYLOAD)
+
+    service = make_service(handler)
+
+    async def lookup_concurrently():
+        return await asyncio.gather(
+            *(service.get_current_weather_async(city="London") for _ in range(5))
+        )
+
+    results = asyncio.run(lookup_concurrently())
+
+    assert len(requests_seen) == 1
+    assert sorted(r["cache_status"] for r in results) == ["coalesced"] * 4 + ["miss"]
+
+def test_async_fetch_reports_upstream_errors():
+    service = make_service(lambda request: httpx.Response(404, json={"message": "city not found"}))
+
+    result = asyncio.run(service.get_current_weather_async(city="Nowhere"))
+
+    assert result["status"] == "error"
+    assert len(service.cache) == 0
+
+
+def test_stale_reading_served_while_refreshing():
+    now = [0.0]
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json=OPENWEATHER_PAYLOAD)
+
+    service = make_service(handler)
+    service.cache = TTLCache(maxsize=10, ttl=60, stale_ttl=60, name="test", clock=lambda: now[0])
+
+    async def scenario():
+        await service.get_current_weather_async(city="London")
+        now[0] = 90
+        stale = await service.get_current_weather_async(city="London")
+        await asyncio.gather(*service._background_tasks)
+        fresh = await service.get_current_weather_async(city="London")
+        return stale, fresh
+
+    stale, fresh = asyncio.run(scenario())
+
+    assert stale["cache_status"] == "stale"
+    assert fresh["cache_status"] == "hit"
+    assert len(requests_seen) == 2
+
+
+def test_sync_stale_hits_share_one_bounded_refresh():
+    import threading
+
+    now = [0.0]
+    service = make_service(None)
+    service.cache = TTLCache(maxsize=10, ttl=60, stale_ttl=60, name="test", clock=lambda: now[0])
+    started, release = threading.Event(), threading.Event()
+    fetches = []
+
+    def fetch(city, country):
+        fetches.append(city)
+        started.set()
+        release.wait(5)
+        return {"status": "success", "data": {"city": city}}
+
+    service._fetch_weather_from_api = fetch
+    cache_key = service._cache_key("London", None)
+    service._cache_weather(cache_key, {"city": "London"})
+    now[0] = 90
+
+    try:
+        results = [service.get_current_weather(city="London") for _ in range(5)]
+        assert started.wait(5)
+        assert service._refreshing == {cache_key}
+    finally:
+        release.set()
+        asyncio.run(service.aclose())
+
+    assert [result["cache_status"] for result in results] == ["stale"] * 5
+    assert fetches == ["London"]
+
+def test_refresh_hot_cities_refreshes_popular_entries():
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request.url.params["q"])
+        return httpx.Response(200, json=OPENWEATHER_PAYLOAD)
+
+    service = make_service(handler)
+    for _ in range(3):
+        service.popularity.record(service._cache_key("London", None), ("London", None))
+    service.popularity.record(service._cache_key("Paris", None), ("Paris", None))
+
+    refreshed = asyncio.run(service.refresh_hot_cities())
+
+    assert refreshed == 1
+    assert requests_seen == ["London"]
+    assert service.cache.age(service._cache_key("London", None)) is not None
+
+
+def test_batched_fetch_uses_group_endpoint_for_known_cities():
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path.rsplit("/", 1)[-1])
+        if request.url.path.endswith("/group"):
+            ids = request.url.params["id"].split(",")
+            items = [dict(OPENWEATHER_PAYLOAD, id=int(i), name=f"City{i}") for i in ids]
+            return httpx.Response(200, json={"cnt": len(items), "list": items})
+        city = request.url.params["q"]
+        return httpx.Response(200, json=dict(OPENWEATHER_PAYLOAD, id=len(city), name=city))
+
+    service = make_service(handler)
+    service._batcher = GroupBatcher(service._fetch_group_from_api_async, max_batch=20, window=0.01)
+    cities = ["Oslo", "Paris", "Berlin"]
+
+    async def scenario():
+        # First lookups resolve IDs one city at a time
+        await asyncio.gather(*(service.get_current_weather_async(city=city) for city in cities))
+        service.cache.clear()
+        lookups = (service.get_current_weather_async(city=city) for city in cities)
+        return await asyncio.gather(*lookups)
+
+    results = asyncio.run(scenario())
+
+    assert [result["status"] for result in results] == ["success"] * 3
+    assert paths.count("group") == 1
+    assert len(paths) == 4
+
+
+def test_failed_group_calls_do_not_open_the_breaker(monkeypatch):
+    from src.config.settings import settings
+
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"]["read"])
+        return httpx.Response(503)
+
+    monkeypatch.setattr(settings, "weather_batch_timeout", 7.5)
+    service = make_service(handler)
+    service.breaker = CircuitBreaker("test-group", failure_threshold=1)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(httpx.HTTPStatusError):
+                await service._fetch_group_from_api_async([1, 2])
+
+    asyncio.run(scenario())
+
+    assert service.breaker.state == "closed"
+    assert timeouts == [7.5] * 3
+
+def test_circuit_breaker_opens_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    now[0] = 10
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # one trial call while half-open
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_latency_tracker_adapts_timeout_and_hedge_delay():
+    tracker = LatencyTracker("test", min_timeout=0.5, max_timeout=10, multiplier=3, min_samples=10)
+    assert tracker.timeout() == 10
+    assert tracker.hedge_delay() is None
+
+    for i in range(100):
+        tracker.observe(0.2 + i / 1000)
+
+    assert tracker.timeout() == pytest.approx(0.299 * 3)
+    assert 0.28 < tracker.hedge_delay() < 0.3
+
+
+def test_hedged_call_returns_first_success():
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        await asyncio.sleep(0.2 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    async def scenario():
+        return await hedged(call, delay=0.02, upstream="test")
+
+    start = time.perf_counter()
+    assert asyncio.run(scenario()) == 2
+    assert time.perf_counter() - start < 0.15
+    assert len(calls) == 2
+
+
+def test_open_circuit_falls_back_to_last_stored_reading(session_factory):
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(503)
+
+    service = make_service(handler)
+    service.breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+    db = session_factory()
+    try:
+        db.add(WeatherData(city="Fallbackville", temperature=7.5, description="fog", humidity=90,
+                           created_at=datetime.now(timezone.utc) - timedelta(hours=1)))
+        db.commit()
+
+        async def scenario():
+            first = await service.get_current_weather_async(city="Fallbackville", db=db)
+            second = await service.get_current_weather_async(city="Fallbackville", db=db)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+    finally:
+        db.close()
+
+    assert first["status"] == "error"
+    assert second["cache_status"] == "fallback"
+    assert second["data"]["temperature"] == 7.5
+    assert len(requests_seen) == 1
+
+
+def test_recent_stored_reading_served_before_upstream(session_factory):
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json=dict(OPENWEATHER_PAYLOAD, name="São Replicaville"))
+
+    service = make_service(handler)
+    db = session_factory()
+    try:
+        # Stored under the upstream spelling by another replica's lookup of "Sao Replicaville"
+        stored_at = datetime.now(timezone.utc) - timedelta(seconds=50)
+        db.add(WeatherData(city="São Replicaville", lookup_key="sao replicaville", temperature=3.0,
+                           description="snow", created_at=stored_at))
+        db.commit()
+
+        async def scenario():
+            stored = await service.get_current_weather_async(city="São Replicaville", db=db)
+            cached = await service.get_current_weather_async(city="sao replicaville", db=db)
+            return stored, cached
+
+        stored, cached = asyncio.run(scenario())
+        # Country-qualified lookups are keyed separately
+        qualified = service._get_fresh_stored_weather(
+            db, "Sao Replicaville", service._cache_key("Sao Replicaville", "BR")
+        )
+    finally:
+        db.close()
+
+    assert stored["cache_status"] == "database"
+    assert stored["data"]["temperature"] == 3.0
+    assert cached["cache_status"] == "hit"
+    # The cache entry keeps the reading's real age instead of starting a fresh TTL
+    assert service.cache.age("sao replicaville") >= 50
+    assert qualified is None
+    assert not requests_seen
+
+
+def test_warmup_fills_cache_before_traffic():
+    def handler(request):
+        if request.url.params["q"] == "Nowhere":
+            return httpx.Response(404, json={"message": "city not found"})
+        return httpx.Response(200, json=OPENWEATHER_PAYLOAD)
+
+    service = make_service(handler)
+
+    async def warm_then_lookup():
+        loaded = await service.warmup([("London", None), ("Nowhere", None)])
+        return loaded, await service.get_current_weather_async(city="London")
+
+    loaded, result = asyncio.run(warm_then_lookup())
+
+    assert loaded == 1
+    assert result["cache_status"] == "hit"
+
+
+def test_live_and_stored_readings_report_last_updated_in_utc():
+    service = make_service(lambda request: httpx.Response(200, json=OPENWEATHER_PAYLOAD))
+    live = service._parse_weather_payload(OPENWEATHER_PAYLOAD)
+    stored = service._stored_result(
+        WeatherData(city="London", temperature=12.3, description="light rain",
+                    created_at=datetime(2023, 11, 14, 22, 13, 20)),
+        "database"
+    )
+
+    assert "Last updated: 2023-11-14 22:13 UTC" in service.format_weather_message(live)
+    assert "Last updated: 2023-11-14 22:13 UTC" in service.format_weather_message(stored)
+
+
+def test_weather_endpoint_reports_reading_timestamp(client, monkeypatch):
+    from src.api import main
+
+    observed_at = datetime.fromtimestamp(OPENWEATHER_PAYLOAD["dt"], timezone.utc)
+
+    class StoredReading:
+        async def get_current_weather_async(self, city, country=None, db=None):
+            return {"status": "success", "data": {
+                "city": "London", "temperature": 12.3, "description": "light rain",
+                "humidity": 80, "feels_like": 11.0, "timestamp": observed_at,
+            }}
+
+    monkeypatch.setattr(main, "weather_service", StoredReading())
+    response = client.post("/weather", json={"city": "London"})
+
+    assert response.status_code == 200
+    assert datetime.fromisoformat(response.json()["created_at"]) == observed_at
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from src.services.dedup import WebhookDeduplicator
+from src.services.shared_cache import MemoryCacheBackend, SharedCache
+
+
+class SlowReply:
+    def __init__(self, reply="<Response>ok</Response>", delay=0.05, fail=False):
+        self.reply = reply
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return self.reply
+
+
+def test_retry_while_processing_waits_for_first_reply():
+    dedup = WebhookDeduplicator(ttl=60, maxsize=100)
+    process = SlowReply()
+
+    async def scenario():
+        first = asyncio.create_task(dedup.run("SM1", process))
+        await asyncio.sleep(0.01)
+        retry = await dedup.run("SM1", process)
+        return await first, retry, await dedup.run("SM1", process)
+
+    first, retry, late_retry = asyncio.run(scenario())
+
+    assert first == retry == late_retry == "<Response>ok</Response>"
+    assert process.calls == 1
+
+
+def test_distinct_or_missing_sids_are_processed():
+    dedup = WebhookDeduplicator(ttl=60, maxsize=100)
+    process = SlowReply(delay=0)
+
+    async def scenario():
+        await dedup.run("SM1", process)
+        await dedup.run("SM2", process)
+        await dedup.run(None, process)
+        await dedup.run(None, process)
+
+    asyncio.run(scenario())
+    assert process.calls == 4
+
+
+def test_failed_delivery_is_forgotten():
+    dedup = WebhookDeduplicator(ttl=60, maxsize=100)
+    failing = SlowReply(fail=True)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await dedup.run("SM1", failing)
+        return await dedup.run("SM1", SlowReply(reply="<Response>retry</Response>", delay=0))
+
+    assert asyncio.run(scenario()) == "<Response>retry</Response>"
+
+
+def test_replicas_share_replies_through_shared_cache():
+    backend = MemoryCacheBackend()
+    replica_a = WebhookDeduplicator(ttl=60, maxsize=100, shared=SharedCache(backend, "webhook", 60),
+                                    poll_interval=0.01)
+    replica_b = WebhookDeduplicator(ttl=60, maxsize=100, shared=SharedCache(backend, "webhook", 60),
+                                    poll_interval=0.01)
+    process_a = SlowReply(reply="<Response>from a</Response>")
+    process_b = SlowReply(reply="<Response>from b</Response>")
+
+    async def scenario():
+        first = asyncio.create_task(replica_a.run("SM1", process_a))
+        await asyncio.sleep(0.01)
+        # Retry lands on the other replica while the first delivery is still in flight
+        return await first, await replica_b.run("SM1", process_b)
+
+    first, retry = asyncio.run(scenario())
+
+    assert first == retry == "<Response>from a</Response>"
+    assert process_a.calls == 1
+    assert process_b.calls == 0
@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from twilio.request_validator import RequestValidator
+
+from src.services.signature import TwilioSignatureValidator
+
+TOKEN = "12345"
+URL = "https://mycompany.com/myapp.php?foo=1&bar=2"
+PARAMS = [
+    ("CallSid", "CA1234567890ABCDE"),
+    ("Caller", "+12349013030"),
+    ("Digits", "1234"),
+    ("From", "+12349013030"),
+    ("To", "+18005551212"),
+]
+
+
+def test_matches_twilio_reference_signature():
+    validator = TwilioSignatureValidator(TOKEN)
+    reference = RequestValidator(TOKEN)
+
+    signature = reference.compute_signature(URL, dict(PARAMS))
+
+    assert validator.compute_signature(URL, PARAMS).decode() == signature
+    assert validator.validate(URL, PARAMS, signature)
+    assert validator.validate(URL, list(reversed(PARAMS)), signature)
+
+
+def test_accepts_url_signed_with_or_without_default_port():
+    validator = TwilioSignatureValidator(TOKEN)
+    reference = RequestValidator(TOKEN)
+
+    with_port = reference.compute_signature("https://mycompany.com:443/webhook", dict(PARAMS))
+    without_port = reference.compute_signature("https://mycompany.com/webhook", dict(PARAMS))
+
+    assert validator.validate("https://mycompany.com/webhook", PARAMS, with_port)
+    assert validator.validate("https://mycompany.com:443/webhook", PARAMS, without_port)
+
+
+def test_rejects_tampered_or_missing_signature():
+    validator = TwilioSignatureValidator(TOKEN)
+    signature = RequestValidator(TOKEN).compute_signature(URL, dict(PARAMS))
+
+    assert not validator.validate(URL, PARAMS + [("Body", "injected")], signature)
+    assert not validator.validate(URL, PARAMS, "")
+    assert not TwilioSignatureValidator("other-token").validate(URL, PARAMS, signature)
+
+
+def test_json_body_hash_is_checked():
+    validator = TwilioSignatureValidator(TOKEN)
+    body = b'{"property": "value", "boolean": true}'
+    url = "https://mycompany.com/myapp?bodySHA256=0a1ff7634d9ab3b95db5c9a2dfe9416e41502b283a80c7cf19632632f96e6620"
+    signature = RequestValidator(TOKEN).compute_signature(url, {})
+
+    assert validator.validate(url, (), signature, body=body)
+    assert not validator.validate(url, (), signature, body=body + b" ")
+
+
+def test_webhook_rejects_non_utf8_form_body(client):
+    response = client.post(
+        "/webhook",
+        content=b"From=whatsapp%3A%2B1&Body=\xff\xfe",
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert response.status_code == 400